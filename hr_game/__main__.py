@@ -0,0 +1,5 @@
+import sys
+
+from hr_game.cli import main
+
+sys.exit(main())
@@ -0,0 +1,46 @@
+# the whole benchmark suite, results as json so runs can be compared across commits.
+# python -m hr_game.benchmarks --out bench.json
+# python -m hr_game.benchmarks --quick --compare bench.json
+import argparse
+import sys
+
+from hr_game.benchmarks import ann, creation, events, sigmoid, simulation, startup, store
+from hr_game.benchmarks.harness import compare, load_results, print_table, write_results
+
+GROUPS = ("simulate", "events", "sigmoid", "creation", "store", "ann", "startup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the hr_game benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--store-sizes", type=int, nargs="+", default=None, help="rows, e.g. 10000 100000 1000000")
+    parser.add_argument("--out", default="-", help="json output path, - for stdout")
+    parser.add_argument("--compare", default=None, help="a previous json output to compare against")
+    args = parser.parse_args()
+    quick = args.quick
+    results = []
+    if "simulate" in args.only:
+        results += simulation.run(sizes=(10, 100) if quick else simulation.SIZES, cycles=1 if quick else 2)
+    if "events" in args.only:
+        results += events.run(calls=2_000, rows=10_000) if quick else events.run()
+    if "sigmoid" in args.only:
+        results += sigmoid.results(10_000 if quick else 100_000)
+    if "creation" in args.only:
+        results += creation.run(employees=200, network_sizes=(50,), bulk_sizes=(10_000,)) if quick else creation.run()
+    if "store" in args.only:
+        results += store.run(sizes=args.store_sizes or ((10_000,) if quick else store.SIZES))
+    if "ann" in args.only:
+        results += ann.run(rows=20_000, queries=200) if quick else ann.run()
+    if "startup" in args.only:
+        results += startup.run(repeat=2 if quick else 5)
+    print_table(results)
+    payload = write_results(results, args.out)
+    if args.compare:
+        for key, before, after, ratio in compare(load_results(args.compare), payload):
+            flag = " slower" if ratio > 1.1 else " faster" if ratio < 0.9 else ""
+            print(f"{key:<80} {before:14.1f} -> {after:14.1f} ns/op  x{ratio:.2f}{flag}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
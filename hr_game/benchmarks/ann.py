@@ -0,0 +1,60 @@
+# recall and latency of the approximate store indexes against the exact flat index.
+# python -m hr_game.benchmarks.ann --rows 100000
+import argparse
+import time
+
+import numpy as np
+
+from hr_game.benchmarks.harness import Result, measure, print_table, write_results
+from hr_game.creation.employee import randomize_employee
+from hr_game.llm.llm_pre_baking.employee_problem import employee_to_vector
+from hr_game.llm.llm_pre_baking.vector_index import IndexSpec, build_index
+
+# specs swept by default, search knobs from cheap to thorough
+SPECS = [
+    *(IndexSpec("ivf_flat", nprobe=p) for p in (1, 4, 16, 64)),
+    *(IndexSpec("hnsw", ef_search=e) for e in (16, 64, 256)),
+    *(IndexSpec("ivf_pq", nprobe=p) for p in (16, 64)),
+]
+
+
+def recall_at_k(true_distances: np.ndarray, distances: np.ndarray) -> float:
+    """Share of returned hits at least as close as the true k-th neighbour. Employee vectors are coarse so many
+    rows tie, comparing distances rather than ids doesn't punish returning an equally close tie."""
+    kth = true_distances[:, -1:]
+    return float((distances <= kth * (1 + 1e-5) + 1e-7).mean())
+
+
+def run(rows: int = 50_000, queries: int = 1_000, k: int = 10, specs=SPECS) -> list[Result]:
+    vectors = np.array([employee_to_vector(randomize_employee(seed=i)) for i in range(rows)], dtype=np.float32)
+    probes = np.array([employee_to_vector(randomize_employee(seed=rows + i)) for i in range(queries)], dtype=np.float32)
+    ids = np.arange(rows, dtype=np.int64)
+    flat = build_index(vectors, ids, IndexSpec())
+    true_distances, _ = flat.search(probes, k)
+    results = [measure("ann", "flat", lambda: flat.search(probes, k), ops=queries, rows=rows, k=k, recall=1.0)]
+    for spec in specs:
+        start = time.perf_counter()
+        index = build_index(vectors, ids, spec)
+        build_s = time.perf_counter() - start
+        distances, _ = index.search(probes, k)
+        knob = {"nprobe": spec.nprobe} if spec.needs_training else {"ef_search": spec.ef_search} if spec.index_type == "hnsw" else {}
+        results.append(measure("ann", spec.index_type, lambda: index.search(probes, k), ops=queries, rows=rows, k=k,
+                               recall=round(recall_at_k(true_distances, distances), 4), build_s=round(build_s, 3), **knob))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and per query latency of ivf_flat / hnsw / ivf_pq vs flat.")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--out", default=None, help="write json here, - for stdout")
+    args = parser.parse_args()
+    results = run(args.rows, args.queries, args.k)
+    print_table(results)
+    if args.out:
+        write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# cost of making employees and offices.
+# python -m hr_game.benchmarks.creation
+import argparse
+
+from hr_game.benchmarks.harness import Result, measure, print_table, write_results
+from hr_game.creation.employee import randomize_employee, randomize_employees
+from hr_game.creation.network import create_fully_connected_network, create_fully_connected_table
+
+
+def run(employees: int = 2_000, network_sizes=(50, 200), bulk_sizes=(100_000, 1_000_000)) -> list[Result]:
+    results = [measure("creation", "randomize_employee", lambda: [randomize_employee(seed=i) for i in range(employees)],
+                       ops=employees, n=employees)]
+    for n in bulk_sizes:
+        results.append(measure("creation", "randomize_employees", lambda: randomize_employees(n, seed=0), ops=n, n=n))
+    for n in network_sizes:
+        office = [randomize_employee(seed=i) for i in range(n)]
+        results.append(measure("creation", "create_fully_connected_network",
+                               lambda: create_fully_connected_network(office, seed=0),
+                               ops=n * (n - 1) // 2, n=n))
+        table = randomize_employees(n, seed=0)
+        results.append(measure("creation", "create_fully_connected_table",
+                               lambda: create_fully_connected_table(table, seed=0), ops=n * (n - 1) // 2, n=n))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="randomize_employee(s) and fully connected offices.")
+    parser.add_argument("--employees", type=int, default=2_000)
+    parser.add_argument("--network-sizes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--bulk-sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--out", default=None, help="write json here, - for stdout")
+    args = parser.parse_args()
+    results = run(args.employees, args.network_sizes, args.bulk_sizes)
+    print_table(results)
+    if args.out:
+        write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
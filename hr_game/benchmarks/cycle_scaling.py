@@ -0,0 +1,45 @@
+# how the per cycle cost of simulate_office grows with the size of a fully connected office.
+# python -m hr_game.benchmarks.cycle_scaling
+import argparse
+import time
+
+import numpy as np
+
+from hr_game.creation.employee import randomize_employee
+from hr_game.creation.network import create_fully_connected_network
+from hr_game.events.example import EMPLOYEE_EFFECTING_EVENT_BUS, EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS
+from hr_game.simulation.run import simulate_office
+
+
+def time_per_cycle(n_employees:int,engine:str,cycles:int=3,seed:int=0)->float:
+    network = create_fully_connected_network([randomize_employee(seed=seed+i) for i in range(n_employees)])
+    start = time.perf_counter()
+    simulate_office(network,cycles,False,EMPLOYEE_EVENT_BUS,EMPLOYEE_RELATIONSHIP_EVENT_BUS,EMPLOYEE_EFFECTING_EVENT_BUS,
+                    engine=engine,seed=seed)
+    return (time.perf_counter()-start)/cycles
+
+
+def growth_exponent(sizes:list[int],timings:list[float])->float:
+    """Slope of log(time) against log(N), ~2 means the cycle is linear in the number of edges."""
+    return float(np.polyfit(np.log(sizes),np.log(timings),1)[0])
+
+
+def cycle_scaling(sizes:list[int],engine:str,cycles:int=3)->list[float]:
+    return [time_per_cycle(n,engine,cycles) for n in sizes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per cycle cost of simulate_office as N grows.")
+    parser.add_argument("--sizes",type=int,nargs="+",default=[10,20,40,80])
+    parser.add_argument("--engines",nargs="+",default=["python","numpy"])
+    parser.add_argument("--cycles",type=int,default=3)
+    args = parser.parse_args()
+    for engine in args.engines:
+        timings = cycle_scaling(args.sizes,engine,args.cycles)
+        for n,t in zip(args.sizes,timings):
+            print(f"{engine:>7} N={n:<6} edges={n*(n-1)//2:<8} {t*1000:10.2f} ms/cycle")
+        print(f"{engine:>7} growth ~ N^{growth_exponent(args.sizes,timings):.2f}\n")
+
+
+if __name__ == "__main__":
+    main()
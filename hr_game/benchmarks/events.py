@@ -0,0 +1,86 @@
+# throughput of every event on the example buses: scalar pdf calls and batch_pdf rows.
+# python -m hr_game.benchmarks.events
+import argparse
+import random
+
+import numpy as np
+
+from hr_game.benchmarks.harness import Result, measure, print_table, write_results
+from hr_game.creation.employee import randomize_employee
+from hr_game.creation.network import create_small_world_network
+from hr_game.data.employee import Trait
+from hr_game.data.table import STAT_FIELDS, EmployeeTable
+from hr_game.events.base import EmployeeEffectingEvent, EmployeeRelationshipEvent, array_to_employee_delta
+from hr_game.events.example import EMPLOYEE_EFFECTING_EVENT_BUS, EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS
+
+
+def _unique(events):
+    seen = {}
+    for event in events:
+        seen.setdefault(type(event).__name__, event)
+    return list(seen.values())
+
+
+def run(calls: int = 20_000, rows: int = 100_000) -> list[Result]:
+    rng = np.random.default_rng(0)
+    employees = [randomize_employee(seed=i) for i in range(100)]
+    office = create_small_world_network(EmployeeTable.from_employees(employees), seed=0)
+    relationship = office.relationships.get(0)
+    # batch priors: `rows` employee rows and edges drawn with replacement from the office
+    emp_rows = rng.integers(0, len(office.employees), rows)
+    edge_rows = rng.integers(0, len(office.relationships), rows)
+    src, dst = office.relationships.column("src")[edge_rows], office.relationships.column("dst")[edge_rows]
+    random_vars = rng.random(rows)
+    scalar_vars = [random.Random(0).random() for _ in range(calls)]
+    results = []
+    for event in _unique(EMPLOYEE_EVENT_BUS + EMPLOYEE_EFFECTING_EVENT_BUS + EMPLOYEE_RELATIONSHIP_EVENT_BUS):
+        name = type(event).__name__
+        if isinstance(event, EmployeeRelationshipEvent):
+            prior = (relationship, employees[0], employees[1])
+            batch_prior = (office.relationships.view(edge_rows), office.employees.view(src), office.employees.view(dst))
+        elif isinstance(event, EmployeeEffectingEvent):
+            prior = (relationship, employees[0])
+            batch_prior = (office.relationships.view(edge_rows), office.employees.view(emp_rows))
+        else:
+            prior = employees[0]
+            batch_prior = office.employees.view(emp_rows)
+        results.append(measure("events", f"{name}.pdf", lambda: [event.pdf(prior, r) for r in scalar_vars],
+                               ops=calls, calls=calls))
+        results.append(measure("events", f"{name}.batch_pdf", lambda: event.batch_pdf(batch_prior, random_vars),
+                               ops=rows, rows=rows))
+    results += apply_results(calls, rows, rng)
+    return results
+
+
+def apply_results(calls: int, rows: int, rng: np.random.Generator) -> list[Result]:
+    """Employee.update and EmployeeTable.apply_deltas without traits and with a trait on every employee."""
+    deltas = rng.integers(-10, 10, (rows, len(STAT_FIELDS)))
+    delta = array_to_employee_delta(deltas[0])
+    traits = [Trait(name="stress", effect=1.5), Trait(name="happiness", effect=0.5)]
+    results = []
+    for label, employee_traits in (("", []), ("_traits", traits)):
+        employee = randomize_employee(seed=0)
+        employee.traits = list(employee_traits)
+        results.append(measure("events", f"Employee.update{label}", lambda: [employee.update(delta) for _ in range(calls)],
+                               ops=calls, calls=calls))
+        table = EmployeeTable.from_employees([employee] * rows)
+        table.modifiers()
+        results.append(measure("events", f"apply_deltas{label}", lambda: table.apply_deltas(np.arange(rows), deltas),
+                               ops=rows, rows=rows))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event pdf and batch_pdf throughput.")
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--out", default=None, help="write json here, - for stdout")
+    args = parser.parse_args()
+    results = run(args.calls, args.rows)
+    print_table(results)
+    if args.out:
+        write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# shared timing and json output for the benchmark suite.
+# a results file is {"meta": {...machine and commit...}, "results": [Result.to_dict(), ...]}, keyed by
+# group/name/params so two files from different commits can be lined up with compare().
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+@dataclass
+class Result:
+    group: str
+    name: str
+    seconds: float  # best of the repeats, for all `ops` operations
+    ops: int = 1
+    params: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def per_op_ns(self) -> float:
+        return self.seconds / max(self.ops, 1) * 1e9
+
+    @property
+    def key(self) -> str:
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.group}/{self.name}[{params}]"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "per_op_ns": self.per_op_ns, "key": self.key}
+
+
+def measure(group: str, name: str, fn: Callable[[], Any], ops: int = 1, repeat: int = 3,
+            setup: Optional[Callable[[], Any]] = None, **params) -> Result:
+    """Best wall time of `repeat` calls of fn. setup runs untimed before every call."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return Result(group=group, name=name, seconds=best, ops=ops, params=params)
+
+
+def skipped(group: str, name: str, reason: str, **params) -> Result:
+    """A placeholder so a skipped configuration still shows up in the output (seconds is NaN)."""
+    return Result(group=group, name=name, seconds=float("nan"), ops=1, params={**params, "skipped": reason})
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadata() -> dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(results: list[Result], path: Optional[str] = None) -> dict[str, Any]:
+    """Dump to path, or stdout when path is None or "-"."""
+    payload = {"meta": metadata(), "results": [r.to_dict() for r in results]}
+    text = json.dumps(payload, indent=2, allow_nan=True)
+    if path in (None, "-"):
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text)
+    return payload
+
+
+def load_results(path: str) -> dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[tuple[str, float, float, float]]:
+    """(key, baseline ns/op, current ns/op, current/baseline) for every benchmark present in both."""
+    before = {r["key"]: r["per_op_ns"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        old = before.get(r["key"])
+        if old is not None and old == old and r["per_op_ns"] == r["per_op_ns"]:  # NaN != NaN for skipped runs
+            rows.append((r["key"], old, r["per_op_ns"], r["per_op_ns"] / old if old else float("inf")))
+    return rows
+
+
+def print_table(results: list[Result], out=sys.stderr):
+    for r in results:
+        params = " ".join(f"{k}={v}" for k, v in r.params.items())
+        timing = "skipped" if r.seconds != r.seconds else f"{r.per_op_ns:14.1f} ns/op"
+        print(f"{r.group:>10} {r.name:<32} {timing:>20}  {params}", file=out)
@@ -0,0 +1,50 @@
+# micro benchmarks for hr_game.events.utils.sigmoid against the old scalar version that rebuilt k every call.
+# python -m hr_game.benchmarks.sigmoid
+import argparse
+import math
+import timeit
+
+import numpy as np
+
+from hr_game.benchmarks.harness import Result
+from hr_game.events.utils import k_for_linear_tolerance_general, sigmoid
+
+
+def uncached_sigmoid(x, top=1, bottom=0, midpoint=0.5, p=90, delta=0.1):
+    """The sigmoid as it was before k was memoized."""
+    k = k_for_linear_tolerance_general(p, delta=delta, top=top, bottom=bottom, midpoint=midpoint)
+    return bottom + (top - bottom) / (1 + math.exp(-k * (x - midpoint)))
+
+
+def per_call_ns(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def run(n: int = 100_000) -> dict[str, float]:
+    """ns per multiplier for a relationship style update of n values."""
+    xs = np.random.default_rng(0).uniform(0, 2, n)
+    values = xs.tolist()
+    loops = max(1, 1_000_000 // n)
+    return {
+        "k_for_linear_tolerance_general": per_call_ns(lambda: k_for_linear_tolerance_general(90, delta=0.1, top=2, midpoint=1), 100_000),
+        "uncached scalar": per_call_ns(lambda: [uncached_sigmoid(x, top=2, midpoint=1) for x in values], loops) / n,
+        "cached scalar": per_call_ns(lambda: [sigmoid(x, top=2, midpoint=1) for x in values], loops) / n,
+        "array": per_call_ns(lambda: sigmoid(xs, top=2, midpoint=1), loops * 10) / n,
+    }
+
+
+def results(n: int = 100_000) -> list[Result]:
+    """run() as harness Results for the suite, ns per value is stored as seconds per op."""
+    return [Result(group="sigmoid", name=name, seconds=ns * 1e-9, ops=1, params={"n": n}) for name, ns in run(n).items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scalar vs memoized vs array sigmoid.")
+    parser.add_argument("-n", type=int, default=100_000)
+    args = parser.parse_args()
+    for name, ns in run(args.n).items():
+        print(f"{name:>32} {ns:10.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
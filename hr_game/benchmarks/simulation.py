@@ -0,0 +1,65 @@
+# per cycle cost of simulate_office on dense (fully connected) and sparse (small world) offices.
+# python -m hr_game.benchmarks.simulation
+import argparse
+
+from hr_game.benchmarks.harness import Result, measure, print_table, skipped, write_results
+from hr_game.creation.employee import randomize_employee
+from hr_game.creation.network import create_small_world_network, create_team_network
+from hr_game.data.table import EmployeeTable, OfficeTable
+from hr_game.events.example import EMPLOYEE_EFFECTING_EVENT_BUS, EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS
+from hr_game.simulation.run import simulate_office
+
+SIZES = (10, 100, 1000, 5000)
+TOPOLOGIES = ("dense", "sparse")
+
+
+def build_office(n: int, topology: str, seed: int = 0) -> OfficeTable:
+    employees = EmployeeTable.from_employees(randomize_employee(seed=seed + i) for i in range(n))
+    if topology == "dense":
+        # one team holding everyone with every pair linked is the fully connected office, built as columns
+        return create_team_network(employees, team_size=max(n, 1), p_within=1.0, cross_links=0.0, seed=seed)
+    return create_small_world_network(employees, k=8, seed=seed)
+
+
+def run(sizes=SIZES, topologies=TOPOLOGIES, engines=("python", "numpy"), cycles: int = 2,
+        max_dense_edges: int = 2_000_000, max_python_edges: int = 50_000) -> list[Result]:
+    results = []
+    for topology in topologies:
+        for n in sizes:
+            edges = n * (n - 1) // 2 if topology == "dense" else None
+            if edges is not None and edges > max_dense_edges:
+                results += [skipped("simulate", f"simulate_office/{engine}", f"{edges} edges > max_dense_edges",
+                                    n=n, topology=topology, engine=engine) for engine in engines]
+                continue
+            office = build_office(n, topology)
+            edges = len(office.relationships)
+            for engine in engines:
+                params = dict(n=n, topology=topology, engine=engine, edges=edges)
+                if engine == "python" and edges > max_python_edges:
+                    results.append(skipped("simulate", f"simulate_office/{engine}", f"{edges} edges > max_python_edges", **params))
+                    continue
+                target = office.to_network() if engine == "python" else office
+                results.append(measure("simulate", f"simulate_office/{engine}",
+                                       lambda: simulate_office(target, cycles, False, EMPLOYEE_EVENT_BUS,
+                                                               EMPLOYEE_RELATIONSHIP_EVENT_BUS, EMPLOYEE_EFFECTING_EVENT_BUS,
+                                                               engine=engine, seed=0),
+                                       ops=cycles, repeat=1, **params))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="simulate_office ns per cycle on dense and sparse offices.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--topologies", nargs="+", default=list(TOPOLOGIES))
+    parser.add_argument("--engines", nargs="+", default=["python", "numpy"])
+    parser.add_argument("--cycles", type=int, default=2)
+    parser.add_argument("--out", default=None, help="write json here, - for stdout")
+    args = parser.parse_args()
+    results = run(args.sizes, args.topologies, args.engines, args.cycles)
+    print_table(results)
+    if args.out:
+        write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
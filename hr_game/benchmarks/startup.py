@@ -0,0 +1,46 @@
+# wall time of fresh `python -m hr_game` processes against the cli startup budget.
+# python -m hr_game.benchmarks.startup --check exits 1 when a command is over budget.
+import argparse
+import subprocess
+import sys
+
+from hr_game.benchmarks.harness import Result, measure, print_table, write_results
+
+# seconds for the whole process, interpreter start included
+BUDGETS = {
+    "help": (["--help"], 0.4),
+    "simulate_small": (["simulate", "--employees", "10", "--cycles", "10", "--seed", "1"], 0.8),
+}
+
+
+def run(repeat: int = 5) -> list[Result]:
+    results = []
+    for name, (argv, budget) in BUDGETS.items():
+        command = [sys.executable, "-m", "hr_game", *argv]
+        results.append(measure("startup", name, lambda: subprocess.run(command, check=True, capture_output=True),
+                               repeat=repeat, budget_s=budget))
+    return results
+
+
+def over_budget(results: list[Result]) -> list[Result]:
+    return [r for r in results if r.seconds > r.params["budget_s"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time of the hr_game cli.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="exit 1 if any command is over its budget")
+    parser.add_argument("--out", default=None, help="write json here, - for stdout")
+    args = parser.parse_args()
+    results = run(args.repeat)
+    print_table(results)
+    if args.out:
+        write_results(results, args.out)
+    if args.check and over_budget(results):
+        for r in over_budget(results):
+            print(f"{r.name}: {r.seconds:.3f}s is over its {r.params['budget_s']}s budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
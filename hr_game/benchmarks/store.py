@@ -0,0 +1,61 @@
+# EmployeeVectorAndMetadataStore at 10k to 1M rows. questions come from the offline StubChatModel.
+# python -m hr_game.benchmarks.store --sizes 10000 100000 1000000
+import argparse
+from itertools import cycle, islice
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from hr_game.benchmarks.harness import Result, measure, print_table, write_results
+from hr_game.creation.employee import randomize_employee
+from hr_game.llm.llm_pre_baking.employee_problem import EmployeeVectorAndMetadataStore, generate_prompts
+from hr_game.llm.stub import StubChatModel
+
+SIZES = (10_000, 100_000)
+
+
+def employee_pool(n: int, setting: str = "generic office"):
+    """n (employee, question) pairs. Rows repeat a pool of distinct employees so 1M rows stay cheap to make."""
+    pool = [randomize_employee(seed=i) for i in range(min(n, 5_000))]
+    questions = [m.content for m in StubChatModel().batch([generate_prompts(e, setting) for e in pool])]
+    return list(islice(cycle(pool), n)), list(islice(cycle(questions), n))
+
+
+def run(sizes=SIZES, singles: int = 10, queries: int = 20, k: int = 10, gets: int = 1_000) -> list[Result]:
+    results = []
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        employees, questions = employee_pool(n)
+        with TemporaryDirectory() as tmp:
+            store = EmployeeVectorAndMetadataStore(str(Path(tmp) / "faiss.index"), str(Path(tmp) / "md.db"))
+            results.append(measure("store", "batch_set", lambda: store.batch_set(employees, questions),
+                                   ops=n, repeat=1, rows=n))
+            results.append(measure("store", "set", lambda: [store.set(employees[i], questions[i]) for i in range(singles)],
+                                   ops=singles, repeat=1, rows=n))
+            probes = [employees[i] for i in rng.integers(0, n, queries)]
+            results.append(measure("store", "vector_search", lambda: [store.vector_search(e, k) for e in probes],
+                                   ops=queries, rows=n, k=k))
+            results.append(measure("store", "batch_vector_search", lambda: store.batch_vector_search(probes, k),
+                                   ops=queries, rows=n, k=k))
+            ids = rng.integers(1, n + 1, gets).tolist()
+            results.append(measure("store", "batch_get", lambda: store.batch_get(ids), ops=gets, rows=n))
+            results.append(measure("store", "batch_get_raw", lambda: store.batch_get(ids, hydrate=False), ops=gets, rows=n))
+            results.append(measure("store", "flush", store.flush, ops=1, repeat=1, rows=n))
+            store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector + metadata store set/batch_set/vector_search/batch_get.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--out", default=None, help="write json here, - for stdout")
+    args = parser.parse_args()
+    results = run(args.sizes)
+    print_table(results)
+    if args.out:
+        write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# hr_game command line: simulate, bake and render.
+# only argparse is imported up front, every subcommand imports what it needs (numpy, faiss, langchain,
+# matplotlib) when it runs, so `hr_game --help` stays cheap. see hr_game.benchmarks.startup for the budget.
+import argparse
+import sys
+from typing import Optional
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0, got {number}")
+    return number
+
+
+def _simulate(args):
+    from hr_game.creation.employee import randomize_employee
+    from hr_game.creation.network import create_fully_connected_network
+    from hr_game.events.example import EMPLOYEE_EFFECTING_EVENT_BUS, EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS
+    from hr_game.simulation.profile import EventProfiler
+    from hr_game.simulation.run import iter_office, iter_resume
+    from hr_game.simulation.stream import print_record
+
+    buses = (EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS, EMPLOYEE_EFFECTING_EVENT_BUS)
+    profiler = EventProfiler() if args.profile else None
+    describe = lambda i: args.verbose and i % args.report_every == 0
+    if args.resume:
+        records = iter_resume(args.checkpoint, args.cycles, *buses, engine=args.engine,
+                              checkpoint_every=args.checkpoint_every, describe=describe, profiler=profiler,
+                              workers=args.workers)
+    else:
+        seeds = range(args.seed, args.seed + args.employees) if args.seed is not None else [None] * args.employees
+        office = create_fully_connected_network([randomize_employee(seed=s) for s in seeds], seed=args.seed)
+        records = iter_office(office, args.cycles, *buses, engine=args.engine, seed=args.seed,
+                              checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                              describe=describe, profiler=profiler, workers=args.workers)
+    for record in records:
+        if record.cycle % args.report_every == 0 or record.cycle == args.cycles - 1:
+            if args.verbose:
+                print_record(record)
+            means = " ".join(f"{name}={value:.1f}" for name, value in record.means.items())
+            print(f"day {record.cycle}: {means}")
+    if profiler is not None:
+        print(profiler.table())
+
+
+def _bake(args):
+    from hr_game.llm.llm_pre_baking.bake import bake_questions
+
+    if args.stub:
+        from hr_game.llm.stub import StubChatModel
+        llm = StubChatModel()
+    else:
+        from hr_game.llm.utils import get_llm
+        llm = get_llm(cache=args.cache)
+    report = bake_questions(args.path, args.setting, args.batches, args.batch_size, llm, concurrency=args.concurrency,
+                            requests_per_minute=args.rpm, tokens_per_minute=args.tpm, retries=args.retries,
+                            seed=args.seed, verbose=args.verbose)
+    print(f"baked {len(report.baked)} batches ({report.rows} questions), skipped {len(report.skipped)}, "
+          f"failed {len(report.failed)}")
+    for batch, error in sorted(report.failed.items()):
+        print(f"  batch {batch}: {error}", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+def _render(args):
+    import matplotlib
+    matplotlib.use("Agg")  # files only, never open a window
+    from hr_game.views.office import render_office
+
+    if args.snapshot:
+        from hr_game.data.snapshot import load_snapshot
+        network = load_snapshot(args.snapshot).network()
+    else:
+        from hr_game.creation.employee import randomize_employee
+        from hr_game.creation.network import create_fully_connected_network
+        seeds = range(args.seed, args.seed + args.employees) if args.seed is not None else [None] * args.employees
+        network = create_fully_connected_network([randomize_employee(seed=s) for s in seeds], seed=args.seed)
+    for path in render_office(network, args.out, dpi=args.dpi):
+        print(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="hr_game", description="Simulate offices, bake LLM questions, render plots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="run an office simulation")
+    simulate.add_argument("--employees", type=positive_int, default=10)
+    simulate.add_argument("--cycles", type=positive_int, default=100)
+    simulate.add_argument("--engine", choices=("python", "numpy", "scheduled"), default="python")
+    simulate.add_argument("--seed", type=int, default=None)
+    simulate.add_argument("--workers", type=non_negative_int, default=1,
+                          help="processes for the relationship phase of the numpy engines, 0 for every core")
+    simulate.add_argument("--report-every", type=positive_int, default=10, help="print office means every n days")
+    simulate.add_argument("--verbose", action="store_true", help="also print what happened on reported days")
+    simulate.add_argument("--checkpoint", default=None, help="snapshot directory to write (or --resume from)")
+    simulate.add_argument("--checkpoint-every", type=non_negative_int, default=0,
+                          help="also snapshot every n days, 0 for only at the end")
+    simulate.add_argument("--resume", action="store_true", help="continue --checkpoint up to --cycles days")
+    simulate.add_argument("--profile", action="store_true", help="print per event timings at the end")
+    simulate.set_defaults(run=_simulate)
+
+    bake = commands.add_parser("bake", help="bake employee questions into a vector store")
+    bake.add_argument("path", nargs="?", default=".data/llm_bakes/employee_questions/")
+    bake.add_argument("--setting", default="Working in a generic office")
+    bake.add_argument("--batches", type=int, default=10)
+    bake.add_argument("--batch-size", type=int, default=10)
+    bake.add_argument("--concurrency", type=int, default=4)
+    bake.add_argument("--rpm", type=float, default=None, help="requests per minute limit")
+    bake.add_argument("--tpm", type=float, default=None, help="tokens per minute limit")
+    bake.add_argument("--retries", type=int, default=3)
+    bake.add_argument("--seed", type=int, default=None)
+    bake.add_argument("--cache", action="store_true", help="replay answers from the on disk LLM cache")
+    bake.add_argument("--stub", action="store_true", help="use the offline StubChatModel, no api calls")
+    bake.add_argument("--verbose", action="store_true")
+    bake.set_defaults(run=_bake)
+
+    render = commands.add_parser("render", help="plot an office to PNGs")
+    render.add_argument("--snapshot", default=None, help="render a saved snapshot instead of a random office")
+    render.add_argument("--employees", type=positive_int, default=10)
+    render.add_argument("--seed", type=int, default=None)
+    render.add_argument("--out", default=".plots")
+    render.add_argument("--dpi", type=int, default=300)
+    render.set_defaults(run=_render)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "simulate" and args.checkpoint is None:
+        if args.resume:
+            parser.error("simulate --resume needs --checkpoint to resume from")
+        if args.checkpoint_every:
+            parser.error("simulate --checkpoint-every needs --checkpoint to write to")
+    return args.run(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
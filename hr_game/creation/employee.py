@@ -1,32 +1,86 @@
+from functools import lru_cache
 from pathlib import Path
 import random
 import string
 from typing import Optional
 
+import numpy as np
+
 from hr_game.data.employee import Employee
+from hr_game.data.table import STAT_DTYPE, STAT_FIELDS, STRING_DTYPE, EmployeeTable
 def read_employee_names(path:Path=Path(__file__).parent/"employee_names.txt")->list[str]:
    with open(path,"r") as fp:
       lines = fp.readlines()
    return lines 
+
+@lru_cache(maxsize=None)
+def first_names()->tuple[str,...]:
+  """Every first name randomize_employee picks from, read from employee_names.txt once per process."""
+  return tuple(n.capitalize().strip() for n in ["Alice","Bob","Cthulhu","Deamon","Erebus","Faust","Hanbi","Jesabell","Kroni","Lilly","Matteo"] + read_employee_names())
+
 def randomize_employee(seed:int =None)->Employee:
-  names = ["Alice","Bob","Cthulhu","Deamon","Erebus","Faust","Hanbi","Jesabell","Kroni","Lilly","Matteo"] + read_employee_names()
+  """A random employee. With a seed it is drawn from its own random.Random(seed), employee_id included, so the same
+  seed is the same employee every time and the global random stream is left alone."""
+  names = first_names()
   letters = string.ascii_lowercase
-  if seed is not None:
-    random.seed(seed)
-  first_name = random.choice(names).capitalize().strip()
-  last_letter = random.choice(letters).upper()
-  return Employee(
-     name=f"{first_name} {last_letter}.",
-     age=random.randint(18,65),
-     stress=random.randint(10,80),
-     greed=random.randint(10,50),
-     salary=random.randint(50_000,1_500_000),
-     anger=random.randint(10,50),
-     horniness=random.randint(10,50),
-     happiness=random.randint(10,50),
-     productivity=random.randint(10,50),
-     health=random.randint(50,100),
+  rng = random.Random(seed) if seed is not None else random
+  first_name = rng.choice(names)
+  last_letter = rng.choice(letters).upper()
+  name = f"{first_name} {last_letter}."
+  fields = dict(
+     name=name,
+     age=rng.randint(18,65),
+     stress=rng.randint(10,80),
+     greed=rng.randint(10,50),
+     salary=rng.randint(50_000,1_500_000),
+     anger=rng.randint(10,50),
+     horniness=rng.randint(10,50),
+     happiness=rng.randint(10,50),
+     productivity=rng.randint(10,50),
+     health=rng.randint(50,100),
     )
+  if seed is not None:
+    # same shape as new_employee_id, 12 hex digits after the name
+    fields["employee_id"] = f"{name}#{rng.getrandbits(48):012x}"
+  return Employee(**fields)
+
+# inclusive (low, high) ranges randomize_employee draws from
+RANDOM_AGE = (18,65)
+RANDOM_STATS = {
+  "stress":(10,80),
+  "greed":(10,50),
+  "salary":(50_000,1_500_000),
+  "anger":(10,50),
+  "happiness":(10,50),
+  "health":(50,100),
+  "horniness":(10,50),
+  "productivity":(10,50),
+}
+
+def _hex_ids(values:np.ndarray)->np.ndarray:
+  """12 lower case hex digits per value, the same shape of suffix new_employee_id gives."""
+  shifts = np.arange(44,-1,-4,dtype=np.uint64)
+  digits = (values[:,None] >> shifts) & np.uint64(15)
+  chars = np.frombuffer(b"0123456789abcdef",dtype=np.uint8)[digits]
+  return np.ascontiguousarray(chars).view("S12").ravel().astype(STRING_DTYPE)
+
+def randomize_employees(n:int,seed:Optional[int]=None,rng:Optional[np.random.Generator]=None)->EmployeeTable:
+  """Bulk randomize_employee straight into an EmployeeTable: every column is drawn from one Generator (rng, or
+  default_rng(seed)) so the same seed always gives the same office, employee ids included. Same ranges as
+  randomize_employee, not the same employees."""
+  rng = rng if rng is not None else np.random.default_rng(seed)
+  names = np.array(first_names(),dtype=STRING_DTYPE)
+  suffixes = np.array([f" {letter.upper()}." for letter in string.ascii_lowercase],dtype=STRING_DTYPE)
+  full_names = np.strings.add(names[rng.integers(0,len(names),n)],suffixes[rng.integers(0,len(suffixes),n)])
+  employee_ids = np.strings.add(np.strings.add(full_names,"#"),_hex_ids(rng.integers(0,2**48,n,dtype=np.uint64)))
+  age = rng.integers(RANDOM_AGE[0],RANDOM_AGE[1]+1,n,dtype=STAT_DTYPE)
+  stats = np.empty((n,len(STAT_FIELDS)),dtype=STAT_DTYPE,order="F")
+  for column,field in enumerate(STAT_FIELDS):
+    low,high = RANDOM_STATS[field]
+    stats[:,column] = rng.integers(low,high+1,n,dtype=STAT_DTYPE)
+  table = EmployeeTable(n)
+  table.extend(full_names,employee_ids,age,stats)
+  return table
 
 
 ### random utility 
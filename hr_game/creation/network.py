@@ -1,7 +1,10 @@
 import random
-from typing import Optional
+from typing import Optional, Union
+
+import numpy as np
 
 from hr_game.data.employee import Employee, EmployeeNetwork, EmployeeRelationship
+from hr_game.data.table import EmployeeTable, OfficeTable, RELATIONSHIP_FIELDS
 def randomize_relationship(seed:Optional[int]=None)->EmployeeRelationship:
     if seed is not None:
         random.seed(seed)
@@ -10,15 +13,111 @@ def randomize_relationship(seed:Optional[int]=None)->EmployeeRelationship:
                                 synergy=random.random(),
                                 friendship=random.random(),
                                 )
-    
+
+def random_relationship_values(rng:np.random.Generator,n_edges:int)->np.ndarray:
+    """Batched randomize_relationship: (n_edges, 4) uniform multipliers in RELATIONSHIP_FIELDS order."""
+    return rng.random((n_edges,len(RELATIONSHIP_FIELDS)))
 
 def create_fully_connected_network(employees:list[Employee],seed:Optional[int]=None)->EmployeeNetwork:
-    nodes = {}
-    edges = []
-    for i in employees:
-        nodes[i.employee_id] = i
-        for j in employees:
-            if j.employee_id in nodes: # filters out both self and already initialized edges. 
-                continue 
-            edges.append((i.employee_id,j.employee_id,randomize_relationship(seed)))
-    return EmployeeNetwork(employees=nodes,relationships=edges)
\ No newline at end of file
+    # one generator for every edge, reseeding per edge made every relationship identical once a seed was given.
+    n = len(employees)
+    values = random_relationship_values(np.random.default_rng(seed),n*(n-1)//2).tolist()
+    network = EmployeeNetwork(employees={},relationships=[])
+    nodes = [network.add_employee(e) for e in employees]
+    edge = 0
+    for i,n1 in enumerate(nodes):
+        for n2 in nodes[i+1:]:
+            network.add_relationship(n1,n2,EmployeeRelationship.model_construct(**dict(zip(RELATIONSHIP_FIELDS,values[edge]))))
+            edge += 1
+    return network
+
+### sparse topologies, these write straight into an OfficeTable so cost follows the edge count not N^2.
+def _as_table(employees:Union[EmployeeTable,list[Employee]])->EmployeeTable:
+    return employees if isinstance(employees,EmployeeTable) else EmployeeTable.from_employees(employees)
+
+def _unique_edges(src:np.ndarray,dst:np.ndarray,n:int)->tuple[np.ndarray,np.ndarray]:
+    """Drop self loops and repeated pairs (in either direction), edges come back sorted by (low, high) node."""
+    low,high = np.minimum(src,dst),np.maximum(src,dst)
+    keep = low != high
+    keys = np.unique(low[keep].astype(np.int64)*n+high[keep])
+    return keys//n,keys%n
+
+def _office(employees:EmployeeTable,src:np.ndarray,dst:np.ndarray,rng:np.random.Generator)->OfficeTable:
+    office = OfficeTable(employees)
+    office.relationships.reserve(len(src))
+    office.relationships.extend(src,dst,random_relationship_values(rng,len(src)))
+    return office
+
+def create_fully_connected_table(employees:Union[EmployeeTable,list[Employee]],seed:Optional[int]=None)->OfficeTable:
+    """create_fully_connected_network as an OfficeTable, same edge order and, for the same seed, the same values."""
+    table = _as_table(employees)
+    src,dst = np.triu_indices(len(table),k=1)
+    return _office(table,src,dst,np.random.default_rng(seed))
+
+def create_team_network(employees:Union[EmployeeTable,list[Employee]],team_size:int=8,p_within:float=0.8,
+                        cross_links:float=1.0,seed:Optional[int]=None)->OfficeTable:
+    """Consecutive rows form teams of team_size. Team mates are linked with probability p_within and each employee
+    gets on average cross_links random links to people outside their team."""
+    table = _as_table(employees)
+    n = len(table)
+    rng = np.random.default_rng(seed)
+    team = np.arange(n)//team_size
+    # every pair inside a team: pair each row with the later rows of its team
+    a,b = np.triu_indices(team_size,k=1)
+    starts = np.arange(0,n,team_size)
+    src = (starts[:,None]+a).ravel()
+    dst = (starts[:,None]+b).ravel()
+    inside = dst < n
+    src,dst = src[inside],dst[inside]
+    chosen = rng.random(len(src)) < p_within
+    src,dst = src[chosen],dst[chosen]
+    n_cross = int(round(cross_links*n/2))
+    cross_src = rng.integers(0,n,n_cross)
+    cross_dst = rng.integers(0,n,n_cross)
+    other_team = team[cross_src] != team[cross_dst]
+    src,dst = _unique_edges(np.concatenate([src,cross_src[other_team]]),np.concatenate([dst,cross_dst[other_team]]),n)
+    return _office(table,src,dst,rng)
+
+def create_small_world_network(employees:Union[EmployeeTable,list[Employee]],k:int=4,p_rewire:float=0.1,
+                               seed:Optional[int]=None)->OfficeTable:
+    """Watts-Strogatz: a ring where everyone knows their k nearest colleagues, then each edge's far end is moved to a
+    random employee with probability p_rewire. Rewires that land on an existing edge are dropped."""
+    table = _as_table(employees)
+    n = len(table)
+    rng = np.random.default_rng(seed)
+    src = np.repeat(np.arange(n),k//2)
+    dst = (src+np.tile(np.arange(1,k//2+1),n)) % max(n,1)
+    rewire = rng.random(len(src)) < p_rewire
+    dst = np.where(rewire,rng.integers(0,max(n,1),len(src)),dst)
+    src,dst = _unique_edges(src,dst,n)
+    return _office(table,src,dst,rng)
+
+def create_scale_free_network(employees:Union[EmployeeTable,list[Employee]],m:int=2,
+                              seed:Optional[int]=None)->OfficeTable:
+    """Barabasi-Albert preferential attachment: each new employee links to m existing ones picked in proportion to
+    how connected they already are, giving a few very well connected hubs."""
+    table = _as_table(employees)
+    n = len(table)
+    rng = np.random.default_rng(seed)
+    n_edges = max(n-m,0)*m
+    src = np.empty(n_edges,dtype=np.int64)
+    dst = np.empty(n_edges,dtype=np.int64)
+    # every edge end is written here once, so a uniform pick from it is a degree weighted pick
+    ends = np.empty(2*n_edges,dtype=np.int64)
+    size = 0
+    edge = 0
+    for v in range(m,n):
+        if v == m:
+            targets = np.arange(m)
+        else:
+            targets = np.unique(ends[rng.integers(0,size,4*m)])
+            while len(targets) < m:
+                targets = np.unique(np.concatenate([targets,ends[rng.integers(0,size,m)]]))
+            targets = rng.permutation(targets)[:m]
+        src[edge:edge+m] = targets
+        dst[edge:edge+m] = v
+        ends[size:size+m] = targets
+        ends[size+m:size+2*m] = v
+        size += 2*m
+        edge += m
+    return _office(table,src,dst,rng)
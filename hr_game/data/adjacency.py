@@ -0,0 +1,57 @@
+from typing import Hashable, Iterable, Optional, Sequence
+
+import numpy as np
+
+
+class Adjacency:
+  """CSR style incident edge index.
+  Nodes get dense integer ids in insertion order. The edges touching node i are
+  edges[offsets[i]:offsets[i+1]], kept in ascending edge (list) order."""
+  def __init__(self, node_keys: Sequence[Hashable], src: np.ndarray, dst: np.ndarray):
+    self.node_keys = node_keys
+    self._node_ids: Optional[dict] = None
+    self.src = src
+    self.dst = dst
+    n = len(node_keys)
+    edge = np.arange(len(src), dtype=np.int64)
+    loop = src == dst  # a self loop is only incident once
+    ends = np.concatenate([src, dst[~loop]])
+    both = np.concatenate([edge, edge[~loop]])
+    order = np.lexsort((both, ends))
+    self.edges = both[order]
+    self.offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=n), out=self.offsets[1:])
+
+  @classmethod
+  def build(cls, node_keys: Iterable[Hashable], pairs: Iterable[tuple[Hashable, Hashable]]) -> "Adjacency":
+    node_keys = list(node_keys)
+    node_ids = {key: i for i, key in enumerate(node_keys)}
+    flat = np.fromiter((node_ids[key] for pair in pairs for key in pair), dtype=np.int64)
+    adjacency = cls(node_keys, flat[0::2].copy(), flat[1::2].copy())
+    adjacency._node_ids = node_ids
+    return adjacency
+
+  @property
+  def node_ids(self) -> dict:
+    if self._node_ids is None:
+      self._node_ids = {key: i for i, key in enumerate(self.node_keys)}
+    return self._node_ids
+
+  @property
+  def n_nodes(self) -> int:
+    return len(self.node_keys)
+
+  @property
+  def n_edges(self) -> int:
+    return len(self.src)
+
+  @property
+  def degree(self) -> np.ndarray:
+    return np.diff(self.offsets)
+
+  def incident(self, node: int) -> np.ndarray:
+    return self.edges[self.offsets[node]:self.offsets[node + 1]]
+
+  def neighbours(self, node: int) -> np.ndarray:
+    edges = self.incident(node)
+    return np.where(self.src[edges] == node, self.dst[edges], self.src[edges])
@@ -0,0 +1,29 @@
+import numpy as np
+
+
+class ColumnView:
+  """Attribute access over a set of equally sized numpy columns.
+  Lets batched event code read `prior.stress` the same way the scalar pdfs do."""
+  def __init__(self, columns: dict[str, np.ndarray]):
+    self.__dict__["_columns"] = columns
+
+  def __getattr__(self, name: str) -> np.ndarray:
+    try:
+      return self.__dict__["_columns"][name]
+    except KeyError:
+      raise AttributeError(name) from None
+
+  def __len__(self) -> int:
+    for column in self._columns.values():
+      return len(column)
+    return 0
+
+  @property
+  def fields(self) -> list[str]:
+    return list(self._columns)
+
+  def take(self, rows: np.ndarray) -> "ColumnView":
+    return ColumnView({name: column[rows] for name, column in self._columns.items()})
+
+  def row(self, i: int) -> dict:
+    return {name: column[i].item() for name, column in self._columns.items()}
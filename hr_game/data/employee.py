@@ -1,11 +1,20 @@
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from typing import Iterable, Optional
+from uuid import uuid4
 
+from pydantic import BaseModel, Field, PrivateAttr
+
+from hr_game.data.adjacency import Adjacency
 from hr_game.events.utils import sigmoid
 def bound(inp,top,bottom):
   return max(bottom,min(top,inp))
 
+def new_employee_id(name:str)->str:
+  return f"{name}#{uuid4().hex[:12]}"
+
 class Trait(BaseModel):
-  """Traits modify deltas. The name is the field that its referring to. The effect is how it gets modified"""
+  """Traits modify deltas. The name is the field that its referring to. The effect is how it gets modified:
+  a delta to that field is multiplied by effect (several traits on one field multiply)."""
   name:str
   effect: float 
 
@@ -21,8 +30,36 @@ class EmployeeDelta(Delta):
   health:int = Field(...,help="How the health of this employee has changed on a scale (from -100-100).")
   horniness:int = Field(...,help="The horniness of this employee on a scale from 0-100")
   productivity:int = Field(...,help="The productivity of this employee on a scale from 0-100")
+# (bottom, top) enforced by Employee.update, in EmployeeDelta field order
+STAT_BOUNDS = {
+  "stress":(0,100),
+  "greed":(0,100),
+  "salary":(0,100_000_000),
+  "anger":(0,100),
+  "happiness":(0,100),
+  "health":(0,100),
+  "horniness":(0,100),
+  "productivity":(0,100),
+}
+TraitKey = tuple[tuple[str,float],...]
+
+def trait_key(traits:Iterable[Trait])->TraitKey:
+  """Hashable form of a list of traits, what trait_modifiers is cached on."""
+  return tuple((t.name,t.effect) for t in traits)
+
+@lru_cache(maxsize=4096)
+def trait_modifiers(key:TraitKey)->tuple[float,...]:
+  """One multiplier per STAT_BOUNDS field for a trait_key. Employees with the same traits share the entry, so it
+  is only worked out again when an employee's traits change. Traits on other names don't touch stat deltas."""
+  modifiers = dict.fromkeys(STAT_BOUNDS,1.0)
+  for name,effect in key:
+    if name in modifiers:
+      modifiers[name] *= effect
+  return tuple(modifiers.values())
+
 class Employee(BaseModel):
   name:str
+  employee_id:str = Field(default_factory=lambda data: new_employee_id(data.get("name","")),help="Stable identity, assigned once when the employee is created.")
   age: int = Field(...,help="The age of the employee")
   stress: int = Field(0,help="The stress of the employee on a scale from 0-100")
   greed: int = Field(20,help="How much this employee is motivated by greed on a scale from 0-100")
@@ -35,17 +72,13 @@ class Employee(BaseModel):
   context_history:list[str] = Field(default_factory=lambda x: [],help="A list of traits that that employee has.") 
   traits: list[Trait] = Field(default_factory=lambda x: [],help="A list of traits that that employee has.")
   def update(self,other:EmployeeDelta):
-    self.stress = bound(other.stress+self.stress,100,0)
-    self.greed = bound(other.greed+self.greed,100,0)
-    self.salary = bound(other.salary+self.salary,100_000_000,0)
-    self.anger = bound(other.anger + self.anger,100,0)
-    self.health = bound(other.health + self.health,100,0)
-    self.happiness = bound(other.happiness + self.happiness,100,0)
-    self.horniness = bound(other.horniness + self.horniness,100,0)
-    self.productivity = bound(other.productivity + self.productivity,100,0)
-  @property
-  def employee_id(self)->str:
-    return self.name+ str(hash(self.model_dump_json()))
+    if self.traits:
+      # delta * modifier + stat, rounded half to even like EmployeeTable.apply_deltas, then clamped
+      for (field,(bottom,top)),modifier in zip(STAT_BOUNDS.items(),trait_modifiers(trait_key(self.traits))):
+        setattr(self,field,bound(round(getattr(other,field)*modifier)+getattr(self,field),top,bottom))
+      return
+    for field,(bottom,top) in STAT_BOUNDS.items():
+      setattr(self,field,bound(getattr(other,field)+getattr(self,field),top,bottom))
 class EmployeeRelationshipDelta(BaseModel):
   attraction: float =Field(1.0,help="The change in the attraction multiplier between these two employees.")
   resentment: float =Field(1.0,help="The change in the  multiplier for how much these two make each other angry.")
@@ -64,6 +97,47 @@ class EmployeeRelationship(BaseModel):
     self.friendship *=sigmoid(other.friendship, top=2,midpoint=1)
   
 class EmployeeNetwork(BaseModel):
-  employees:dict[str,Employee]
-  relationships:list[tuple[str,str,EmployeeRelationship]]
+  """Employees keyed by dense integer node ids (0..N-1 when built with add_employee), relationships refer to those ids."""
+  employees:dict[int,Employee]
+  relationships:list[tuple[int,int,EmployeeRelationship]]
+  _adjacency:Optional[Adjacency] = PrivateAttr(default=None)
+  _node_of:Optional[dict[str,int]] = PrivateAttr(default=None)
+
+  @property
+  def adjacency(self)->Adjacency:
+    """Incident edge index over the relationships list. Rebuilt lazily when the employees or relationships change,
+    use the add_/set_ methods below rather than editing the containers to keep it in sync."""
+    adjacency = self._adjacency
+    if adjacency is None or adjacency.n_edges != len(self.relationships) or adjacency.n_nodes != len(self.employees):
+      adjacency = self._adjacency = Adjacency.build(self.employees, ((e1,e2) for e1,e2,_ in self.relationships))
+    return adjacency
+
+  def node_id(self,employee_id:str)->int:
+    """The node id of an employee from its stable employee_id."""
+    if self._node_of is None or len(self._node_of) != len(self.employees):
+      self._node_of = {e.employee_id:node for node,e in self.employees.items()}
+    return self._node_of[employee_id]
+
+  def incident_relationships(self,node:int)->list[int]:
+    """Indices into relationships of the edges touching this node, in list order."""
+    adjacency = self.adjacency
+    return adjacency.incident(adjacency.node_ids[node]).tolist()
+
+  def add_employee(self,employee:Employee)->int:
+    node = len(self.employees)
+    while node in self.employees:
+      node += 1
+    self.employees[node] = employee
+    self._adjacency = None
+    self._node_of = None
+    return node
+
+  def add_relationship(self,node1:int,node2:int,relationship:EmployeeRelationship)->int:
+    self.relationships.append((node1,node2,relationship))
+    self._adjacency = None
+    return len(self.relationships)-1
 
+  def set_relationship(self,ridx:int,relationship:EmployeeRelationship):
+    """Swap the relationship on an existing edge. The endpoints are unchanged so the index stays valid."""
+    e1,e2,_ = self.relationships[ridx]
+    self.relationships[ridx] = e1,e2,relationship
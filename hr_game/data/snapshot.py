@@ -0,0 +1,138 @@
+# binary snapshots of an office (and the simulation's rng state) for checkpoint/resume.
+# a snapshot is a directory of raw .npy columns plus meta.json:
+#   age.npy stats.npy names.npy employee_ids.npy   employee columns (names/ids as fixed width unicode)
+#   src.npy dst.npy values.npy                     relationship columns
+#   meta.json                                      counts, network node ids, cycle, rng states, ragged columns
+# .npy columns are loaded memory mapped copy on write, so opening a big office only reads meta.json and the
+# simulation can update the columns without touching the file. meta.json is written last and the directory is
+# swapped in with a rename, so a crash mid save leaves the previous snapshot usable.
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+import random
+import shutil
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from hr_game.data.employee import EmployeeNetwork, Trait
+from hr_game.data.table import EmployeeTable, OfficeTable, RelationshipTable
+
+SNAPSHOT_VERSION = 1
+COLUMNS = ("age", "stats", "names", "employee_ids", "src", "dst", "values")
+
+
+@dataclass
+class Snapshot:
+  office: OfficeTable
+  cycle: int = 0  # cycles already simulated
+  node_ids: Optional[list[int]] = None  # the EmployeeNetwork keys of each row, None when saved from an OfficeTable
+  rng_state: Optional[dict[str, Any]] = None  # numpy bit generator state
+  random_state: Optional[tuple] = None  # random.getstate() for the python engine
+
+  def rng(self) -> np.random.Generator:
+    """A Generator continuing exactly where the saved one stopped (a fresh one if none was saved)."""
+    if self.rng_state is None:
+      return np.random.default_rng()
+    bit_generator = getattr(np.random, self.rng_state["bit_generator"])()
+    bit_generator.state = self.rng_state
+    return np.random.Generator(bit_generator)
+
+  def restore_random(self):
+    if self.random_state is not None:
+      random.setstate(self.random_state)
+
+  def network(self) -> EmployeeNetwork:
+    """Rebuild the pydantic network with its original node ids, this materializes every employee."""
+    node_ids = self.node_ids if self.node_ids is not None else list(range(len(self.office.employees)))
+    relationships = self.office.relationships
+    return EmployeeNetwork(
+      employees=dict(zip(node_ids, self.office.employees)),
+      relationships=[(node_ids[a], node_ids[b], relationships.get(edge)) for edge, (a, b)
+                     in enumerate(zip(relationships.column("src").tolist(), relationships.column("dst").tolist()))],
+    )
+
+
+def _fixed_width(strings: np.ndarray) -> np.ndarray:
+  """StringDType can't be memory mapped, store strings as <U(longest)."""
+  width = max(1, int(np.char.str_len(strings).max())) if len(strings) else 1
+  return strings.astype(f"<U{width}")
+
+
+def _ragged(column: np.ndarray, dump) -> dict[str, list]:
+  return {str(row): [dump(v) for v in values] for row, values in enumerate(column) if values}
+
+
+def save_snapshot(path: Union[str, Path], office: Union[EmployeeNetwork, OfficeTable], cycle: int = 0,
+                  rng: Optional[np.random.Generator] = None, random_state: Optional[tuple] = None) -> Path:
+  """Write office (plus the rng and/or random module state to resume from) to the directory path, replacing it."""
+  path = Path(path)
+  node_ids = None
+  if isinstance(office, EmployeeNetwork):
+    node_ids = list(office.employees)
+    office = OfficeTable.from_network(office)
+  employees, relationships = office.employees, office.relationships
+  tmp = path.with_name(path.name + ".tmp")
+  shutil.rmtree(tmp, ignore_errors=True)
+  tmp.mkdir(parents=True)
+  n = len(employees)
+  columns = {
+    "age": employees.column("age"),
+    "stats": np.asfortranarray(employees.to_numpy()),
+    "names": _fixed_width(employees.column("name")),
+    "employee_ids": _fixed_width(employees.column("employee_id")),
+    "src": relationships.column("src"),
+    "dst": relationships.column("dst"),
+    "values": np.asfortranarray(relationships.to_numpy()),
+  }
+  for name, column in columns.items():
+    np.save(tmp / f"{name}.npy", column)
+  meta = {
+    "version": SNAPSHOT_VERSION,
+    "n_employees": n,
+    "n_relationships": len(relationships),
+    "cycle": cycle,
+    "node_ids": node_ids,
+    "rng_state": rng.bit_generator.state if rng is not None else None,
+    "random_state": random_state,
+    "context_history": _ragged(employees.column("context_history"), str),
+    "traits": _ragged(employees.column("traits"), lambda t: t.model_dump()),
+  }
+  with open(tmp / "meta.json", "w") as f:
+    json.dump(meta, f)
+  old = path.with_name(path.name + ".old")
+  if path.exists():
+    shutil.rmtree(old, ignore_errors=True)
+    os.replace(path, old)
+  os.replace(tmp, path)
+  shutil.rmtree(old, ignore_errors=True)
+  return path
+
+
+def load_snapshot(path: Union[str, Path], mmap: bool = True) -> Snapshot:
+  """Open a snapshot. With mmap the columns are paged in on first use, mmap=False reads them into memory."""
+  path = Path(path)
+  if not (path / "meta.json").exists() and (path.with_name(path.name + ".old") / "meta.json").exists():
+    path = path.with_name(path.name + ".old")  # crashed between the two renames of save_snapshot
+  with open(path / "meta.json") as f:
+    meta = json.load(f)
+  if meta["version"] != SNAPSHOT_VERSION:
+    raise ValueError(f"Unsupported snapshot version {meta['version']}")
+  columns = {name: np.load(path / f"{name}.npy", mmap_mode="c" if mmap else None) for name in COLUMNS}
+  n = meta["n_employees"]
+  context_history = np.full(n, None, dtype=object)
+  for row, values in meta["context_history"].items():
+    context_history[int(row)] = values
+  traits = np.full(n, None, dtype=object)
+  for row, values in meta["traits"].items():
+    traits[int(row)] = [Trait(**t) for t in values]
+  employees = EmployeeTable.from_arrays(columns["names"], columns["employee_ids"], columns["age"], columns["stats"],
+                                        context_history, traits)
+  relationships = RelationshipTable.from_arrays(columns["src"], columns["dst"], columns["values"])
+  random_state = meta["random_state"]
+  if random_state is not None:
+    version, internal, gauss = random_state
+    random_state = (version, tuple(internal), gauss)
+  return Snapshot(office=OfficeTable(employees, relationships), cycle=meta["cycle"], node_ids=meta["node_ids"],
+                  rng_state=meta["rng_state"], random_state=random_state)
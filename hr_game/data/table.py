@@ -0,0 +1,325 @@
+# struct of arrays storage for big offices.
+# every numeric field of Employee and EmployeeRelationship gets its own contiguous typed column. the bounded stats sit
+# side by side in one column major block so a batch of deltas is a single add + clip, and each stat column is still
+# a contiguous 1d view. pydantic objects are only built on demand for callers that want them.
+from typing import Iterable, Optional
+
+import numpy as np
+
+from hr_game.data.adjacency import Adjacency
+from hr_game.data.columns import ColumnView
+from hr_game.data.employee import STAT_BOUNDS, Employee, EmployeeNetwork, EmployeeRelationship, Trait, trait_key, trait_modifiers
+from hr_game.events.utils import sigmoid
+
+STAT_FIELDS = tuple(STAT_BOUNDS)
+STAT_LOWER = np.array([bottom for bottom, _ in STAT_BOUNDS.values()], dtype=np.int64)
+STAT_UPPER = np.array([top for _, top in STAT_BOUNDS.values()], dtype=np.int64)
+RELATIONSHIP_FIELDS = tuple(EmployeeRelationship.model_fields)
+STAT_DTYPE = np.int32  # salary tops out at 100_000_000
+MULTIPLIER_DTYPE = np.float64
+NODE_DTYPE = np.int32
+STRING_DTYPE = np.dtypes.StringDType()
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+  # fixed width strings come from snapshots, widen them so longer names still fit
+  dtype = STRING_DTYPE if array.dtype.kind == "U" else array.dtype
+  grown = np.zeros((capacity,) + array.shape[1:], dtype=dtype, order="F" if array.ndim > 1 else "C")
+  if dtype == object:
+    grown[...] = None  # ragged columns use None for empty, not 0
+  grown[:len(array)] = array
+  return grown
+
+
+class EmployeeTable:
+  """Employees as columns: names, employee_ids, age and the bounded stats.
+  context_history and traits are ragged, they live in object columns where None means empty.
+  Change traits through set / set_traits, they keep the cached trait modifiers in step."""
+  def __init__(self, capacity: int = 0):
+    self._n = 0
+    self._modifiers: Optional[np.ndarray] = None  # (n, len(STAT_FIELDS)) trait multipliers, None when no row has traits
+    self._modifiers_stale = True
+    self.names = np.empty(capacity, dtype=STRING_DTYPE)
+    self.employee_ids = np.empty(capacity, dtype=STRING_DTYPE)
+    self.age = np.zeros(capacity, dtype=STAT_DTYPE)
+    self.stats = np.zeros((capacity, len(STAT_FIELDS)), dtype=STAT_DTYPE, order="F")
+    self.context_history = np.full(capacity, None, dtype=object)
+    self.traits = np.full(capacity, None, dtype=object)
+
+  def __len__(self) -> int:
+    return self._n
+
+  @property
+  def capacity(self) -> int:
+    return len(self.age)
+
+  @property
+  def nbytes(self) -> int:
+    return sum(a.nbytes for a in (self.names, self.employee_ids, self.age, self.stats, self.context_history, self.traits))
+
+  def reserve(self, capacity: int):
+    if capacity <= self.capacity:
+      return
+    for name in ("names", "employee_ids", "age", "stats", "context_history", "traits"):
+      setattr(self, name, _grow(getattr(self, name), capacity))
+
+  def _claim(self, n: int) -> slice:
+    if self._n + n > self.capacity:
+      self.reserve(max(self._n + n, 2 * self.capacity, 16))
+    rows = slice(self._n, self._n + n)
+    self._n += n
+    self._modifiers_stale = True
+    return rows
+
+  def append(self, employee: Employee) -> int:
+    row = self._claim(1).start
+    self.set(row, employee)
+    return row
+
+  def extend(self, names: Iterable[str], employee_ids: Iterable[str], age: np.ndarray, stats: np.ndarray) -> slice:
+    """Bulk append straight from arrays, stats is (n, len(STAT_FIELDS)) in STAT_FIELDS order."""
+    rows = self._claim(len(age))
+    self.names[rows] = names
+    self.employee_ids[rows] = employee_ids
+    self.age[rows] = age
+    self.stats[rows] = np.clip(stats, STAT_LOWER, STAT_UPPER)
+    return rows
+
+  @classmethod
+  def from_arrays(cls, names: np.ndarray, employee_ids: np.ndarray, age: np.ndarray, stats: np.ndarray,
+                  context_history: Optional[np.ndarray] = None, traits: Optional[np.ndarray] = None) -> "EmployeeTable":
+    """Wrap existing (possibly memory mapped) columns without copying, they become the table's storage."""
+    table = cls()
+    table.names, table.employee_ids, table.age, table.stats = names, employee_ids, age, stats
+    table.context_history = context_history if context_history is not None else np.full(len(age), None, dtype=object)
+    table.traits = traits if traits is not None else np.full(len(age), None, dtype=object)
+    table._n = len(age)
+    table._modifiers_stale = True
+    return table
+
+  @classmethod
+  def from_employees(cls, employees: Iterable[Employee]) -> "EmployeeTable":
+    employees = list(employees)
+    table = cls(len(employees))
+    for e in employees:
+      table.append(e)
+    return table
+
+  def set(self, row: int, employee: Employee):
+    self.names[row] = employee.name
+    self.employee_ids[row] = employee.employee_id
+    self.age[row] = employee.age
+    self.stats[row] = np.clip([getattr(employee, f) for f in STAT_FIELDS], STAT_LOWER, STAT_UPPER)
+    self.context_history[row] = list(employee.context_history) or None
+    self.set_traits(row, employee.traits)
+
+  def set_traits(self, row: int, traits: Iterable[Trait]):
+    self.traits[row] = list(traits) or None
+    if self._modifiers_stale:
+      return
+    if self._modifiers is not None:
+      self._modifiers[row] = trait_modifiers(trait_key(self.traits[row] or ()))
+    elif self.traits[row]:
+      self._modifiers_stale = True
+
+  def modifiers(self) -> Optional[np.ndarray]:
+    """Per row trait multipliers for every stat delta, (n, len(STAT_FIELDS)). Built on first use and kept until
+    traits change, None while no employee has traits (apply_deltas then skips the multiply)."""
+    if self._modifiers_stale:
+      traits = self.traits[:self._n]
+      rows = np.flatnonzero(traits != None)
+      self._modifiers = None
+      if len(rows):
+        self._modifiers = np.ones((self._n, len(STAT_FIELDS)), dtype=np.float64)
+        self._modifiers[rows] = [trait_modifiers(trait_key(traits[row])) for row in rows]
+      self._modifiers_stale = False
+    return self._modifiers
+
+  def get(self, row: int) -> Employee:
+    """A pydantic copy of one row, write it back with set."""
+    if not 0 <= row < self._n:
+      raise IndexError(row)
+    return Employee.model_construct(
+      name=str(self.names[row]),
+      employee_id=str(self.employee_ids[row]),
+      age=int(self.age[row]),
+      context_history=list(self.context_history[row] or []),
+      traits=list(self.traits[row] or []),
+      **dict(zip(STAT_FIELDS, self.stats[row].tolist())),
+    )
+
+  def __iter__(self):
+    return (self.get(row) for row in range(self._n))
+
+  def column(self, name: str) -> np.ndarray:
+    """Zero copy view of one field over the filled rows."""
+    if name in STAT_FIELDS:
+      return self.stats[:self._n, STAT_FIELDS.index(name)]
+    if name in ("names", "name"):
+      return self.names[:self._n]
+    if name == "employee_id":
+      return self.employee_ids[:self._n]
+    if name in ("age", "context_history", "traits"):
+      return getattr(self, name)[:self._n]
+    raise KeyError(name)
+
+  def to_numpy(self) -> np.ndarray:
+    """The (n, len(STAT_FIELDS)) stat block, zero copy."""
+    return self.stats[:self._n]
+
+  def view(self, rows: Optional[np.ndarray] = None) -> ColumnView:
+    """Age and stats for batch_pdf. Selecting rows copies, the whole table does not."""
+    age, stats = (self.age[:self._n], self.to_numpy()) if rows is None else (self.age[rows], self.stats[rows])
+    return ColumnView({"age": age, **{f: stats[:, j] for j, f in enumerate(STAT_FIELDS)}})
+
+  def apply_deltas(self, rows: np.ndarray, deltas: np.ndarray):
+    """Employee.update for many rows: one add and clip into the stat bounds, with a multiply by the trait
+    modifiers first when any employee has traits. rows must be unique."""
+    modifiers = self.modifiers()
+    if modifiers is not None:
+      deltas = np.rint(deltas * modifiers[rows])
+    self.stats[rows] = np.clip(self.stats[rows] + deltas, STAT_LOWER, STAT_UPPER)
+
+  def to_pandas(self, strings: bool = False):
+    """DataFrame sharing memory with the numeric columns. strings=True adds name/employee_id, those are copied."""
+    import pandas as pd
+    columns = {"age": self.column("age"), **{f: self.column(f) for f in STAT_FIELDS}}
+    if strings:
+      columns = {"name": self.column("name").astype(object), "employee_id": self.column("employee_id").astype(object), **columns}
+    return pd.DataFrame(columns, copy=False)
+
+
+class RelationshipTable:
+  """Edges as columns: src/dst row ids and the four multipliers in one column major block."""
+  def __init__(self, capacity: int = 0):
+    self._n = 0
+    self.src = np.zeros(capacity, dtype=NODE_DTYPE)
+    self.dst = np.zeros(capacity, dtype=NODE_DTYPE)
+    self.values = np.zeros((capacity, len(RELATIONSHIP_FIELDS)), dtype=MULTIPLIER_DTYPE, order="F")
+
+  def __len__(self) -> int:
+    return self._n
+
+  @property
+  def capacity(self) -> int:
+    return len(self.src)
+
+  @property
+  def nbytes(self) -> int:
+    return self.src.nbytes + self.dst.nbytes + self.values.nbytes
+
+  def reserve(self, capacity: int):
+    if capacity <= self.capacity:
+      return
+    for name in ("src", "dst", "values"):
+      setattr(self, name, _grow(getattr(self, name), capacity))
+
+  def _claim(self, n: int) -> slice:
+    if self._n + n > self.capacity:
+      self.reserve(max(self._n + n, 2 * self.capacity, 16))
+    edges = slice(self._n, self._n + n)
+    self._n += n
+    return edges
+
+  def append(self, src: int, dst: int, relationship: EmployeeRelationship) -> int:
+    edge = self._claim(1).start
+    self.src[edge] = src
+    self.dst[edge] = dst
+    self.set(edge, relationship)
+    return edge
+
+  def extend(self, src: np.ndarray, dst: np.ndarray, values: np.ndarray) -> slice:
+    """Bulk append, values is (n, 4) in RELATIONSHIP_FIELDS order."""
+    edges = self._claim(len(src))
+    self.src[edges] = src
+    self.dst[edges] = dst
+    self.values[edges] = values
+    return edges
+
+  @classmethod
+  def from_arrays(cls, src: np.ndarray, dst: np.ndarray, values: np.ndarray) -> "RelationshipTable":
+    """Wrap existing (possibly memory mapped) columns without copying."""
+    table = cls()
+    table.src, table.dst, table.values = src, dst, values
+    table._n = len(src)
+    return table
+
+  def set(self, edge: int, relationship: EmployeeRelationship):
+    self.values[edge] = [getattr(relationship, f) for f in RELATIONSHIP_FIELDS]
+
+  def get(self, edge: int) -> EmployeeRelationship:
+    if not 0 <= edge < self._n:
+      raise IndexError(edge)
+    return EmployeeRelationship.model_construct(**dict(zip(RELATIONSHIP_FIELDS, self.values[edge].tolist())))
+
+  def column(self, name: str) -> np.ndarray:
+    if name in RELATIONSHIP_FIELDS:
+      return self.values[:self._n, RELATIONSHIP_FIELDS.index(name)]
+    if name in ("src", "dst"):
+      return getattr(self, name)[:self._n]
+    raise KeyError(name)
+
+  def to_numpy(self) -> np.ndarray:
+    return self.values[:self._n]
+
+  def view(self, edges: Optional[np.ndarray] = None) -> ColumnView:
+    values = self.to_numpy() if edges is None else self.values[edges]
+    return ColumnView({f: values[:, j] for j, f in enumerate(RELATIONSHIP_FIELDS)})
+
+  def apply_deltas(self, edges: np.ndarray, deltas: np.ndarray):
+    """EmployeeRelationship.update for many edges at once."""
+    self.values[edges] *= sigmoid(deltas, top=2, midpoint=1)
+
+  def to_pandas(self):
+    import pandas as pd
+    return pd.DataFrame({"src": self.column("src"), "dst": self.column("dst"),
+                         **{f: self.column(f) for f in RELATIONSHIP_FIELDS}}, copy=False)
+
+
+class OfficeTable:
+  """The columnar counterpart of EmployeeNetwork, employee rows double as node ids."""
+  def __init__(self, employees: Optional[EmployeeTable] = None, relationships: Optional[RelationshipTable] = None):
+    self.employees = employees if employees is not None else EmployeeTable()
+    self.relationships = relationships if relationships is not None else RelationshipTable()
+    self._adjacency: Optional[Adjacency] = None
+
+  @property
+  def nbytes(self) -> int:
+    return self.employees.nbytes + self.relationships.nbytes
+
+  @property
+  def adjacency(self) -> Adjacency:
+    """Incident edge index, rebuilt when rows or edges were added since it was built."""
+    adjacency = self._adjacency
+    if adjacency is None or adjacency.n_edges != len(self.relationships) or adjacency.n_nodes != len(self.employees):
+      adjacency = self._adjacency = Adjacency(range(len(self.employees)),
+                                              self.relationships.column("src"), self.relationships.column("dst"))
+    return adjacency
+
+  @classmethod
+  def from_network(cls, network: EmployeeNetwork) -> "OfficeTable":
+    """Rows follow network.employees order and edges follow network.relationships order."""
+    employees = EmployeeTable.from_employees(network.employees.values())
+    row_of = {node: row for row, node in enumerate(network.employees)}
+    relationships = RelationshipTable(len(network.relationships))
+    for n1, n2, r in network.relationships:
+      relationships.append(row_of[n1], row_of[n2], r)
+    return cls(employees, relationships)
+
+  def to_network(self) -> EmployeeNetwork:
+    network = EmployeeNetwork(employees={}, relationships=[])
+    for employee in self.employees:
+      network.add_employee(employee)
+    for edge, (n1, n2) in enumerate(zip(self.relationships.column("src").tolist(), self.relationships.column("dst").tolist())):
+      network.add_relationship(n1, n2, self.relationships.get(edge))
+    return network
+
+  def write_back(self, network: EmployeeNetwork) -> EmployeeNetwork:
+    """Copy stats and multipliers onto the network this table was built from, keeping its objects."""
+    for employee, stats in zip(network.employees.values(), self.employees.to_numpy().tolist()):
+      for f, value in zip(STAT_FIELDS, stats):
+        setattr(employee, f, value)
+    for (_, _, relationship), values in zip(network.relationships, self.relationships.to_numpy().tolist()):
+      for f, value in zip(RELATIONSHIP_FIELDS, values):
+        setattr(relationship, f, value)
+    return network
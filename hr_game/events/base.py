@@ -1,7 +1,52 @@
 from abc import ABC, abstractmethod
+import numpy as np
 from pydantic import BaseModel
+from hr_game.data.columns import ColumnView
 from hr_game.data.employee import Delta, Employee, EmployeeDelta, EmployeeRelationship, EmployeeRelationshipDelta
 
+EMPLOYEE_DELTA_FIELDS = tuple(EmployeeDelta.model_fields)
+RELATIONSHIP_FIELDS = tuple(EmployeeRelationshipDelta.model_fields)
+
+
+def delta_to_array(delta: BaseModel) -> np.ndarray:
+    """Flatten a single delta into a row ordered like its model fields."""
+    fields = type(delta).model_fields
+    dtype = np.float64 if isinstance(delta, EmployeeRelationshipDelta) else np.int64
+    return np.array([getattr(delta, f) for f in fields], dtype=dtype)
+
+
+def _delta_array(n: int, field_names: tuple[str, ...], dtype, fields: dict) -> np.ndarray:
+    out = np.empty((n, len(field_names)), dtype=dtype)
+    for j, name in enumerate(field_names):
+        out[:, j] = fields[name]
+    return out
+
+
+def employee_delta_array(n: int, **fields) -> np.ndarray:
+    """Batched EmployeeDelta. Each field is a scalar or a length n array, the result is (n, len(EMPLOYEE_DELTA_FIELDS))."""
+    return _delta_array(n, EMPLOYEE_DELTA_FIELDS, np.int64, fields)
+
+
+def relationship_delta_array(n: int, **fields) -> np.ndarray:
+    """Batched EmployeeRelationshipDelta, see employee_delta_array."""
+    return _delta_array(n, RELATIONSHIP_FIELDS, np.float64, fields)
+
+
+def array_to_employee_delta(row: np.ndarray) -> EmployeeDelta:
+    return EmployeeDelta(**dict(zip(EMPLOYEE_DELTA_FIELDS, row.tolist())))
+
+
+def array_to_relationship_delta(row: np.ndarray) -> EmployeeRelationshipDelta:
+    return EmployeeRelationshipDelta(**dict(zip(RELATIONSHIP_FIELDS, row.tolist())))
+
+
+def _employee_rows(prior: ColumnView) -> list[Employee]:
+    return [Employee.model_construct(**{"name": "", "employee_id": "", **prior.row(i)}) for i in range(len(prior))]
+
+
+def _relationship_rows(prior: ColumnView) -> list[EmployeeRelationship]:
+    return [EmployeeRelationship.model_construct(**prior.row(i)) for i in range(len(prior))]
+
 
 class Event(ABC):
     @staticmethod
@@ -30,7 +75,14 @@ class EmployeeEvent(Event):
     def description(result: EmployeeDelta) -> str:
         """A human readable description of the employee event"""
         pass
-    
+
+    @classmethod
+    def batch_pdf(cls, prior: ColumnView, random_var: np.ndarray) -> np.ndarray:
+        """The pdf over many employees at once, one row of deltas per employee.
+        The default calls pdf row by row, override it with array maths for speed."""
+        rows = _employee_rows(prior)
+        return np.array([delta_to_array(cls.pdf(e, random_var=float(r))) for e, r in zip(rows, random_var)],
+                        dtype=np.int64).reshape(len(rows), len(EMPLOYEE_DELTA_FIELDS))
 
 
 class EmployeeEffectingEvent(Event):
@@ -45,7 +97,16 @@ class EmployeeEffectingEvent(Event):
     def description(result: EmployeeDelta) -> str:
         """A human readable description of the employee event"""
         pass
-    
+
+    @classmethod
+    def batch_pdf(cls, prior: tuple[ColumnView,ColumnView], random_var: np.ndarray) -> np.ndarray:
+        """Batched pdf over (relationship, employee) pairs. Falls back to pdf row by row."""
+        relationships, employees = _relationship_rows(prior[0]), _employee_rows(prior[1])
+        return np.array([delta_to_array(cls.pdf((r, e), random_var=float(x)))
+                         for r, e, x in zip(relationships, employees, random_var)],
+                        dtype=np.int64).reshape(len(employees), len(EMPLOYEE_DELTA_FIELDS))
+
+
 class EmployeeRelationshipEvent(Event):
     @staticmethod
     @abstractmethod
@@ -57,4 +118,12 @@ class EmployeeRelationshipEvent(Event):
     @abstractmethod
     def description(result: EmployeeRelationshipDelta) -> str:
         """A human readable description of the employee event"""
-        pass
\ No newline at end of file
+        pass
+
+    @classmethod
+    def batch_pdf(cls, prior: tuple[ColumnView,ColumnView,ColumnView], random_var: np.ndarray) -> np.ndarray:
+        """Batched pdf over (relationship, employee, employee) triples. Falls back to pdf row by row."""
+        relationships, e1s, e2s = _relationship_rows(prior[0]), _employee_rows(prior[1]), _employee_rows(prior[2])
+        return np.array([delta_to_array(cls.pdf((r, e1, e2), random_var=float(x)))
+                         for r, e1, e2, x in zip(relationships, e1s, e2s, random_var)],
+                        dtype=np.float64).reshape(len(relationships), len(RELATIONSHIP_FIELDS))
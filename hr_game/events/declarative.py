@@ -0,0 +1,229 @@
+# declarative events.
+# most events are "if some condition on the stats and the random var holds return this delta, else the null delta".
+# instead of writing pdf (and a matching batch_pdf) by hand, an event declares
+#   when      : a condition expression
+#   delta     : field -> value or expression
+#   otherwise : the delta when the condition fails
+# and both pdf and batch_pdf are compiled from the same expressions, so the scalar and numpy paths can't drift apart.
+# expressions are built from the prior's attributes, e.g. (employee.stress < 80) & (relationship.friendship > random_var)
+from abc import ABC, abstractmethod
+import operator
+from typing import Any, Callable, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+from hr_game.data.employee import EmployeeDelta, EmployeeRelationshipDelta
+from hr_game.events.base import (EMPLOYEE_DELTA_FIELDS, RELATIONSHIP_FIELDS, EmployeeEffectingEvent, EmployeeEvent,
+                                 EmployeeRelationshipEvent, employee_delta_array, relationship_delta_array)
+
+Env = dict[str, Any]
+
+
+class Expr(ABC):
+    """A node of an event expression. compile(batch) turns it into a function of the event's env
+    (source name -> pydantic object for pdf, or ColumnView for batch_pdf, plus "random_var")."""
+    @abstractmethod
+    def compile(self, batch: bool) -> Callable[[Env], Any]:
+        pass
+
+    def __bool__(self):
+        raise TypeError("Event expressions can't be used as a bool, combine conditions with & | ~ and no chained comparisons")
+
+    def __add__(self, other): return BinOp(operator.add, self, other)
+    def __radd__(self, other): return BinOp(operator.add, other, self)
+    def __sub__(self, other): return BinOp(operator.sub, self, other)
+    def __rsub__(self, other): return BinOp(operator.sub, other, self)
+    def __mul__(self, other): return BinOp(operator.mul, self, other)
+    def __rmul__(self, other): return BinOp(operator.mul, other, self)
+    def __truediv__(self, other): return BinOp(operator.truediv, self, other)
+    def __rtruediv__(self, other): return BinOp(operator.truediv, other, self)
+    def __floordiv__(self, other): return BinOp(operator.floordiv, self, other)
+    def __rfloordiv__(self, other): return BinOp(operator.floordiv, other, self)
+    def __gt__(self, other): return BinOp(operator.gt, self, other)
+    def __ge__(self, other): return BinOp(operator.ge, self, other)
+    def __lt__(self, other): return BinOp(operator.lt, self, other)
+    def __le__(self, other): return BinOp(operator.le, self, other)
+    def __and__(self, other): return BinOp(operator.and_, self, other)
+    def __rand__(self, other): return BinOp(operator.and_, other, self)
+    def __or__(self, other): return BinOp(operator.or_, self, other)
+    def __ror__(self, other): return BinOp(operator.or_, other, self)
+    def __neg__(self): return Call(operator.neg, operator.neg, self)
+    def __invert__(self): return Call(operator.not_, np.logical_not, self)
+
+
+def as_expr(value) -> Expr:
+    return value if isinstance(value, Expr) else Const(value)
+
+
+class Const(Expr):
+    def __init__(self, value):
+        self.value = value
+
+    def compile(self, batch: bool):
+        value = self.value
+        return lambda env: value
+
+
+class Attr(Expr):
+    def __init__(self, source: str, field: str):
+        self.source = source
+        self.field = field
+
+    def compile(self, batch: bool):
+        source, field = self.source, self.field
+        return lambda env: getattr(env[source], field)
+
+
+class RandomVar(Expr):
+    def compile(self, batch: bool):
+        return lambda env: env["random_var"]
+
+
+class BinOp(Expr):
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = as_expr(left)
+        self.right = as_expr(right)
+
+    def compile(self, batch: bool):
+        op, left, right = self.op, self.left.compile(batch), self.right.compile(batch)
+        return lambda env: op(left(env), right(env))
+
+
+class Call(Expr):
+    """A function with a scalar and a numpy implementation."""
+    def __init__(self, scalar_fn, batch_fn, *args):
+        self.scalar_fn = scalar_fn
+        self.batch_fn = batch_fn
+        self.args = [as_expr(a) for a in args]
+
+    def compile(self, batch: bool):
+        fn = self.batch_fn if batch else self.scalar_fn
+        args = [a.compile(batch) for a in self.args]
+        if len(args) == 1:
+            arg, = args
+            return lambda env: fn(arg(env))
+        return lambda env: fn(*(a(env) for a in args))
+
+
+def minimum(a, b) -> Expr:
+    return Call(min, np.minimum, a, b)
+
+
+def maximum(a, b) -> Expr:
+    return Call(max, np.maximum, a, b)
+
+
+def trunc(a) -> Expr:
+    """int(a), truncating toward zero."""
+    return Call(int, lambda x: np.trunc(x).astype(np.int64), a)
+
+
+class Source:
+    """Attribute access on a part of the prior builds an Attr expression, e.g. employee.stress."""
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, field: str) -> Attr:
+        if field.startswith("_"):
+            raise AttributeError(field)
+        return Attr(self._name, field)
+
+
+employee = Source("employee")
+relationship = Source("relationship")
+employee1 = Source("employee1")
+employee2 = Source("employee2")
+random_var = RandomVar()
+
+DeltaSpec = Union[BaseModel, dict[str, Any]]
+
+
+class _DeclarativeEvent:
+    """Compiles when/delta/otherwise into pdf and batch_pdf when a subclass defines delta."""
+    when: Optional[Expr] = None  # None fires every time
+    delta: Optional[DeltaSpec] = None
+    otherwise: Optional[DeltaSpec] = None
+    _sources: tuple[str, ...] = ()
+    _delta_model: type[BaseModel] = EmployeeDelta
+    _fields: tuple[str, ...] = EMPLOYEE_DELTA_FIELDS
+    _delta_array = staticmethod(employee_delta_array)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.delta is None:
+            return
+        if cls.when is not None and cls.otherwise is None:
+            raise TypeError(f"{cls.__name__} has a condition so it needs an otherwise delta")
+        pdf, batch_pdf = _compile(cls)
+        cls.pdf = staticmethod(pdf)
+        cls.batch_pdf = staticmethod(batch_pdf)
+
+
+def _delta_exprs(spec: DeltaSpec, fields: tuple[str, ...]) -> dict[str, Expr]:
+    values = {f: getattr(spec, f) for f in fields} if isinstance(spec, BaseModel) else spec
+    missing = set(fields) - set(values)
+    if missing:
+        raise TypeError(f"delta is missing {sorted(missing)}")
+    return {f: as_expr(values[f]) for f in fields}
+
+
+def _compile(cls) -> tuple[Callable, Callable]:
+    sources, model, fields, delta_array = cls._sources, cls._delta_model, cls._fields, cls._delta_array
+    branches = [_delta_exprs(cls.delta, fields)] + ([_delta_exprs(cls.otherwise, fields)] if cls.when is not None else [])
+    scalar_branches = [{f: e.compile(False) for f, e in branch.items()} for branch in branches]
+    # a branch made only of constants is one row that np.where broadcasts
+    const_rows = [delta_array(1, **{f: e.value for f, e in branch.items()})
+                  if all(isinstance(e, Const) for e in branch.values()) else None for branch in branches]
+    for row in const_rows:
+        if row is not None:
+            row.setflags(write=False)
+    batch_branches = [{f: e.compile(True) for f, e in branch.items()} for branch in branches]
+    scalar_when = cls.when.compile(False) if cls.when is not None else None
+    batch_when = cls.when.compile(True) if cls.when is not None else None
+
+    def env_of(prior, random_var) -> Env:
+        env = dict(zip(sources, prior)) if len(sources) > 1 else {sources[0]: prior}
+        env["random_var"] = random_var
+        return env
+
+    def pdf(prior, random_var: float):
+        env = env_of(prior, random_var)
+        branch = scalar_branches[0] if scalar_when is None or scalar_when(env) else scalar_branches[1]
+        return model(**{f: fn(env) for f, fn in branch.items()})
+
+    def batch_rows(i: int, env: Env, n: int) -> np.ndarray:
+        if const_rows[i] is not None:
+            return const_rows[i]
+        return delta_array(n, **{f: fn(env) for f, fn in batch_branches[i].items()})
+
+    def batch_pdf(prior, random_var: np.ndarray) -> np.ndarray:
+        env = env_of(prior, random_var)
+        n = len(random_var)
+        fired = batch_rows(0, env, n)
+        if batch_when is None:
+            # a constant row is shared by every call, always hand back a copy of it
+            return np.broadcast_to(fired, (n, len(fields))).copy() if const_rows[0] is not None or len(fired) != n else fired
+        condition = np.broadcast_to(batch_when(env), (n,))
+        return np.where(condition[:, None], fired, batch_rows(1, env, n))
+
+    return pdf, batch_pdf
+
+
+class DeclarativeEmployeeEvent(_DeclarativeEvent, EmployeeEvent):
+    """Expressions see `employee` and `random_var`."""
+    _sources = ("employee",)
+
+
+class DeclarativeEmployeeEffectingEvent(_DeclarativeEvent, EmployeeEffectingEvent):
+    """Expressions see `relationship`, `employee` and `random_var`."""
+    _sources = ("relationship", "employee")
+
+
+class DeclarativeRelationshipEvent(_DeclarativeEvent, EmployeeRelationshipEvent):
+    """Expressions see `relationship`, `employee1`, `employee2` and `random_var`."""
+    _sources = ("relationship", "employee1", "employee2")
+    _delta_model = EmployeeRelationshipDelta
+    _fields = RELATIONSHIP_FIELDS
+    _delta_array = staticmethod(relationship_delta_array)
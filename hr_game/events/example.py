@@ -1,6 +1,11 @@
-# lets do some employee events: 
+# lets do some employee events:
+# most of these are declarative (see hr_game.events.declarative), pdf and batch_pdf get compiled from when/delta/otherwise.
+import numpy as np
+from hr_game.data.columns import ColumnView
 from hr_game.data.employee import Employee, EmployeeDelta, EmployeeRelationship, EmployeeRelationshipDelta
-from hr_game.events.base import EmployeeEffectingEvent, EmployeeEvent, EmployeeRelationshipEvent
+from hr_game.events.base import EmployeeEffectingEvent, delta_to_array
+from hr_game.events.declarative import (DeclarativeEmployeeEffectingEvent, DeclarativeEmployeeEvent, DeclarativeRelationshipEvent,
+                                        employee, employee1, employee2, minimum, random_var, relationship, trunc)
 
 def null_delta_factory()->EmployeeDelta:
     return EmployeeDelta(stress=0,
@@ -19,179 +24,153 @@ def null_relationship_delta_factory()->EmployeeRelationshipDelta:
         synergy=1,
         friendship=1,
     )
-class HasABaby(EmployeeEvent):
-    @staticmethod
-    def pdf(prior:Employee,random_var:float)->EmployeeDelta:
-        if prior.horniness>50 and 40>prior.age>10 and random_var>0.5:
-            return EmployeeDelta(
-                stress=10,
-                happiness=20,
-                health=-10,
-                greed=20,
-                salary=0,
-                horniness=-50,
-                anger=0,
-                productivity=-10
+# batched events return np.where(fired, delta, NULL_DELTA) with one row per employee/edge.
+NULL_DELTA = delta_to_array(null_delta_factory())
+NULL_RELATIONSHIP_DELTA = delta_to_array(null_relationship_delta_factory())
+class HasABaby(DeclarativeEmployeeEvent):
+    when = (employee.horniness>50) & (employee.age<40) & (employee.age>10) & (random_var>0.5)
+    delta = dict(
+        stress=10,
+        happiness=20,
+        health=-10,
+        greed=20,
+        salary=0,
+        horniness=-50,
+        anger=0,
+        productivity=-10
+    )
+    otherwise = null_delta_factory()
 
-            )
-        return null_delta_factory()
-    
     @staticmethod
     def description(result:EmployeeDelta)->str:
         return "They had a kid! Its looks just like them."
-class BadDayAtWork(EmployeeEvent):
-    @staticmethod
-    def pdf(prior:Employee,random_var:float)->EmployeeDelta:
-        if random_var>0.8:
-            return EmployeeDelta(
-                stress=10,
-                happiness=-10,
-                health=0,
-                greed=0,
-                salary=0,
-                horniness=10,
-                anger=10,
-                productivity=-5
+class BadDayAtWork(DeclarativeEmployeeEvent):
+    when = random_var>0.8
+    delta = dict(
+        stress=10,
+        happiness=-10,
+        health=0,
+        greed=0,
+        salary=0,
+        horniness=10,
+        anger=10,
+        productivity=-5
+    )
+    otherwise = null_delta_factory()
 
-            )
-        return null_delta_factory()
-    
     @staticmethod
     def description(result:EmployeeDelta)->str:
         return "Ugh today sucked."
-    
-class GoodDayAtWork(EmployeeEvent):
-    @staticmethod
-    def pdf(prior:Employee,random_var:float)->EmployeeDelta:
-        if random_var>0.8:
-            return EmployeeDelta(
-                stress=-10,
-                happiness=10,
-                health=0,
-                greed=0,
-                salary=0,
-                horniness=-10,
-                anger=-10,
-                productivity=0
 
-            )
-        return null_delta_factory()
-    
+class GoodDayAtWork(DeclarativeEmployeeEvent):
+    when = random_var>0.8
+    delta = dict(
+        stress=-10,
+        happiness=10,
+        health=0,
+        greed=0,
+        salary=0,
+        horniness=-10,
+        anger=-10,
+        productivity=0
+    )
+    otherwise = null_delta_factory()
+
     @staticmethod
     def description(result:EmployeeDelta)->str:
         return "Ugh today rocked!."
-### gpt contributed 
-class CoffeeBreak(EmployeeEvent):
-    @staticmethod
-    def pdf(prior: Employee, random_var: float) -> EmployeeDelta:
-        # If already very stressed, coffee helps more
-        stress_relief = min(10, prior.stress // 2)
-        if random_var > 0.3:
-            return EmployeeDelta(
-                stress=-stress_relief,
-                happiness=5,
-                health=0,
-                greed=0,
-                salary=0,
-                horniness=0,
-                anger=0,
-                productivity=5
-            )
-        return null_delta_factory()
+### gpt contributed
+class CoffeeBreak(DeclarativeEmployeeEvent):
+    # If already very stressed, coffee helps more
+    when = random_var > 0.3
+    delta = dict(
+        stress=-minimum(10, employee.stress // 2),
+        happiness=5,
+        health=0,
+        greed=0,
+        salary=0,
+        horniness=0,
+        anger=0,
+        productivity=5
+    )
+    otherwise = null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "They took a coffee break and feel a bit better."
 
 
-class OfficeGossip(EmployeeEvent):
-    @staticmethod
-    def pdf(prior: Employee, random_var: float) -> EmployeeDelta:
-        # Gossip affects angry employees more
-        anger_increase = 5 + prior.anger // 10
-        happiness_loss = 2 + prior.happiness // 20
-        if random_var > 0.6:
-            return EmployeeDelta(
-                stress=2,
-                happiness=-happiness_loss,
-                health=0,
-                greed=0,
-                salary=0,
-                horniness=0,
-                anger=anger_increase,
-                productivity=0
-            )
-        return null_delta_factory()
+class OfficeGossip(DeclarativeEmployeeEvent):
+    # Gossip affects angry employees more
+    when = random_var > 0.6
+    delta = dict(
+        stress=2,
+        happiness=-(2 + employee.happiness // 20),
+        health=0,
+        greed=0,
+        salary=0,
+        horniness=0,
+        anger=5 + employee.anger // 10,
+        productivity=0
+    )
+    otherwise = null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "They got caught up in office gossip. Drama everywhere!"
 
 
-class Promotion(EmployeeEvent):
-    @staticmethod
-    def pdf(prior: Employee, random_var: float) -> EmployeeDelta:
-        # If very greedy, promotion feels better
-        happiness_boost = 20 + prior.greed // 5
-        stress_increase = 5 + prior.stress // 10
-        if random_var > 0.9:
-            return EmployeeDelta(
-                stress=stress_increase,
-                happiness=happiness_boost,
-                health=0,
-                greed=-10,
-                salary=20_000,
-                horniness=0,
-                anger=0,
-                productivity=10
-            )
-        return null_delta_factory()
+class Promotion(DeclarativeEmployeeEvent):
+    # If very greedy, promotion feels better
+    when = random_var > 0.9
+    delta = dict(
+        stress=5 + employee.stress // 10,
+        happiness=20 + employee.greed // 5,
+        health=0,
+        greed=-10,
+        salary=20_000,
+        horniness=0,
+        anger=0,
+        productivity=10
+    )
+    otherwise = null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "Congratulations! They got promoted and their salary increased."
 
 
-class MissedDeadline(EmployeeEvent):
-    @staticmethod
-    def pdf(prior: Employee, random_var: float) -> EmployeeDelta:
-        # If already stressed, missing a deadline is worse
-        stress_increase = 10 + prior.stress // 5
-        happiness_loss = 10 + prior.happiness // 10
-        if random_var > 0.5:
-            return EmployeeDelta(
-                stress=stress_increase,
-                happiness=-happiness_loss,
-                health=-5,
-                greed=0,
-                salary=0,
-                horniness=0,
-                anger=10,
-                productivity=-10
-            )
-        return null_delta_factory()
+class MissedDeadline(DeclarativeEmployeeEvent):
+    # If already stressed, missing a deadline is worse
+    when = random_var > 0.5
+    delta = dict(
+        stress=10 + employee.stress // 5,
+        happiness=-(10 + employee.happiness // 10),
+        health=-5,
+        greed=0,
+        salary=0,
+        horniness=0,
+        anger=10,
+        productivity=-10
+    )
+    otherwise = null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "They missed a deadline and feel awful."
-# create event for network. 
+# create event for network.
 
-class EnteringFlowState(EmployeeEffectingEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship,Employee], random_var: float) -> EmployeeDelta:
-        relationship,employee = prior
-        productivity_increase = int(1+relationship.synergy)*10 
-        stress_decrease = -int((relationship.synergy)*employee.stress/100)
-        return EmployeeDelta(stress=stress_decrease,
-                             greed=0,
-                             salary=0,
-                             anger=0,
-                             happiness=0,
-                             health=0,
-                             horniness=0,
-                             productivity=productivity_increase
-                             )
-        
+class EnteringFlowState(DeclarativeEmployeeEffectingEvent):
+    # always fires, int() truncates so trunc rather than floor
+    delta = dict(stress=-trunc(relationship.synergy*employee.stress/100),
+                 greed=0,
+                 salary=0,
+                 anger=0,
+                 happiness=0,
+                 health=0,
+                 horniness=0,
+                 productivity=trunc(1+relationship.synergy)*10
+                 )
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
@@ -206,8 +185,8 @@ class EnteringFlowState(EmployeeEffectingEvent):
         else:
             pick = "unproductive"
         return f"Entered a {pick} flow state!"
-        
-    
+
+
 class PickAFight(EmployeeEffectingEvent):
     @staticmethod
     def pdf(prior: tuple[EmployeeRelationship,Employee], random_var: float) -> EmployeeDelta:
@@ -221,121 +200,103 @@ class PickAFight(EmployeeEffectingEvent):
                 happiness=-10,
                 health=0,
                 horniness=0,
-                productivity= -5 
+                productivity= -5
             )
         return null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "They picked a fight with a co-worker. Not good for their heart."
-     
-class HaveAnAffair(EmployeeEffectingEvent):
+
     @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship,Employee], random_var: float) -> EmployeeDelta:
-        relationship,employee = prior
-        if employee.horniness*(1+relationship.attraction)> (100*random_var):
-            return EmployeeDelta(stress=10,greed=0,salary=0,anger=10,happiness=-20,health=0,horniness=-5,productivity=-10)
-        return null_delta_factory()
+    def batch_pdf(prior: tuple[ColumnView,ColumnView], random_var: np.ndarray) -> np.ndarray:
+        # matches pdf, which builds the fight delta but never returns it
+        return np.tile(NULL_DELTA,(len(random_var),1))
+
+class HaveAnAffair(DeclarativeEmployeeEffectingEvent):
+    when = employee.horniness*(1+relationship.attraction) > (100*random_var)
+    delta = dict(stress=10,greed=0,salary=0,anger=10,happiness=-20,health=0,horniness=-5,productivity=-10)
+    otherwise = null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "They are ruining their life. They decided to have an affair but left their location on. Their partner is suspicious."
 
-class PlaySomeGolf(EmployeeEffectingEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship,Employee], random_var: float) -> EmployeeDelta:
-        relationship,employee = prior
-        if relationship.friendship> random_var:
-            return EmployeeDelta(stress=-10,greed=0,salary=int(10_000*random_var),anger=-10,happiness=10,health=0,horniness=-5,productivity=5)
-        return null_delta_factory() 
+class PlaySomeGolf(DeclarativeEmployeeEffectingEvent):
+    when = relationship.friendship > random_var
+    delta = dict(stress=-10,greed=0,salary=trunc(10_000*random_var),anger=-10,happiness=10,health=0,horniness=-5,productivity=5)
+    otherwise = null_delta_factory()
 
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "Played a round of golf. Woah! This is really good for their career!"
-    
-class SecretRivalry(EmployeeEffectingEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship,Employee], random_var: float) -> EmployeeDelta:
-        relationship,employee = prior
-        if relationship.resentment>random_var and relationship.friendship<random_var and employee.stress<80:
-            return EmployeeDelta(stress=10,greed=10,salary=0,anger=5,happiness=-5,health=0,horniness=-5,productivity=10)
-        return null_delta_factory()
+
+class SecretRivalry(DeclarativeEmployeeEffectingEvent):
+    when = (relationship.resentment>random_var) & (relationship.friendship<random_var) & (employee.stress<80)
+    delta = dict(stress=10,greed=10,salary=0,anger=5,happiness=-5,health=0,horniness=-5,productivity=10)
+    otherwise = null_delta_factory()
     @staticmethod
     def description(result: EmployeeDelta) -> str:
         return "They started a one sided rivalry with a co-worker. Just you wait..."
 ## relationship effecting events
-class RomanticLunch(EmployeeRelationshipEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship,Employee,Employee], random_var: float) -> EmployeeRelationshipDelta:
-        relationship,employee1,employee2 = prior 
-        return EmployeeRelationshipDelta(
-            attraction=(float(relationship.attraction>0.5) + 0.5)*(employee1.horniness+employee2.horniness)/100,
-            resentment=0.75,
-            synergy=1,
-            friendship=1.25
-        )
+class RomanticLunch(DeclarativeRelationshipEvent):
+    delta = dict(
+        attraction=((relationship.attraction>0.5) + 0.5)*(employee1.horniness+employee2.horniness)/100,
+        resentment=0.75,
+        synergy=1,
+        friendship=1.25
+    )
 
     @staticmethod
     def description(result: EmployeeRelationshipDelta) -> str:
-        if result.attraction > 0.5: 
+        if result.attraction > 0.5:
             return "Things are getting complicated between these two..."
         return "Some people can just be platonic."
-class OverheadGossip(EmployeeRelationshipEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship,Employee,Employee], random_var: float) -> EmployeeRelationshipDelta:
-        relationship,employee1,employee2 = prior 
-        return EmployeeRelationshipDelta(
-            attraction=1,
-            resentment=0.75,
-            synergy=1,
-            friendship=1,
-        )
+class OverheadGossip(DeclarativeRelationshipEvent):
+    delta = dict(
+        attraction=1,
+        resentment=0.75,
+        synergy=1,
+        friendship=1,
+    )
 
     @staticmethod
     def description(result: EmployeeRelationshipDelta) -> str:
-        return "They overheard someone talking about them..." 
-    
-class BrainstormingSession(EmployeeRelationshipEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship, Employee, Employee], random_var: float) -> EmployeeRelationshipDelta:
-        relationship, e1, e2 = prior
-        if (relationship.synergy > 0.5 and (e1.stress + e2.stress) < 100) and random_var > 0.3:
-            return EmployeeRelationshipDelta(
-                attraction=1,
-                resentment=-0.5,
-                synergy=1.5,
-                friendship=1.2
-            )
-        else:
-            return EmployeeRelationshipDelta(
-                attraction=1,
-                resentment=1.0,
-                synergy=0.8,
-                friendship=0.9
-            )
+        return "They overheard someone talking about them..."
+
+class BrainstormingSession(DeclarativeRelationshipEvent):
+    when = (relationship.synergy > 0.5) & ((employee1.stress + employee2.stress) < 100) & (random_var > 0.3)
+    delta = dict(
+        attraction=1,
+        resentment=-0.5,
+        synergy=1.5,
+        friendship=1.2
+    )
+    otherwise = dict(
+        attraction=1,
+        resentment=1.0,
+        synergy=0.8,
+        friendship=0.9
+    )
     @staticmethod
     def description(result: EmployeeRelationshipDelta) -> str:
         if result.synergy > 1:
             return "The brainstorming session sparked some great ideas!"
         return "The brainstorming session went nowhere and tensions rose."
-class RiskyJoke(EmployeeRelationshipEvent):
-    @staticmethod
-    def pdf(prior: tuple[EmployeeRelationship, Employee, Employee], random_var: float) -> EmployeeRelationshipDelta:
-        relationship, e1, e2 = prior
-        if relationship.friendship > relationship.resentment and random_var > 0.4:
-            return EmployeeRelationshipDelta(
-                attraction=1,
-                resentment=0.5,
-                synergy=1.5,
-                friendship=1.5
-            )
-        else:
-            return EmployeeRelationshipDelta(
-                attraction=0.75,
-                resentment=1.5,
-                synergy=0.8,
-                friendship=0.8
-            )
+class RiskyJoke(DeclarativeRelationshipEvent):
+    when = (relationship.friendship > relationship.resentment) & (random_var > 0.4)
+    delta = dict(
+        attraction=1,
+        resentment=0.5,
+        synergy=1.5,
+        friendship=1.5
+    )
+    otherwise = dict(
+        attraction=0.75,
+        resentment=1.5,
+        synergy=0.8,
+        friendship=0.8
+    )
     @staticmethod
     def description(result: EmployeeRelationshipDelta) -> str:
         if result.friendship > 1:
@@ -344,4 +305,4 @@ class RiskyJoke(EmployeeRelationshipEvent):
 
 EMPLOYEE_EVENT_BUS = [HasABaby(),GoodDayAtWork(),BadDayAtWork(),CoffeeBreak(),OfficeGossip(),MissedDeadline(),Promotion(),MissedDeadline()]
 EMPLOYEE_EFFECTING_EVENT_BUS = [EnteringFlowState(),PickAFight(),HaveAnAffair(),PlaySomeGolf(),SecretRivalry()]
-EMPLOYEE_RELATIONSHIP_EVENT_BUS = [RomanticLunch(),OverheadGossip(),BrainstormingSession(),RiskyJoke()]
\ No newline at end of file
+EMPLOYEE_RELATIONSHIP_EVENT_BUS = [RomanticLunch(),OverheadGossip(),BrainstormingSession(),RiskyJoke()]
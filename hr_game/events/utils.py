@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 def k_for_linear_tolerance_general(p, delta, top=1, bottom=0, midpoint=0):
     """
     p       : percentile (0-100), e.g. 90 means enforce condition at x_p where identity = 90% of range
@@ -26,8 +28,22 @@ def k_for_linear_tolerance_general(p, delta, top=1, bottom=0, midpoint=0):
     return k
 
 
+_K_CACHE: dict[tuple, float] = {}
+
+
+def cached_k(p, delta, top, bottom, midpoint):
+    """k_for_linear_tolerance_general memoized per (p, delta, top, bottom, midpoint), callers reuse a handful of shapes."""
+    key = (p, delta, top, bottom, midpoint)
+    k = _K_CACHE.get(key)
+    if k is None:
+        k = _K_CACHE[key] = k_for_linear_tolerance_general(p, delta=delta, top=top, bottom=bottom, midpoint=midpoint)
+    return k
+
+
 def sigmoid(x, top=1, bottom=0, midpoint=0.5, p=90, delta=0.1):
+    """x may be a float or a numpy array, arrays are evaluated elementwise in one go."""
     # use the actual midpoint, not hard-coded 0
-    k = k_for_linear_tolerance_general(p, delta=delta, top=top, bottom=bottom, midpoint=midpoint)
+    k = cached_k(p, delta, top, bottom, midpoint)
+    if isinstance(x, np.ndarray):
+        return bottom + (top - bottom) / (1 + np.exp(-k * (x - midpoint)))
     return bottom + (top - bottom) / (1 + math.exp(-k * (x - midpoint)))
-
@@ -0,0 +1,227 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import time
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+from pydantic import BaseModel
+
+# on disk response cache for chat models.
+# a response is keyed by a hash of (model, temperature, structured output schema, prompt), so the same prompt to
+# the same model replays from SQLite instead of the api. wrap a model with CachedChatModel(llm, LLMCache(path)).
+
+DEFAULT_CACHE = ".data/llm_cache.db"
+
+def prompt_text(prompt) -> str:
+    """A stable string for a prompt: str as is, message lists as (role, content) pairs."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, BaseMessage):
+        prompt = [prompt]
+    if isinstance(prompt, (list, tuple)):
+        return json.dumps([(m.type, m.content) if isinstance(m, BaseMessage) else m for m in prompt], default=str)
+    return str(prompt)
+
+@lru_cache(maxsize=None)
+def _schema_key(schema: Optional[type[BaseModel]]) -> Optional[str]:
+    # the full json schema, so editing a field's description or type misses the old answers
+    return None if schema is None else json.dumps([schema.__name__, schema.model_json_schema()], sort_keys=True)
+
+def cache_key(model: str, temperature: Optional[float], schema: Optional[type[BaseModel]], prompt) -> str:
+    payload = json.dumps([model, temperature, _schema_key(schema), prompt_text(prompt)], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class LLMCache:
+    """SQLite key -> response text. Entries older than max_age seconds are dropped, and past max_entries the
+    least recently used go first. Eviction runs on open and every evict_every puts. hits / misses count lookups
+    since the cache was opened."""
+    def __init__(self, path: str = DEFAULT_CACHE, max_entries: Optional[int] = 100_000,
+                 max_age: Optional[float] = 30 * 24 * 3600, evict_every: int = 1_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            created REAL NOT NULL,
+            used REAL NOT NULL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+        self.evict()
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Cached values for the keys that are present and fresh, counting a hit or miss per key."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        oldest = time.time() - self.max_age if self.max_age else None
+        for start in range(0, len(unique), 900):
+            chunk = unique[start:start+900]
+            rows = self._conn.execute(
+                f"SELECT key, value, created FROM responses WHERE key IN ({','.join(['?']*len(chunk))})", chunk
+            ).fetchall()
+            found.update((key, value) for key, value, created in rows if oldest is None or created >= oldest)
+        if found:
+            now = time.time()
+            self._conn.executemany("UPDATE responses SET used=? WHERE key=?", [(now, k) for k in found])
+            self._conn.commit()
+        hits = sum(key in found for key in keys)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict[str, str]):
+        now = time.time()
+        self._conn.executemany("INSERT OR REPLACE INTO responses (key, value, created, used) VALUES (?, ?, ?, ?)",
+                               [(key, value, now, now) for key, value in items.items()])
+        self._conn.commit()
+        self._puts += len(items)
+        if self._puts >= self.evict_every:
+            self.evict()
+
+    def put(self, key: str, value: str):
+        self.put_many({key: value})
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used past max_entries. Returns how many were dropped."""
+        self._puts = 0
+        dropped = 0
+        if self.max_age:
+            dropped += self._conn.execute("DELETE FROM responses WHERE created < ?",
+                                          (time.time() - self.max_age,)).rowcount
+        if self.max_entries is not None:
+            dropped += self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        self._conn.commit()
+        return dropped
+
+    def clear(self):
+        self._conn.execute("DELETE FROM responses")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def close(self):
+        self._conn.close()
+
+def model_identity(llm) -> tuple[str, Optional[float]]:
+    """(model name, temperature) of a langchain chat model, falling back to the class name."""
+    name = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    return str(name), getattr(llm, "temperature", None)
+
+class _Cached(ABC):
+    """Shared invoke / abatch over a cache, subclasses say how a response is stored and rebuilt."""
+    def __init__(self, llm, cache: LLMCache, model: str, temperature: Optional[float],
+                 schema: Optional[type[BaseModel]] = None):
+        self.llm = llm
+        self.cache = cache
+        self.model = model
+        self.temperature = temperature
+        self.schema = schema
+
+    @abstractmethod
+    def _dump(self, response) -> Optional[str]:
+        """The cached form of a response, None for one that shouldn't be cached (it is returned as is)."""
+
+    @abstractmethod
+    def _load(self, value: str):
+        pass
+
+    def _keys(self, prompts: list) -> list[str]:
+        return [cache_key(self.model, self.temperature, self.schema, p) for p in prompts]
+
+    def invoke(self, prompt):
+        key = self._keys([prompt])[0]
+        value = self.cache.get(key)
+        if value is None:
+            response = self.llm.invoke(prompt)
+            value = self._dump(response)
+            if value is None:
+                return response
+            self.cache.put(key, value)
+        return self._load(value)
+
+    async def ainvoke(self, prompt):
+        return (await self.abatch([prompt]))[0]
+
+    def _misses(self, prompts: list) -> tuple[list[str], dict[str, str], dict[str, Any]]:
+        keys = self._keys(prompts)
+        found = self.cache.get_many(keys)
+        misses = {}
+        for key, prompt in zip(keys, prompts):
+            if key not in found:
+                misses.setdefault(key, prompt)  # a prompt repeated in the batch is asked once
+        return keys, found, misses
+
+    def _merge(self, keys: list[str], found: dict[str, str], misses: dict[str, Any], responses: list) -> list:
+        # store what can be cached, anything else goes back to the caller uncached
+        uncached = {}
+        for key, response in zip(misses, responses):
+            value = self._dump(response)
+            if value is None:
+                uncached[key] = response
+            else:
+                found[key] = value
+        stored = {k: found[k] for k in misses if k not in uncached}
+        if stored:
+            self.cache.put_many(stored)
+        return [uncached[k] if k in uncached else self._load(found[k]) for k in keys]
+
+    def batch(self, prompts: list) -> list:
+        keys, found, misses = self._misses(prompts)
+        responses = self.llm.batch(list(misses.values())) if misses else []
+        return self._merge(keys, found, misses, responses)
+
+    async def abatch(self, prompts: list) -> list:
+        keys, found, misses = self._misses(prompts)
+        responses = await self.llm.abatch(list(misses.values())) if misses else []
+        return self._merge(keys, found, misses, responses)
+
+class CachedStructuredModel(_Cached):
+    """with_structured_output counterpart, responses are stored as the schema's json. Anything that isn't an
+    instance of the schema (None when the model's output didn't parse, a dict) is passed through uncached."""
+    def _dump(self, response) -> Optional[str]:
+        if not isinstance(response, self.schema):
+            return None
+        return response.model_dump_json()
+
+    def _load(self, value: str) -> BaseModel:
+        return self.schema.model_validate_json(value)
+
+class CachedChatModel(_Cached):
+    """A chat model whose invoke / ainvoke / batch / abatch and with_structured_output answers go through an
+    LLMCache. Only the message content is kept, replayed answers come back as a plain AIMessage."""
+    def __init__(self, llm, cache: Optional[LLMCache] = None):
+        super().__init__(llm, LLMCache() if cache is None else cache, *model_identity(llm))
+
+    def _dump(self, response) -> str:
+        return json.dumps(response.content)
+
+    def _load(self, value: str) -> AIMessage:
+        return AIMessage(content=json.loads(value))
+
+    def with_structured_output(self, schema: type[BaseModel]) -> CachedStructuredModel:
+        return CachedStructuredModel(self.llm.with_structured_output(schema), self.cache, self.model,
+                                     self.temperature, schema)
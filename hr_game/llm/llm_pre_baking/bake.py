@@ -0,0 +1,136 @@
+import asyncio
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+
+from hr_game.creation.employee import randomize_employee
+from hr_game.data.employee import Employee
+from hr_game.llm.llm_pre_baking.employee_problem import EmployeeVectorAndMetadataStore, generate_prompts
+from hr_game.llm.throttle import RateLimiter, estimate_tokens, retry
+from hr_game.llm.utils import get_llm
+
+# streaming question bake.
+# batches are asked for with at most `concurrency` in flight, paced by a RateLimiter and retried with backoff.
+# every batch that comes back is written to the store and committed together with a bake_batches row, so an
+# interrupted bake loses only the batches in flight and rerunning the same call bakes just the missing ones.
+
+@dataclass
+class BakeReport:
+    baked: list[int] = field(default_factory=list)  # batches written by this run, in completion order
+    skipped: list[int] = field(default_factory=list)  # already baked by an earlier run
+    failed: dict[int, str] = field(default_factory=dict)  # batch -> last error, retried by the next run
+    rows: int = 0
+
+def _create_progress(store: EmployeeVectorAndMetadataStore):
+    store.sql_lite.execute("""
+    CREATE TABLE IF NOT EXISTS bake_batches (
+        setting TEXT NOT NULL,
+        batch INTEGER NOT NULL,
+        rows INTEGER NOT NULL,
+        PRIMARY KEY (setting, batch)
+    )
+    """)
+
+def baked_batches(store: EmployeeVectorAndMetadataStore, setting: str) -> set[int]:
+    _create_progress(store)
+    return {b for (b,) in store.sql_lite.execute("SELECT batch FROM bake_batches WHERE setting=?", (setting,))}
+
+def batch_employees(batch: int, batch_size: int, seed: Optional[int] = None) -> list[Employee]:
+    """The employees of one batch. With a seed a batch is the same employees on every run."""
+    if seed is None:
+        return [randomize_employee() for _ in range(batch_size)]
+    return [randomize_employee(seed=seed + batch * batch_size + i) for i in range(batch_size)]
+
+def _write_batch(store: EmployeeVectorAndMetadataStore, setting: str, batch: int, employees: list[Employee],
+                 questions: list[str]):
+    # marker first: a flush_every flush inside batch_set then commits both, never the rows alone.
+    # the savepoint undoes the marker with the rows if batch_set fails, so the batch is baked again by the next run
+    conn = store.sql_lite
+    ntotal = store.index.ntotal
+    conn.execute("SAVEPOINT bake_batch")
+    try:
+        conn.execute("INSERT INTO bake_batches (setting, batch, rows) VALUES (?, ?, ?)", (setting, batch, len(questions)))
+        store.batch_set(employees, questions, setting)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK TO bake_batch")
+            conn.execute("RELEASE bake_batch")
+        if store.index.ntotal != ntotal:
+            store.reload_index()  # vectors of rolled back rows
+        raise
+    conn.execute("RELEASE bake_batch")
+    store.commit()
+
+async def abake_questions(store: EmployeeVectorAndMetadataStore, setting: str, batches: int, batch_size: int,
+                          llm=None, concurrency: int = 4, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                          backoff: float = 1.0, seed: Optional[int] = None, verbose: bool = False) -> BakeReport:
+    """Bake batches 0..batches-1 of `setting` into store, skipping the ones already there.
+    Resume with the same batch_size (and seed, if one was given) so batch numbers mean the same employees."""
+    llm = llm or get_llm()
+    limiter = limiter or RateLimiter()
+    done = baked_batches(store, setting)
+    report = BakeReport(skipped=[b for b in range(batches) if b in done])
+    todo = (b for b in range(batches) if b not in done)
+    total = batches - len(report.skipped)
+
+    async def ask(batch: int) -> tuple[list[Employee], list[str]]:
+        employees = batch_employees(batch, batch_size, seed)
+        prompts = [generate_prompts(e, setting) for e in employees]
+        tokens = sum(estimate_tokens(p) for p in prompts)
+
+        async def call():
+            await limiter.acquire(len(prompts), tokens)
+            return await llm.abatch(prompts)
+        responses = await retry(call, retries, backoff)
+        return employees, [r.content for r in responses]
+
+    pending: dict[asyncio.Future, int] = {}
+    def top_up():
+        for batch in islice(todo, concurrency - len(pending)):
+            pending[asyncio.ensure_future(ask(batch))] = batch
+
+    top_up()
+    try:
+        while pending:
+            finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                batch = pending.pop(task)
+                try:
+                    employees, questions = task.result()
+                except Exception as e:
+                    report.failed[batch] = repr(e)
+                    if verbose:
+                        print(f"batch {batch} failed: {e!r}")
+                    continue
+                try:
+                    _write_batch(store, setting, batch, employees, questions)
+                except Exception as e:
+                    report.failed[batch] = repr(e)
+                    if verbose:
+                        print(f"batch {batch} failed to write: {e!r}")
+                    continue
+                report.baked.append(batch)
+                report.rows += len(questions)
+                if verbose:
+                    print(f"batch {batch}: {len(questions)} questions ({len(report.baked)}/{total})")
+            top_up()
+    finally:
+        # an error or a cancel leaves batches in flight, stop them rather than let them run on unobserved
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return report
+
+def bake_questions(base_path: str, setting: str, batches: int, batch_size: int, llm=None, concurrency: int = 4,
+                   requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                   retries: int = 3, backoff: float = 1.0, seed: Optional[int] = None, flush_every: int = 10_000,
+                   verbose: bool = False) -> BakeReport:
+    """abake_questions into the faiss.index / md.db store under base_path. The index is written every
+    flush_every rows and at the end, rows committed since are rebuilt into it when the store is next opened."""
+    Path(base_path).mkdir(parents=True, exist_ok=True)
+    with EmployeeVectorAndMetadataStore(faiss_location=str(Path(base_path)/"faiss.index"),
+                                        md_db_location=str(Path(base_path)/"md.db"), flush_every=flush_every) as store:
+        return asyncio.run(abake_questions(store, setting, batches, batch_size, llm, concurrency,
+                                           RateLimiter(requests_per_minute, tokens_per_minute), retries, backoff,
+                                           seed, verbose))
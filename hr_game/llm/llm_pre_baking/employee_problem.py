@@ -1,11 +1,14 @@
 import asyncio
+from dataclasses import asdict
 import json
+import os
 from pathlib import Path
 import sqlite3
 from tempfile import TemporaryDirectory
-from typing import Optional
+from typing import Optional, Union
 from hr_game.creation.employee import randomize_employee
 from hr_game.data.employee import Employee, bound
+from hr_game.llm.llm_pre_baking.vector_index import IndexSpec, build_index, empty_index, flat_contents, tune
 from hr_game.llm.utils import get_llm
 import numpy as np 
 import faiss
@@ -13,7 +16,7 @@ import faiss
 def describe_employee(employee:Employee):
     lines = [f"{employee.name}:"]
     for field_name, field_info in Employee.model_fields.items():
-        if field_name == "name":
+        if field_name in ("name", "employee_id"):
             continue
         # Get the field description if available
         description = field_info.description or "No description"
@@ -41,8 +44,10 @@ def generate_prompts(employee:Employee,setting:str)->str:
     """
     return prompt
 
+SQLITE_MAX_IN = 900  # stay under SQLite's default bound parameter limit on old builds
+
 def get_employee_fields() -> list[str]:
-    return list(filter(lambda x: x not in ["name", "context_history", "traits"], Employee.model_fields))
+    return list(filter(lambda x: x not in ["name", "employee_id", "context_history", "traits"], Employee.model_fields))
 
 def employee_to_vector(emp: Employee) -> np.ndarray:
     """
@@ -54,116 +59,308 @@ def employee_to_vector(emp: Employee) -> np.ndarray:
     return np.array(attrs, dtype='float32')
 
 
+def stats_to_vectors(stats: np.ndarray) -> np.ndarray:
+    """employee_to_vector for many rows at once, stats is (n, len(get_employee_fields())) in field order."""
+    stats = np.asarray(stats, dtype=np.float64)
+    vectors = stats / 100
+    salary = get_employee_fields().index("salary")
+    vectors[:, salary] = stats[:, salary] / np.clip(stats[:, salary], 1_000_000, 10_000_000)
+    return vectors.astype(np.float32)
+
+# questions table: one row per baked question, employee stats as INTEGER columns in get_employee_fields() order.
+# extra holds context_history / traits as json and is NULL when both are empty, which is nearly always.
+_FIELDS = get_employee_fields()
+_CREATE = f"""
+CREATE TABLE IF NOT EXISTS questions (
+    idx INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    setting TEXT,
+    name TEXT NOT NULL,
+    employee_id TEXT NOT NULL,
+    {", ".join(f"{field} INTEGER NOT NULL" for field in _FIELDS)},
+    extra TEXT
+)
+"""
+_COLUMNS = f"idx, question, setting, name, employee_id, {', '.join(_FIELDS)}, extra"
+_INSERT = (f"INSERT INTO questions (question, setting, name, employee_id, {', '.join(_FIELDS)}, extra) "
+           f"VALUES ({', '.join(['?'] * (len(_FIELDS) + 5))})")
+_STATS = slice(4, 4 + len(_FIELDS))  # stats in an _INSERT row, fetched rows have idx in front
+
+def _to_row(employee: Employee, question: str, setting: Optional[str]) -> tuple:
+    extra = None
+    if employee.context_history or employee.traits:
+        extra = json.dumps({"context_history": employee.context_history,
+                            "traits": [t.model_dump() for t in employee.traits]})
+    return (question, setting, employee.name, employee.employee_id, *(getattr(employee, f) for f in _FIELDS), extra)
+
+_EMPLOYEE_COLUMNS = ("name", "employee_id", *_FIELDS)
+
+def _from_row(row: tuple, hydrate: bool) -> Union[Employee, dict]:
+    fields = dict(zip(_EMPLOYEE_COLUMNS, row[3:-1]))
+    if not hydrate:
+        return fields
+    if row[-1] is None:
+        # the columns are typed so validation would only repeat what SQLite already enforces
+        return Employee.model_construct(context_history=[], traits=[], **fields)
+    return Employee.model_validate({**fields, **json.loads(row[-1])})
+
+def _is_legacy(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='metadata'").fetchone() is not None
+
+def _migrate_legacy(conn: sqlite3.Connection):
+    """Move rows of the old `metadata (idx, metadata json)` table into questions, keeping their idx (the FAISS ids).
+    Old rows without an employee_id get one assigned here, once."""
+    rows = conn.execute("SELECT idx, metadata FROM metadata ORDER BY idx").fetchall()
+    insert = _INSERT.replace("(question,", "(idx, question,").replace("VALUES (", "VALUES (?, ")
+    for idx, meta in rows:
+        meta = json.loads(meta)
+        conn.execute(insert, (idx, *_to_row(Employee.model_validate(meta["employee"]), meta["question"], None)))
+    conn.execute("DROP TABLE metadata")
+    conn.commit()
+    conn.execute("VACUUM")
+
+def migrate_bakes(root: str = ".data/llm_bakes") -> list[Path]:
+    """Migrate every md.db under root to the questions schema, returns the migrated files.
+    Opening a store writable migrates its md.db too, this is for doing a whole bake directory up front."""
+    migrated = []
+    for path in sorted(Path(root).rglob("md.db")):
+        conn = sqlite3.connect(path)
+        try:
+            if _is_legacy(conn):
+                conn.execute(_CREATE)
+                _migrate_legacy(conn)
+                migrated.append(path)
+        finally:
+            conn.close()
+    return migrated
+
+
 class EmployeeVectorAndMetadataStore:
-    def __init__(self, faiss_location: str, md_db_location: str):
+    """FAISS vectors + SQLite metadata (the questions table, see _COLUMNS). The index and connection are opened once and kept resident.
+    Writes are write-behind: they land in memory (and an open SQLite transaction) and reach disk on flush(),
+    close(), leaving a `with` block, or every flush_every added rows if set.
+    read_only=True memory maps the index (IO_FLAG_MMAP) so several processes can share one baked index.
+    index picks the index type ("flat", "ivf_flat", "hnsw", "ivf_pq" or an IndexSpec), None keeps whatever the store
+    was built with. Types that need training stay flat (exact) until there are enough rows, then the store rebuilds.
+    Changing the type of an existing store rebuilds it on open."""
+    def __init__(self, faiss_location: str, md_db_location: str, read_only: bool = False, flush_every: int = 0,
+                 index: Optional[Union[str, IndexSpec]] = None):
         self.faiss_location = faiss_location
         self.md_db_location = md_db_location
-        self._create_table()
+        self.read_only = read_only
+        self.flush_every = flush_every
+        self._requested = IndexSpec(index) if isinstance(index, str) else index
+        self._spec: Optional[IndexSpec] = None  # the wanted index type
+        self._built: Optional[IndexSpec] = None  # the type of the index in memory
+        self._index = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._unsaved = 0  # rows added since the last flush
+        if not read_only:
+            self._create_table()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def _create_table(self):
         with self.sql_lite as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS metadata (
-                idx INTEGER PRIMARY KEY,
-                metadata TEXT NOT NULL
-            )
-            """)
-            conn.commit()
+            conn.execute(_CREATE)
+            if _is_legacy(conn):
+                _migrate_legacy(conn)
 
     @property
-    def sql_lite(self):
-        return sqlite3.connect(self.md_db_location)
+    def sql_lite(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.read_only:
+                self._conn = sqlite3.connect(f"file:{Path(self.md_db_location).resolve()}?mode=ro", uri=True)
+                if _is_legacy(self._conn):
+                    raise sqlite3.OperationalError(f"{self.md_db_location} still has the json metadata table, "
+                                                   "open it writable once or run migrate_bakes() to migrate it")
+            else:
+                Path(self.md_db_location).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(self.md_db_location)
+        return self._conn
+
+    @property
+    def _spec_location(self) -> str:
+        return f"{self.faiss_location}.spec.json"
 
     @property
     def index(self):
-        if not Path(self.faiss_location).exists():
-            self._create_index()
-        return faiss.read_index(self.faiss_location)
+        if self._index is None:
+            saved, built = {}, IndexSpec()
+            if Path(self._spec_location).exists():
+                with open(self._spec_location) as f:
+                    saved = json.load(f)
+                built = IndexSpec(**saved["built"])
+            if self.read_only:
+                index = faiss.read_index(self.faiss_location, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            elif Path(self.faiss_location).exists():
+                index = faiss.read_index(self.faiss_location)
+            else:
+                index, built = self._create_index(), IndexSpec()
+            self._index, self._built = tune(index, built), built
+            self._spec = self._requested or (IndexSpec(**saved["spec"]) if saved else built)
+            if not self.read_only:
+                self._repair()
+                self._maybe_rebuild()
+        return self._index
+
+    @property
+    def spec(self) -> IndexSpec:
+        """The index type this store is (or will be, once there are enough rows to train) searched with."""
+        self.index
+        return self._spec
 
     def _create_index(self):
         d = len(get_employee_fields())
-        base_index = faiss.IndexFlatL2(d)
-        index = faiss.IndexIDMap(base_index)
-        Path(self.faiss_location).parent.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(index, self.faiss_location)
+        return empty_index(d)
 
     def _save_index(self, index):
-        faiss.write_index(index, self.faiss_location)
+        # write then rename so a reader never maps a half written file
+        Path(self.faiss_location).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{self.faiss_location}.tmp"
+        faiss.write_index(index, tmp)
+        os.replace(tmp, self.faiss_location)
 
-    def set(self, employee: Employee, question: str) -> int:
-        metadata = {"question": question, "employee": employee.model_dump()}
-        with self.sql_lite as conn:
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO metadata (metadata) VALUES (?)", (json.dumps(metadata),))
-            conn.commit()
-            new_id = cursor.lastrowid
+    def _maybe_rebuild(self):
+        """Switch to self.spec once the index has a different type and enough rows to train it."""
+        n = self._index.ntotal
+        if self._built != self._spec and n >= self._spec.min_rows(n):
+            self.rebuild()
+
+    def _repair(self):
+        """Metadata is committed before the index is written, so a crash in between (or commit() without a flush)
+        leaves rows the saved index doesn't have. Rebuild the index from the stat columns when the counts differ."""
+        rows = self.sql_lite.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        if rows != self._index.ntotal:
+            self._index = build_index(*self._stored_vectors(from_metadata=True), self._built)
+            self._unsaved += 1
 
+    def _stored_vectors(self, from_metadata: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """Every vector with its id, read back from a flat index or recomputed from the stat columns."""
+        contents = None if from_metadata else flat_contents(self.index)
+        if contents is not None:
+            return contents
+        rows = self.sql_lite.execute(f"SELECT idx, {', '.join(get_employee_fields())} FROM questions ORDER BY idx").fetchall()
+        table = np.array(rows, dtype=np.float64).reshape(-1, len(get_employee_fields()) + 1)
+        return stats_to_vectors(table[:, 1:]), table[:, 0].astype(np.int64)
+
+    def rebuild(self, index: Optional[Union[str, IndexSpec]] = None):
+        """Rebuild (and retrain) the index as `index`, or as the store's spec. Worth calling after a large bake,
+        an automatic nlist is picked from the row count at training time."""
+        self._check_writable()
+        if index is not None:
+            self.index
+            self._spec = IndexSpec(index) if isinstance(index, str) else index
+        vectors, ids = self._stored_vectors()
+        self._index = build_index(vectors, ids, self._spec)
+        self._built = self._spec
+        self._unsaved += 1  # make the next flush write it
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"{self.faiss_location} was opened read only")
+
+    def _added(self, n: int):
+        self._unsaved += n
+        self._maybe_rebuild()
+        if self.flush_every and self._unsaved >= self.flush_every:
+            self.flush()
+
+    def reload_index(self):
+        """Drop the in memory index, the next use reads it back from disk and rebuilds the rows it is missing."""
+        self._index = None
+
+    def commit(self):
+        """Commit pending metadata without writing the index. Cheap enough to call per batch, a store reopened
+        after a crash rebuilds the vectors flush() never wrote from the committed rows."""
+        if not self.read_only and self._conn is not None:
+            self._conn.commit()
+
+    def flush(self):
+        """Commit pending metadata and write the index to disk."""
+        if self.read_only or self._conn is None:
+            return
+        self._conn.commit()
+        if self._unsaved or not Path(self.faiss_location).exists():
+            self._save_index(self.index)
+        if self._index is not None:
+            with open(self._spec_location, "w") as f:
+                json.dump({"spec": asdict(self._spec), "built": asdict(self._built)}, f)
+        self._unsaved = 0
+
+    def close(self):
+        """flush() and release the index and connection, the store reopens them lazily if used again."""
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._index = None
+
+    def set(self, employee: Employee, question: str, setting: Optional[str] = None) -> int:
+        return self.batch_set([employee], [question], setting)[0]
+
+    def batch_set(self, employees: list[Employee], questions: list[str], setting: Optional[str] = None) -> list[int]:
+        self._check_writable()
+        # load (and repair) the index before inserting, _repair counts rows on this connection and would take
+        # the uncommitted ones below as missing from the index
         index = self.index
-        index.add_with_ids(
-            np.array([employee_to_vector(employee)], dtype=np.float32),
-            np.array([new_id], dtype=np.int64)
-        )
-        self._save_index(index)
-        return new_id
-
-    def batch_set(self, employees: list[Employee],questions:list[str]) -> list[int]:
         ids = []
-        with self.sql_lite as conn:
-            cursor = conn.cursor()
-            for employee, question in zip(employees,questions):
-                metadata = {"question": question, "employee": employee.model_dump()}
-                cursor.execute("INSERT INTO metadata (metadata) VALUES (?)", (json.dumps(metadata),))
-                ids.append(cursor.lastrowid)
-            conn.commit()
-
-        vectors = np.array([employee_to_vector(emp) for emp in employees], dtype=np.float32)
-        index = self.index
+        cursor = self.sql_lite.cursor()
+        rows = [_to_row(employee, question, setting) for employee, question in zip(employees, questions)]
+        for row in rows:
+            cursor.execute(_INSERT, row)
+            ids.append(cursor.lastrowid)
+        vectors = stats_to_vectors(np.array([row[_STATS] for row in rows], dtype=np.float64))
         index.add_with_ids(vectors, np.array(ids, dtype=np.int64))
-        self._save_index(index)
+        self._added(len(ids))
         return ids
 
-    def get(self, id: int) -> tuple[Employee, str]:
-        with self.sql_lite as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT metadata FROM metadata WHERE idx=?", (id,))
-            row = cursor.fetchone()
-            if not row:
-                raise Exception("Record not found")
-
-        meta_dict = json.loads(row[0])
-        employee = Employee.model_validate(meta_dict["employee"])
-        question = meta_dict["question"]
-        return employee, question
-
-    def batch_get(self, ids: list[int]) -> list[tuple[Employee, str]]:
-        results = []
-        with self.sql_lite as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"SELECT idx, metadata FROM metadata WHERE idx IN ({','.join(['?']*len(ids))})",
-                ids
-            )
-            rows = cursor.fetchall()
-        for idx, meta in rows:
-            meta_dict = json.loads(meta)
-            emp = Employee.model_validate(meta_dict["employee"])
-            q = meta_dict["question"]
-            results.append((emp, q))
-        return results
+    def get(self, id: int, hydrate: bool = True) -> tuple[Union[Employee, dict], str]:
+        found = self._fetch([id], hydrate)
+        if id not in found:
+            raise Exception("Record not found")
+        return found[id]
 
-    def vector_search(self, employee: Employee, k: int) -> list[tuple[Employee, str, float]]:
-        query_vec = np.array([employee_to_vector(employee)], dtype=np.float32)
-        index = self.index
-        distances, indices = index.search(query_vec, k)
+    def _fetch(self, ids, hydrate: bool = True) -> dict[int, tuple[Union[Employee, dict], str]]:
+        """Rows for the distinct ids, one IN query per SQLITE_MAX_IN ids. Missing ids are left out.
+        hydrate=False skips building Employee models and returns the employee columns as a dict."""
+        unique = list(dict.fromkeys(int(i) for i in ids))
+        found = {}
+        for start in range(0, len(unique), SQLITE_MAX_IN):
+            chunk = unique[start:start+SQLITE_MAX_IN]
+            rows = self.sql_lite.execute(
+                f"SELECT {_COLUMNS} FROM questions WHERE idx IN ({','.join(['?']*len(chunk))})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                found[row[0]] = (_from_row(row, hydrate), row[1])
+        return found
+
+    def batch_get(self, ids: list[int], hydrate: bool = True) -> list[tuple[Union[Employee, dict], str]]:
+        """Records in the order of ids (repeats included), ids that don't exist are skipped."""
+        found = self._fetch(ids, hydrate)
+        return [found[int(i)] for i in ids if int(i) in found]
 
+    def batch_vector_search(self, employees: list[Employee], k: int,
+                            hydrate: bool = True) -> list[list[tuple[Union[Employee, dict], str, float]]]:
+        """k nearest records for every employee: one FAISS search over all queries and one metadata fetch for
+        all hits. A record hit by several queries is the same Employee object in each of their lists."""
+        if not employees:
+            return []
+        query_vecs = np.array([employee_to_vector(e) for e in employees], dtype=np.float32)
+        distances, indices = self.index.search(query_vecs, k)
+        found = self._fetch(indices[indices != -1].tolist(), hydrate)  # FAISS returns -1 for "not found"
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:  # FAISS returns -1 for "not found"
-                continue
-            emp, question = self.get(int(idx))
-            results.append((emp, question, float(dist)))
+        for row_distances, row_indices in zip(distances.tolist(), indices.tolist()):
+            results.append([(*found[idx], dist) for dist, idx in zip(row_distances, row_indices) if idx in found])
         return results
+
+    def vector_search(self, employee: Employee, k: int, hydrate: bool = True) -> list[tuple[Union[Employee, dict], str, float]]:
+        return self.batch_vector_search([employee], k, hydrate)[0]
 def weighted_softmax_choice(
     results: list[tuple[Employee, str, float]],
     temperature=0.1,
@@ -194,6 +391,7 @@ def test_normal_distribution():
         print(evsm.get(ids[3]))
         employee_choices = evsm.vector_search(random_employees[3],5)
         print(list(map(lambda x: (x[0].name,x[2]),employee_choices)))
+        evsm.close()
         heuristic ={}
         for i in range(250):
             choice = weighted_softmax_choice(employee_choices, temperature=0.1)[0].name
@@ -202,21 +400,18 @@ def test_normal_distribution():
             heuristic[choice] += 1 
 
         print(random_employees[3].name,heuristic)
-async def batch_generate_questions(batch_size:int,setting:str)->list[str]:
-    llm = get_llm()
+async def batch_generate_questions(batch_size:int,setting:str,llm=None)->list[str]:
+    llm = llm or get_llm()
     employees = [randomize_employee() for i in range(batch_size)]
     question_prompts = [generate_prompts(i,setting=setting) for i in employees]
     return list(zip(employees,[i.content for i in await llm.abatch(question_prompts)]))
-async def batch_generate_all(batch_size:int,batch_number:int,setting:str)->list[str]:
-    return await asyncio.gather(*[batch_generate_questions(batch_size,setting) for i in range(batch_number)])
-def sim_and_score_batches(batch_size:int,batch_number:int,base_path:str,setting:str):
-    all_batches = asyncio.run(batch_generate_all(batch_size,batch_number,setting))
-    total_response = []
-    for batch in all_batches:
-        total_response +=batch 
-    Path(base_path).mkdir(parents=True,exist_ok=True)
-    evsm = EmployeeVectorAndMetadataStore(faiss_location=str(Path(base_path)/"faiss.index"),md_db_location=str(Path(base_path)/"md.db"))
-    evsm.batch_set(list(map(lambda x: x[0],total_response)),list(map(lambda x:x[1],total_response)))
-    
+async def batch_generate_all(batch_size:int,batch_number:int,setting:str,llm=None)->list[str]:
+    llm = llm or get_llm()
+    return await asyncio.gather(*[batch_generate_questions(batch_size,setting,llm) for i in range(batch_number)])
+def sim_and_score_batches(batch_size:int,batch_number:int,base_path:str,setting:str,llm=None):
+    """llm defaults to get_llm(), pass hr_game.llm.stub.StubChatModel() to run offline.
+    Streams through bake.bake_questions, so rerunning after an interruption bakes only the missing batches."""
+    from hr_game.llm.llm_pre_baking.bake import bake_questions
+    return bake_questions(base_path,setting,batch_number,batch_size,llm)
 
 # sim_and_score_batches(2,2,".data/llm_bakes/employee_questions/","Working in a generic office")
\ No newline at end of file
@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# index types for EmployeeVectorAndMetadataStore.
+# every index is an IndexIDMap around a faiss.index_factory index so ids stay the SQLite row ids.
+#   flat     exact brute force, the default
+#   ivf_flat k-means partitions, searches nprobe of the nlist cells. needs training
+#   hnsw     graph search tuned with ef_search, no training but more memory
+#   ivf_pq   ivf with product quantized codes, smallest and lossy. needs training
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+@dataclass
+class IndexSpec:
+    index_type: str = "flat"
+    nlist: Optional[int] = None  # ivf cells, None picks 4*sqrt(rows) when training
+    nprobe: int = 16
+    hnsw_m: int = 32
+    ef_search: int = 64
+    pq_m: int = 3  # sub quantizers, must divide the vector dimension
+    pq_bits: int = 8
+    train_size: int = 100_000  # max rows sampled for training
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.index_type}, expected one of {INDEX_TYPES}")
+
+    @property
+    def needs_training(self) -> bool:
+        return self.index_type in ("ivf_flat", "ivf_pq")
+
+    def cells(self, n_rows: int) -> int:
+        return self.nlist or max(1, int(4 * math.sqrt(max(n_rows, 1))))
+
+    def min_rows(self, n_rows: int) -> int:
+        """Rows needed before training is meaningful (faiss wants ~39 points per centroid)."""
+        if not self.needs_training:
+            return 0
+        needed = 39 * self.cells(n_rows)
+        if self.index_type == "ivf_pq":
+            needed = max(needed, 39 * 2**self.pq_bits)
+        return needed
+
+    def factory_string(self, n_rows: int) -> str:
+        if self.index_type == "ivf_flat":
+            return f"IVF{self.cells(n_rows)},Flat"
+        if self.index_type == "hnsw":
+            return f"HNSW{self.hnsw_m},Flat"
+        if self.index_type == "ivf_pq":
+            return f"IVF{self.cells(n_rows)},PQ{self.pq_m}x{self.pq_bits}"
+        return "Flat"
+
+def empty_index(d: int, spec: Optional[IndexSpec] = None, n_rows: int = 0):
+    return faiss.IndexIDMap(faiss.index_factory(d, (spec or IndexSpec()).factory_string(n_rows)))
+
+def tune(index, spec: IndexSpec):
+    """Apply the search time knobs (nprobe / efSearch) of spec to a built index."""
+    params = faiss.ParameterSpace()
+    if spec.needs_training:
+        params.set_index_parameter(index, "nprobe", spec.nprobe)
+    elif spec.index_type == "hnsw":
+        params.set_index_parameter(index, "efSearch", spec.ef_search)
+    return index
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, spec: IndexSpec, seed: int = 0):
+    """An index of spec's type over vectors, trained on at most spec.train_size sampled rows."""
+    index = empty_index(vectors.shape[1], spec, len(vectors))
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > spec.train_size:
+            sample = vectors[np.random.default_rng(seed).choice(len(vectors), spec.train_size, replace=False)]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    if len(vectors):
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+    return tune(index, spec)
+
+def flat_contents(index) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """(vectors, ids) stored in an IndexIDMap(IndexFlat), None for lossy or graph indexes."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else None
+    if not isinstance(inner, faiss.IndexFlat):
+        return None
+    return inner.reconstruct_n(0, inner.ntotal), faiss.vector_to_array(index.id_map)
@@ -1,10 +1,12 @@
+import asyncio
+from typing import Optional, Union
+
 from hr_game.data.employee import EmployeeDelta
+from hr_game.llm.throttle import RateLimiter, estimate_tokens, retry
 
 
-def score_delta(llm,conversation)->EmployeeDelta:
-    structured_llm = llm.with_structured_output(EmployeeDelta)
-    delta = structured_llm.invoke(
-        f"""
+def scoring_prompt(conversation)->str:
+    return f"""
         You are a grader of HR person responses to stressful or positive situations.
         It is important to be critical to help the HR person grow but also to be optimistic.
 
@@ -26,5 +28,43 @@ def score_delta(llm,conversation)->EmployeeDelta:
 
         {conversation}
         """
-    )
-    return delta
\ No newline at end of file
+
+
+def _as_delta(output)->EmployeeDelta:
+    # structured output can come back as the model, a dict (json mode) or None when the model refused
+    if isinstance(output, EmployeeDelta):
+        return output
+    if output is None:
+        raise ValueError("The model returned no structured output")
+    return EmployeeDelta.model_validate(output)
+
+
+def score_delta(llm,conversation)->EmployeeDelta:
+    structured_llm = llm.with_structured_output(EmployeeDelta)
+    return _as_delta(structured_llm.invoke(scoring_prompt(conversation)))
+
+
+async def ascore_deltas(llm, conversations:list, concurrency:int=8, retries:int=2, backoff:float=0.5,
+                        limiter:Optional[RateLimiter]=None)->list[Union[EmployeeDelta, Exception]]:
+    """Grade every conversation, at most `concurrency` requests in flight, results in the order of conversations.
+    A conversation whose call fails or whose output doesn't validate is retried, then its slot holds the
+    exception (like gather(return_exceptions=True)) and the rest of the batch is unaffected."""
+    structured_llm = llm.with_structured_output(EmployeeDelta)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = limiter or RateLimiter()
+
+    async def score(conversation)->EmployeeDelta:
+        prompt = scoring_prompt(conversation)
+
+        async def call():
+            await limiter.acquire(1, estimate_tokens(prompt))
+            return _as_delta(await structured_llm.ainvoke(prompt))
+        async with semaphore:
+            return await retry(call, retries, backoff)
+    return await asyncio.gather(*[score(c) for c in conversations], return_exceptions=True)
+
+
+def score_deltas(llm, conversations:list, concurrency:int=8, retries:int=2, backoff:float=0.5,
+                 limiter:Optional[RateLimiter]=None)->list[Union[EmployeeDelta, Exception]]:
+    """Blocking ascore_deltas, for callers outside an event loop."""
+    return asyncio.run(ascore_deltas(llm, conversations, concurrency, retries, backoff, limiter))
\ No newline at end of file
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import time
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+# an offline stand in for the chat model get_llm returns, for benchmarks and tests.
+# it answers with canned text chosen by a hash of the prompt, so the same prompt always gets the same answer.
+STUB_QUESTIONS = [
+  "Can we talk about my workload? It's been a lot lately.",
+  "Is there any chance of a raise this year?",
+  "Who do I talk to about a coworker who keeps taking credit for my work?",
+  "Why does nobody ever answer my emails?",
+  "Could I get a day off next week, I'm exhausted.",
+  "Is it normal that the coffee machine has been broken for a month?",
+]
+
+def _pick(prompt:str,options:list[str])->str:
+  digest = hashlib.blake2b(str(prompt).encode(),digest_size=8).digest()
+  return options[int.from_bytes(digest,"little")%len(options)]
+
+class StubFailure(RuntimeError):
+  """Raised by the stubs every fail_every calls, stands in for a timeout or a 429 from the api."""
+
+class StubStructuredModel:
+  """with_structured_output counterpart: fills every field of the schema with its default, or a zero."""
+  def __init__(self,schema:type[BaseModel],latency:float=0.0,fail_every:int=0):
+    self.schema = schema
+    self.latency = latency
+    self.fail_every = fail_every
+    self.calls = 0
+
+  def _answer(self)->BaseModel:
+    self.calls += 1
+    if self.fail_every and self.calls % self.fail_every == 0:
+      raise StubFailure(f"stub failure on call {self.calls}")
+    values = {}
+    for name,field in self.schema.model_fields.items():
+      if not field.is_required():
+        continue
+      values[name] = {int:0,float:0.0,str:"",bool:False}.get(field.annotation,None)
+    return self.schema(**values)
+
+  def invoke(self,prompt)->BaseModel:
+    time.sleep(self.latency)
+    return self._answer()
+
+  async def ainvoke(self,prompt)->BaseModel:
+    await asyncio.sleep(self.latency)
+    return self._answer()
+
+  def batch(self,prompts:list)->list[BaseModel]:
+    return [self.invoke(p) for p in prompts]
+
+  async def abatch(self,prompts:list)->list[BaseModel]:
+    return await asyncio.gather(*[self.ainvoke(p) for p in prompts])
+
+class StubChatModel:
+  """Implements the parts of the langchain chat model interface this repo uses (invoke, batch, abatch,
+  with_structured_output). latency is slept per call to stand in for the network, fail_every > 0 makes every
+  fail_every-th call raise StubFailure to exercise retries."""
+  def __init__(self,responses:Optional[list[str]]=None,latency:float=0.0,fail_every:int=0):
+    self.responses = responses or STUB_QUESTIONS
+    self.latency = latency
+    self.fail_every = fail_every
+    self.calls = 0
+
+  def _answer(self,prompt)->AIMessage:
+    self.calls += 1
+    if self.fail_every and self.calls % self.fail_every == 0:
+      raise StubFailure(f"stub failure on call {self.calls}")
+    return AIMessage(content=_pick(prompt,self.responses))
+
+  def invoke(self,prompt)->AIMessage:
+    time.sleep(self.latency)
+    return self._answer(prompt)
+
+  async def ainvoke(self,prompt)->AIMessage:
+    await asyncio.sleep(self.latency)
+    return self._answer(prompt)
+
+  def batch(self,prompts:list)->list[AIMessage]:
+    return [self.invoke(p) for p in prompts]
+
+  async def abatch(self,prompts:list)->list[AIMessage]:
+    return await asyncio.gather(*[self.ainvoke(p) for p in prompts])
+
+  def with_structured_output(self,schema:type[BaseModel])->StubStructuredModel:
+    return StubStructuredModel(schema,self.latency,self.fail_every)
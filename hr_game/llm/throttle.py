@@ -0,0 +1,60 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# client side limits for talking to a rate limited chat model api.
+
+class RateLimiter:
+    """Token bucket over requests and (estimated) tokens per minute, None means unlimited.
+    Each bucket starts full, so a burst of one minute's budget goes out at once and the rest is paced."""
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.available = {name: limit for name, limit in self.limits.items() if limit}
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None  # made on first use so it binds to the running loop
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self._updated = now - self._updated, now
+        for name in self.available:
+            limit = self.limits[name]
+            self.available[name] = min(limit, self.available[name] + elapsed * limit / 60)
+
+    async def acquire(self, requests: int = 1, tokens: int = 0):
+        """Wait until requests and tokens fit in the buckets, then take them. A single ask larger than a whole
+        bucket is capped to the bucket so it waits for a full minute's budget instead of forever."""
+        if not self.available:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        wanted = {"requests": requests, "tokens": tokens}
+        async with self._lock:
+            while True:
+                self._refill()
+                need = {name: min(wanted[name], self.limits[name]) for name in self.available}
+                wait = max((need[name] - self.available[name]) * 60 / self.limits[name] for name in need)
+                if wait <= 0:
+                    for name in need:
+                        self.available[name] -= need[name]
+                    return
+                await asyncio.sleep(wait)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters a token), good enough for pacing against a tokens per minute limit."""
+    return len(str(text)) // 4 + 1
+
+async def retry(call: Callable[[], Awaitable[T]], retries: int = 3, backoff: float = 1.0, max_backoff: float = 60.0,
+                retry_on: tuple[type[BaseException], ...] = (Exception,), rng: Optional[random.Random] = None) -> T:
+    """await call(), retrying up to `retries` times on retry_on with exponential backoff (backoff * 2**attempt,
+    capped at max_backoff) and full jitter so concurrent callers don't retry in lock step."""
+    rng = rng or random
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except retry_on:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(rng.uniform(0, min(max_backoff, backoff * 2**attempt)))
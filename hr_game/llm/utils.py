@@ -1,7 +1,20 @@
-from langchain.chat_models import init_chat_model
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Union
 
-def get_llm():
+@lru_cache(maxsize=None)
+def _chat_model():
+  # imported here, langchain takes longer to import than the rest of the game together
+  from langchain.chat_models import init_chat_model
+  from dotenv import load_dotenv
   load_dotenv()
   llm = init_chat_model("gpt-5-nano", model_provider="openai",temperature=0.2,)
-  return llm
\ No newline at end of file
+  return llm
+
+def get_llm(cache:Union[bool,"LLMCache"]=False):
+  """The shared chat model, built once per process. cache=True replays answers from the default on disk
+  LLMCache, or pass an LLMCache to use another file or eviction policy."""
+  llm = _chat_model()
+  if cache is False:
+    return llm
+  from hr_game.llm.cache import CachedChatModel, LLMCache
+  return CachedChatModel(llm,LLMCache() if cache is True else cache)
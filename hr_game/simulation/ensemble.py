@@ -0,0 +1,122 @@
+# monte carlo ensembles of office simulations for tuning event balance.
+# run k is driven only by SeedSequence(seed).spawn(runs)[k], so results are the same whatever the worker count.
+# workers send back per cycle means and a histogram of the final office, never the office itself.
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+import os
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from hr_game.creation.employee import randomize_employees
+from hr_game.creation.network import create_fully_connected_table
+from hr_game.data.employee import EmployeeNetwork
+from hr_game.data.table import RELATIONSHIP_FIELDS, STAT_FIELDS, OfficeTable
+from hr_game.events.base import EmployeeEffectingEvent, EmployeeEvent, EmployeeRelationshipEvent
+from hr_game.events.example import EMPLOYEE_EFFECTING_EVENT_BUS, EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS
+from hr_game.simulation.vectorized import iter_table
+
+SUMMARY_FIELDS = STAT_FIELDS + RELATIONSHIP_FIELDS
+# values outside the edges land in the first/last bin
+DEFAULT_BINS = {
+    **{f: np.linspace(0, 100, 21) for f in STAT_FIELDS},
+    "salary": np.linspace(0, 5_000_000, 21),
+    **{f: np.linspace(0, 4, 21) for f in RELATIONSHIP_FIELDS},
+}
+
+OfficeFactory = Callable[[np.random.Generator], Union[OfficeTable, EmployeeNetwork]]
+
+
+def random_office(rng: np.random.Generator, n_employees: int = 20) -> OfficeTable:
+    """Default office factory: a fully connected office of random employees, all drawn from rng."""
+    return create_fully_connected_table(randomize_employees(n_employees, rng=rng), seed=int(rng.integers(0, 2**31)))
+
+
+def summarize(office: OfficeTable) -> np.ndarray:
+    """Office wide mean of every SUMMARY_FIELDS column."""
+    return np.concatenate([office.employees.to_numpy().mean(axis=0), office.relationships.to_numpy().mean(axis=0)])
+
+
+def histogram(office: OfficeTable, bins: dict[str, np.ndarray]) -> np.ndarray:
+    """(len(SUMMARY_FIELDS), bins-1) counts of the office's current values."""
+    counts = []
+    for f in SUMMARY_FIELDS:
+        column = office.employees.column(f) if f in STAT_FIELDS else office.relationships.column(f)
+        edges = bins[f]
+        counts.append(np.histogram(np.clip(column, edges[0], edges[-1]), bins=edges)[0])
+    return np.array(counts)
+
+
+@dataclass
+class RunSummary:
+    means: np.ndarray  # (cycles+1, len(SUMMARY_FIELDS)), row 0 is the starting office
+    final_histogram: np.ndarray  # (len(SUMMARY_FIELDS), bins-1)
+
+
+def run_one(seed_sequence: np.random.SeedSequence, build_office: OfficeFactory, cycles: int,
+            employee_events: list[EmployeeEvent], relationship_events: list[EmployeeRelationshipEvent],
+            relation_ship_update_event: list[EmployeeEffectingEvent], bins: dict[str, np.ndarray]) -> RunSummary:
+    build_rng, sim_rng = [np.random.default_rng(s) for s in seed_sequence.spawn(2)]
+    office = build_office(build_rng)
+    if isinstance(office, EmployeeNetwork):
+        office = OfficeTable.from_network(office)
+    means = np.empty((cycles + 1, len(SUMMARY_FIELDS)))
+    means[0] = summarize(office)
+    records = iter_table(office, cycles, employee_events, relationship_events, relation_ship_update_event, rng=sim_rng)
+    for i, record in enumerate(records):
+        means[i + 1] = [record.means[f] for f in SUMMARY_FIELDS]
+    return RunSummary(means=means, final_histogram=histogram(office, bins))
+
+
+@dataclass
+class EnsembleResult:
+    runs: np.ndarray  # (runs, cycles+1, len(SUMMARY_FIELDS)) per run, per cycle means
+    quantile_levels: tuple[float, ...]
+    quantiles: np.ndarray  # (len(quantile_levels), cycles+1, len(SUMMARY_FIELDS)) across runs
+    histograms: dict[str, tuple[np.ndarray, np.ndarray]]  # field -> (counts summed over runs, bin edges)
+    fields: tuple[str, ...] = SUMMARY_FIELDS
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.runs.mean(axis=0)
+
+    def trajectories(self, name: str) -> np.ndarray:
+        """(runs, cycles+1) trajectories of one field."""
+        return self.runs[:, :, self.fields.index(name)]
+
+
+def run_ensemble(
+        runs: int,
+        cycles: int,
+        seed: Optional[int] = None,
+        build_office: OfficeFactory = random_office,
+        workers: Optional[int] = None,
+        employee_events: list[EmployeeEvent] = EMPLOYEE_EVENT_BUS,
+        relationship_events: list[EmployeeRelationshipEvent] = EMPLOYEE_RELATIONSHIP_EVENT_BUS,
+        relation_ship_update_event: list[EmployeeEffectingEvent] = EMPLOYEE_EFFECTING_EVENT_BUS,
+        quantile_levels: tuple[float, ...] = (0.05, 0.25, 0.5, 0.75, 0.95),
+        bins: Optional[dict[str, np.ndarray]] = None,
+    ) -> EnsembleResult:
+    """Run `runs` independent simulations of `cycles` cycles in a process pool and reduce them.
+    build_office and the events must be picklable (module level functions/partials) when workers > 1.
+    workers=1 runs everything in this process."""
+    bins = {**DEFAULT_BINS, **(bins or {})}
+    children = np.random.SeedSequence(seed).spawn(runs)
+    job = partial(run_one, build_office=build_office, cycles=cycles, employee_events=employee_events,
+                  relationship_events=relationship_events, relation_ship_update_event=relation_ship_update_event,
+                  bins=bins)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or runs == 1:
+        summaries = [job(child) for child in children]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, runs)) as pool:
+            summaries = list(pool.map(job, children, chunksize=max(1, runs // (4 * workers))))
+    trajectories = np.stack([s.means for s in summaries])
+    counts = np.sum([s.final_histogram for s in summaries], axis=0)
+    return EnsembleResult(
+        runs=trajectories,
+        quantile_levels=tuple(quantile_levels),
+        quantiles=np.quantile(trajectories, quantile_levels, axis=0),
+        histograms={f: (counts[j], bins[f]) for j, f in enumerate(SUMMARY_FIELDS)},
+    )
@@ -0,0 +1,155 @@
+# audit trail of every delta a simulation applies.
+# records are (cycle, kind, entity, event, count, delta) rows in a numpy structured array.
+# null deltas are not written one by one: each entity keeps a running count of nulls since its last real delta and
+# that run is written as a single NULL_RUN record (count = run length) when the entity next fires or the run ends.
+# once the in memory buffer passes memory_limit bytes it is written out as a .npy chunk and reloaded memory mapped.
+from pathlib import Path
+import tempfile
+from typing import Iterator, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from hr_game.events.base import EMPLOYEE_DELTA_FIELDS, delta_to_array
+
+EMPLOYEE, RELATIONSHIP = 0, 1  # kind: entity is an employee row or an edge index
+NULL_RUN = -1
+JOURNAL_DTYPE = np.dtype([
+    ("cycle", np.int32),  # for a null run, the cycle the run started in
+    ("kind", np.int8),
+    ("entity", np.int32),
+    ("event", np.int16),  # index into DeltaJournal.event_names, NULL_RUN for a run of null deltas
+    ("count", np.int32),
+    ("delta", np.float64, (len(EMPLOYEE_DELTA_FIELDS),)),  # relationship deltas use the first 4 slots
+])
+
+
+class DeltaJournal:
+    def __init__(self, memory_limit: int = 64 * 2**20, spill_dir: Optional[str] = None):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.event_names: list[str] = []
+        self._event_ids: dict[str, int] = {}
+        self._capacity = max(1, memory_limit // JOURNAL_DTYPE.itemsize)  # records held in memory before a spill
+        self._buffer = np.empty(min(4096, self._capacity), dtype=JOURNAL_DTYPE)
+        self._n = 0
+        self._chunks: list[Path] = []
+        self._spilled = 0
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        # per kind: open null run length and start cycle per entity
+        self._pending = {EMPLOYEE: np.zeros(0, dtype=np.int32), RELATIONSHIP: np.zeros(0, dtype=np.int32)}
+        self._pending_start = {EMPLOYEE: np.zeros(0, dtype=np.int32), RELATIONSHIP: np.zeros(0, dtype=np.int32)}
+
+    def event_id(self, name: str) -> int:
+        event = self._event_ids.get(name)
+        if event is None:
+            event = self._event_ids[name] = len(self.event_names)
+            self.event_names.append(name)
+        return event
+
+    def __len__(self) -> int:
+        return self._spilled + self._n
+
+    def _ensure_entities(self, kind: int, size: int):
+        if size > len(self._pending[kind]):
+            grown = max(size, 2 * len(self._pending[kind]))
+            for store in (self._pending, self._pending_start):
+                store[kind] = np.concatenate([store[kind], np.zeros(grown - len(store[kind]), dtype=np.int32)])
+
+    def _append(self, records: np.ndarray):
+        while len(records):
+            if self._n == len(self._buffer):
+                if len(self._buffer) >= self._capacity:
+                    self.spill()
+                else:
+                    self._buffer = np.resize(self._buffer, min(2 * len(self._buffer), self._capacity))
+            take = min(len(records), len(self._buffer) - self._n)
+            self._buffer[self._n:self._n + take] = records[:take]
+            self._n += take
+            records = records[take:]
+
+    def _close_runs(self, kind: int, entities: np.ndarray):
+        counts = self._pending[kind][entities]
+        open_runs = counts > 0
+        if not open_runs.any():
+            return
+        entities = entities[open_runs]
+        records = np.zeros(len(entities), dtype=JOURNAL_DTYPE)
+        records["cycle"] = self._pending_start[kind][entities]
+        records["kind"] = kind
+        records["entity"] = entities
+        records["event"] = NULL_RUN
+        records["count"] = counts[open_runs]
+        self._pending[kind][entities] = 0
+        self._append(records)
+
+    def record_batch(self, cycle: int, kind: int, entities: np.ndarray, event_name: str, deltas: np.ndarray,
+                     null_row: Optional[np.ndarray] = None, is_null: Optional[np.ndarray] = None):
+        """Log one event applied to many distinct entities. Rows equal to null_row (or flagged in is_null)
+        only extend null runs."""
+        entities = np.asarray(entities, dtype=np.int64)
+        if not len(entities):
+            return
+        self._ensure_entities(kind, int(entities.max()) + 1)
+        if is_null is None:
+            is_null = (deltas == null_row).all(axis=1)
+        nulls = entities[is_null]
+        starting = nulls[self._pending[kind][nulls] == 0]
+        self._pending_start[kind][starting] = cycle
+        self._pending[kind][nulls] += 1
+        fired = entities[~is_null]
+        if not len(fired):
+            return
+        self._close_runs(kind, fired)
+        records = np.zeros(len(fired), dtype=JOURNAL_DTYPE)
+        records["cycle"] = cycle
+        records["kind"] = kind
+        records["entity"] = fired
+        records["event"] = self.event_id(event_name)
+        records["count"] = 1
+        records["delta"][:, :deltas.shape[1]] = deltas[~is_null]
+        self._append(records)
+
+    def record(self, cycle: int, kind: int, entity: int, event_name: str, delta: BaseModel, is_null: bool):
+        """Scalar version of record_batch for the object by object engine."""
+        self.record_batch(cycle, kind, np.array([entity]), event_name, delta_to_array(delta)[None, :],
+                          is_null=np.array([is_null]))
+
+    def close_runs(self):
+        """Write out every open null run, call at the end of a simulation."""
+        for kind in (EMPLOYEE, RELATIONSHIP):
+            self._close_runs(kind, np.flatnonzero(self._pending[kind]))
+
+    def spill(self):
+        """Write the in memory buffer to disk as the next chunk."""
+        if not self._n:
+            return
+        if self.spill_dir is None and self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="hr_game_journal_")
+        directory = Path(self.spill_dir or self._tmp.name)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"chunk_{len(self._chunks):05d}.npy"
+        np.save(path, self._buffer[:self._n])
+        self._chunks.append(path)
+        self._spilled += self._n
+        self._n = 0
+
+    def chunks(self) -> Iterator[np.ndarray]:
+        """Spilled chunks (memory mapped) then the in memory tail, in the order they were recorded."""
+        for path in self._chunks:
+            yield np.load(path, mmap_mode="r")
+        yield self._buffer[:self._n]
+
+    def records(self) -> np.ndarray:
+        return np.concatenate(list(self.chunks()))
+
+    def to_pandas(self):
+        import pandas as pd
+        records = self.records()
+        df = pd.DataFrame({name: records[name] for name in ("cycle", "kind", "entity", "event", "count")})
+        # NULL_RUN is -1, which pandas reads as a missing category
+        df["event_name"] = pd.Categorical.from_codes(records["event"], categories=self.event_names)
+        # delta columns are positional: EmployeeDelta fields for kind EMPLOYEE, the first 4 are relationship fields
+        for j in range(len(EMPLOYEE_DELTA_FIELDS)):
+            df[f"delta_{j}"] = records["delta"][:, j]
+        return df
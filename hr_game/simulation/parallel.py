@@ -0,0 +1,164 @@
+# multi process relationship phase for the numpy engines.
+# relationship events only read employee stats and only write their own edge, so the phase splits into contiguous
+# edge shards with no ordering between them. the stat block, ages and edge columns are moved into
+# multiprocessing.shared_memory once per run. every worker process attaches to them, owns one shard and its own
+# Generator (SeedSequence children of one draw from the run's rng), and runs relationship_phase on its edges when
+# told a cycle number. the parent waits for every shard (the barrier) before the employee phases, which keep
+# running in the parent on the same shared arrays, so nothing is copied or pickled per cycle except the small
+# CycleRecorder / EventProfiler each shard sends back.
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+import os
+import traceback
+from typing import Optional
+
+import numpy as np
+
+from hr_game.data.table import EmployeeTable, OfficeTable, RelationshipTable
+from hr_game.events.base import EmployeeRelationshipEvent
+from hr_game.simulation.profile import EventProfiler
+from hr_game.simulation.stream import CycleRecorder
+from hr_game.simulation.vectorized import relationship_phase
+
+# (table attribute, column) pairs that live in shared memory while the shards run
+SHARED = (("employees", "age"), ("employees", "stats"), ("relationships", "src"), ("relationships", "dst"),
+          ("relationships", "values"))
+
+Spec = tuple[str, tuple[int, ...], str, str]  # shared memory name, shape, dtype, order
+
+
+def _attach(spec: Spec) -> tuple[SharedMemory, np.ndarray]:
+    name, shape, dtype, order = spec
+    # workers share the parent's resource tracker, so attaching adds nothing for it to clean up, the parent unlinks
+    shm = SharedMemory(name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf, order=order)
+
+
+def _worker(conn, specs: dict[str, Spec], events: list[EmployeeRelationshipEvent], edges: tuple[int, int],
+            seed: np.random.SeedSequence, profile: bool):
+    blocks = {key: _attach(spec) for key, spec in specs.items()}
+    arrays = {key: array for key, (_, array) in blocks.items()}
+    n = len(arrays["employees.age"])
+    office = OfficeTable(
+        EmployeeTable.from_arrays(np.empty(n, dtype=object), np.empty(n, dtype=object), arrays["employees.age"],
+                                  arrays["employees.stats"]),
+        RelationshipTable.from_arrays(arrays["relationships.src"], arrays["relationships.dst"],
+                                      arrays["relationships.values"]),
+    )
+    rng = np.random.default_rng(seed)
+    shard = np.arange(*edges)
+    try:
+        while (message := conn.recv()) is not None:
+            cycle, describe = message
+            recorder, profiler = CycleRecorder(describe), EventProfiler() if profile else None
+            try:
+                relationship_phase(office, rng, recorder, events, None, cycle, profiler, edges=shard)
+            except Exception:
+                conn.send(RuntimeError(f"relationship shard {edges} failed:\n{traceback.format_exc()}"))
+                break
+            conn.send((recorder, profiler))
+    finally:
+        del office, arrays
+        while blocks:
+            shm = blocks.popitem()[1][0]
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+
+class RelationshipShards:
+    """Runs relationship_phase of office over `workers` processes, use as a context manager (or call close()).
+    While open, the office's age, stats and edge columns are views of shared memory, on close they are copied back
+    into private arrays. The shard streams are drawn from rng here, so a run is reproducible for a given seed and
+    worker count (a different worker count gives different, equally distributed, numbers)."""
+    def __init__(self, office: OfficeTable, events: list[EmployeeRelationshipEvent], workers: int,
+                 rng: np.random.Generator, profile: bool = False):
+        self.office = office
+        self.events = events
+        self._blocks: list[SharedMemory] = []
+        self._workers = []
+        self._conns = []
+        specs = {f"{table}.{column}": self._share(table, column) for table, column in SHARED}
+        bounds = np.linspace(0, len(office.relationships), workers + 1).astype(int)
+        seeds = np.random.SeedSequence(int(rng.integers(2**63))).spawn(workers)
+        context = get_context()
+        try:
+            for shard, seed in enumerate(seeds):
+                parent, child = context.Pipe()
+                worker = context.Process(target=_worker, daemon=True, name=f"hr_game-relationships-{shard}",
+                                         args=(child, specs, events, (bounds[shard], bounds[shard + 1]), seed, profile))
+                worker.start()
+                child.close()
+                self._workers.append(worker)
+                self._conns.append(parent)
+        except BaseException:
+            self.close()
+            raise
+
+    def _share(self, table: str, column: str) -> Spec:
+        owner = getattr(self.office, table)
+        array = getattr(owner, column)[:len(owner)]
+        order = "F" if array.ndim > 1 else "C"
+        shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(shm)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, order=order)
+        shared[...] = array
+        setattr(owner, column, shared)
+        return shm.name, array.shape, array.dtype.str, order
+
+    def run(self, cycle: int, recorder: Optional[CycleRecorder], profiler: Optional[EventProfiler] = None):
+        """One relationship phase over every shard, returns once all of them are done."""
+        describe = recorder is not None and recorder._firings is not None
+        for conn in self._conns:
+            conn.send((cycle, describe))
+        errors = []
+        for conn in self._conns:
+            reply = conn.recv()
+            if isinstance(reply, Exception):
+                errors.append(reply)
+                continue
+            shard_recorder, shard_profiler = reply
+            if recorder is not None:
+                recorder.merge(shard_recorder)
+            if profiler is not None:
+                profiler.merge(shard_profiler)
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        if not self._blocks:
+            return
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers, self._conns = [], []
+        for table, column in SHARED:
+            owner = getattr(self.office, table)
+            shared = getattr(owner, column)
+            setattr(owner, column, np.array(shared, order="F" if shared.ndim > 1 else "C"))
+            del shared
+        for shm in self._blocks:
+            try:
+                shm.close()
+            except BufferError:  # someone still holds a view, the mapping goes away with it
+                pass
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "RelationshipShards":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """workers as the engines take it: None or 0 for every core."""
+    return workers or os.cpu_count() or 1
@@ -0,0 +1,87 @@
+# opt in per event class profiling for both engines.
+# pass an EventProfiler as profiler= to simulate_office / iter_office (or simulate_table) and read profiler.table()
+# afterwards. with profiler=None the engines skip every timer call, so an unprofiled run only pays an `is None` check.
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+
+@dataclass
+class EventStats:
+    calls: int = 0  # pdf evaluations, one per entity (a batch_pdf over n rows counts n)
+    batches: int = 0  # pdf/batch_pdf invocations
+    fired: int = 0  # deltas that were not the null delta
+    pdf_ns: int = 0
+    apply_ns: int = 0
+
+    @property
+    def null(self) -> int:
+        return self.calls - self.fired
+
+    @property
+    def total_ns(self) -> int:
+        return self.pdf_ns + self.apply_ns
+
+
+class EventProfiler:
+    """Counts and timings keyed by event class name, the same event twice on a bus is one row."""
+    def __init__(self):
+        self.stats: dict[str, EventStats] = {}
+
+    def add(self, event, calls: int, fired: int, pdf_ns: int, apply_ns: int):
+        name = type(event).__name__
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = EventStats()
+        stats.calls += calls
+        stats.batches += 1
+        stats.fired += fired
+        stats.pdf_ns += pdf_ns
+        stats.apply_ns += apply_ns
+
+    def add_batch(self, event, deltas: np.ndarray, null_row: np.ndarray, pdf_ns: int, apply_ns: int, nulls: int = 0):
+        fired = int((~(deltas == null_row).all(axis=1)).sum())
+        self.add(event, len(deltas) + nulls, fired, pdf_ns, apply_ns)
+
+    def merge(self, other: "EventProfiler"):
+        """Add another profiler's counts and timings, e.g. from a worker process. Timings add up as cpu time."""
+        for name, theirs in other.stats.items():
+            ours = self.stats.setdefault(name, EventStats())
+            ours.calls += theirs.calls
+            ours.batches += theirs.batches
+            ours.fired += theirs.fired
+            ours.pdf_ns += theirs.pdf_ns
+            ours.apply_ns += theirs.apply_ns
+
+    def reset(self):
+        self.stats.clear()
+
+    def rows(self) -> list[dict[str, Any]]:
+        """One dict per event class, slowest first."""
+        rows = []
+        for name, s in sorted(self.stats.items(), key=lambda item: -item[1].total_ns):
+            rows.append({
+                "event": name,
+                "calls": s.calls,
+                "batches": s.batches,
+                "fired": s.fired,
+                "null": s.null,
+                "fire_rate": s.fired / s.calls if s.calls else 0.0,
+                "pdf_ms": s.pdf_ns / 1e6,
+                "apply_ms": s.apply_ns / 1e6,
+                "ns_per_call": s.total_ns / s.calls if s.calls else 0.0,
+            })
+        return rows
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.DataFrame(self.rows()).set_index("event") if self.stats else pd.DataFrame()
+
+    def table(self) -> str:
+        header = f"{'event':<24}{'calls':>10}{'fired':>10}{'null':>10}{'fire%':>7}{'pdf ms':>11}{'apply ms':>11}{'ns/call':>10}"
+        lines = [header, "-" * len(header)]
+        for r in self.rows():
+            lines.append(f"{r['event']:<24}{r['calls']:>10}{r['fired']:>10}{r['null']:>10}{100 * r['fire_rate']:>6.1f}%"
+                         f"{r['pdf_ms']:>11.2f}{r['apply_ms']:>11.2f}{r['ns_per_call']:>10.0f}")
+        return "\n".join(lines)
@@ -3,105 +3,325 @@
 # they interact via Relationship events
 # Relationship events look at a an employee stats and the relationship 
 # stats of the employee network and then give a pdf for an update that we then sample from with a random var 
-# these samples return employee deltas and relationship deltas and we store these delta with the employee. 
+# these samples return employee deltas and relationship deltas and we store these delta with the employee
+# in a DeltaJournal (hr_game.simulation.journal) when one is passed in.
 # for efficiency we pack the Null deltas with their count number. 
 
+from pathlib import Path
 import random
+from time import perf_counter_ns
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
 from hr_game.creation.employee import randomize_employee
 from hr_game.creation.network import create_fully_connected_network
 from hr_game.data.employee import Employee, EmployeeNetwork, EmployeeRelationship
+from hr_game.data.snapshot import load_snapshot, save_snapshot
+from hr_game.data.table import OfficeTable
 from hr_game.events.base import EmployeeEffectingEvent, EmployeeEvent, EmployeeRelationshipEvent
 from hr_game.events.example import EMPLOYEE_EFFECTING_EVENT_BUS, EMPLOYEE_EVENT_BUS, EMPLOYEE_RELATIONSHIP_EVENT_BUS, null_delta_factory, null_relationship_delta_factory
+from hr_game.simulation.journal import EMPLOYEE, RELATIONSHIP, DeltaJournal
+from hr_game.simulation.profile import EventProfiler
+from hr_game.simulation.stream import CycleRecord, CycleRecorder, employee_means, office_labeler, office_means, print_record
+from hr_game.simulation.schedule import iter_scheduled
+from hr_game.simulation.vectorized import iter_table
 
 
-def employee_update(employee:Employee,verbose:bool,events:list[EmployeeEvent]):
+def employee_update(employee:Employee,verbose:bool,events:list[EmployeeEvent],journal:Optional[DeltaJournal]=None,cycle:int=0,entity:int=0,recorder:Optional[CycleRecorder]=None,profiler:Optional[EventProfiler]=None):
     null_delta = null_delta_factory()
     sampled_events = random.sample(events,int(len(events)*0.8)) # only pick from 4/5 of events each cycle. 
     for i in sampled_events:
         random_var = random.random()
+        if profiler is not None:
+            start = perf_counter_ns()
         delta = i.pdf(employee,random_var=random_var)
+        if profiler is not None:
+            pdf_done = perf_counter_ns()
         employee.update(delta)
-        if null_delta == delta: 
+        is_null = null_delta == delta
+        if profiler is not None:
+            profiler.add(i,1,0 if is_null else 1,pdf_done-start,perf_counter_ns()-pdf_done)
+        if journal is not None:
+            journal.record(cycle,EMPLOYEE,entity,type(i).__name__,delta,is_null)
+        if recorder is not None:
+            recorder.record(i,EMPLOYEE,entity,delta,is_null)
+        if is_null: 
             continue 
         if verbose:
             print("--",i.description(delta))
     return employee
+def iter_employee(employee:Employee,cycles:int,events:list[EmployeeEvent],describe:bool=False,profiler:Optional[EventProfiler]=None)->Iterator[CycleRecord]:
+    """Update employee in place one cycle at a time, yielding a CycleRecord after each."""
+    labeler = lambda kind,entity: employee.name
+    for i in range(cycles):
+        recorder = CycleRecorder(describe)
+        employee_update(employee,False,events=events,recorder=recorder,profiler=profiler)
+        yield recorder.finish(i,employee_means(employee),labeler)
+
 def simulate_employee(employee:Employee,cycles:int,verbose:bool,events:list[EmployeeEvent])->Employee:
     employee_copy = employee.model_copy()
-    for i in range(cycles):
-        if verbose and i%10 ==0:
-            print("It is now day:",i, "and this is the employee\n",str(employee_copy))
-        employee_update(employee_copy,verbose,events=events)
+    for record in iter_employee(employee_copy,cycles,events,describe=verbose):
+        if verbose and record.cycle%10 ==0:
+            print("It is now day:",record.cycle, "and this is the employee\n",str(employee_copy))
+        if verbose:
+            for line in record.descriptions():
+                print(line)
+    return employee_copy
 
     
-def relationship_update(e:Employee,e2:Employee,relationship:EmployeeRelationship,verbose:bool,events:list[EmployeeRelationshipEvent])->EmployeeRelationship:
+def relationship_update(e:Employee,e2:Employee,relationship:EmployeeRelationship,verbose:bool,events:list[EmployeeRelationshipEvent],journal:Optional[DeltaJournal]=None,cycle:int=0,entity:int=0,recorder:Optional[CycleRecorder]=None,profiler:Optional[EventProfiler]=None)->EmployeeRelationship:
     nr = relationship.model_copy()
     sampled_events = random.sample(events,int(len(events)*0.8)) # only pick from 4/5 of events each cycle. 
     null_delta = null_relationship_delta_factory()
     for i in sampled_events:
         random_var = random.random()
+        if profiler is not None:
+            start = perf_counter_ns()
         delta = i.pdf((nr,e,e2),random_var=random_var)
+        if profiler is not None:
+            pdf_done = perf_counter_ns()
         nr.update(delta)
-        if null_delta == delta: 
+        is_null = null_delta == delta
+        if profiler is not None:
+            profiler.add(i,1,0 if is_null else 1,pdf_done-start,perf_counter_ns()-pdf_done)
+        if journal is not None:
+            journal.record(cycle,RELATIONSHIP,entity,type(i).__name__,delta,is_null)
+        if recorder is not None:
+            recorder.record(i,RELATIONSHIP,entity,delta,is_null)
+        if is_null: 
             continue 
         if verbose:
             print(f"the relationship between {e.name} and {e2.name} changed--",i.description(delta))
     return nr
      
-def employee_updates_from_rel(employee:Employee,relationship:EmployeeRelationship,verbose:bool,events:list[EmployeeEffectingEvent])->Employee:
+def employee_updates_from_rel(employee:Employee,relationship:EmployeeRelationship,verbose:bool,events:list[EmployeeEffectingEvent],journal:Optional[DeltaJournal]=None,cycle:int=0,entity:int=0,recorder:Optional[CycleRecorder]=None,profiler:Optional[EventProfiler]=None)->Employee:
     ne = employee.model_copy()
     sampled_events = random.sample(events,int(len(events)*0.8)) # only pick from 4/5 of events each cycle. 
     null_delta = null_delta_factory()
     for i in sampled_events:
         random_var = random.random()
+        if profiler is not None:
+            start = perf_counter_ns()
         delta = i.pdf((relationship,ne),random_var=random_var)
+        if profiler is not None:
+            pdf_done = perf_counter_ns()
         ne.update(delta)
-        if null_delta == delta: 
+        is_null = null_delta == delta
+        if profiler is not None:
+            profiler.add(i,1,0 if is_null else 1,pdf_done-start,perf_counter_ns()-pdf_done)
+        if journal is not None:
+            journal.record(cycle,EMPLOYEE,entity,type(i).__name__,delta,is_null)
+        if recorder is not None:
+            recorder.record(i,EMPLOYEE,entity,delta,is_null)
+        if is_null: 
             continue 
         if verbose:
             print("--",i.description(delta))
     return ne
+ENGINES = ("python","numpy","scheduled")
+
+def iter_office(
+        office_network:Union[EmployeeNetwork,OfficeTable],
+        cycles:int,
+        employee_events:list[EmployeeEvent],
+        relationship_events:list[EmployeeRelationshipEvent],
+        relation_ship_update_event:list[EmployeeEffectingEvent],
+        engine:str="python",
+        seed:Optional[int]=None,
+        journal:Optional[DeltaJournal]=None,
+        checkpoint_path:Optional[Union[str,Path]]=None,
+        checkpoint_every:int=0,
+        describe:Union[bool,Callable[[int],bool]]=False,
+        profiler:Optional[EventProfiler]=None,
+        workers:Optional[int]=1,
+    )->Iterator[CycleRecord]:
+    """Stream a simulation: one CycleRecord (means, fired event counts, lazy descriptions) per cycle.
+    engine="python" steps one pydantic object at a time, engine="numpy" runs every bus over the whole office
+    with array ops (see hr_game.simulation.vectorized), engine="scheduled" is the numpy engine with the rare employee
+    events drawn ahead from a calendar queue instead of rolled every cycle (see hr_game.simulation.schedule). All update office_network in place, the numpy engine on an
+    EmployeeNetwork writes its results back when the iterator finishes (or is closed).
+    An OfficeTable, like the sparse networks from hr_game.creation.network, runs on the numpy or scheduled engine.
+    Every applied delta is logged to journal if given, its open null runs are closed at the end.
+    With checkpoint_path a snapshot (office + rng state) is written every checkpoint_every cycles and at the end,
+    pick the run back up with resume_simulation. profiler (an EventProfiler) collects per event class counts and
+    pdf/apply timings, print profiler.table() after the run. workers > 1 (None for every core) runs the relationship
+    phase of the numpy and scheduled engines in that many processes over shared memory."""
+    buses = (employee_events,relationship_events,relation_ship_update_event)
+    options = dict(checkpoint_path=checkpoint_path,checkpoint_every=checkpoint_every,profiler=profiler)
+    if engine != "python":
+        options["workers"] = workers
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine}, expected one of {ENGINES}")
+    if isinstance(office_network,OfficeTable) and engine == "python":
+        raise ValueError("An OfficeTable can't be simulated with engine='python', convert it with to_network() first")
+    if engine == "python" and workers != 1:
+        raise ValueError("workers only applies to engine='numpy' or 'scheduled', the python engine runs in one process")
+    iter_engine = iter_scheduled if engine == "scheduled" else iter_table
+    try:
+        if isinstance(office_network,OfficeTable):
+            yield from iter_engine(office_network,cycles,*buses,rng=np.random.default_rng(seed),journal=journal,describe=describe,**options)
+        elif engine != "python":
+            office = OfficeTable.from_network(office_network)
+            try:
+                yield from iter_engine(office,cycles,*buses,rng=np.random.default_rng(seed),journal=journal,describe=describe,**options)
+            finally:
+                office.write_back(office_network)
+        else:
+            if seed is not None:
+                random.seed(seed)
+            yield from _iter_network(office_network,cycles,*buses,journal,describe=describe,**options)
+    finally:
+        if journal is not None:
+            journal.close_runs()
+
 def simulate_office(
-        office_network:EmployeeNetwork,
+        office_network:Union[EmployeeNetwork,OfficeTable],
         cycles:int,
         verbose:bool,
         employee_events:list[EmployeeEvent],
         relationship_events:list[EmployeeRelationshipEvent],
-        relation_ship_update_event:list[EmployeeEffectingEvent]
-    )->EmployeeNetwork:
-    for i in range(cycles):
-        should_print = verbose and i%10 ==0
-        if should_print:
-            print("It is now day:",i)
+        relation_ship_update_event:list[EmployeeEffectingEvent],
+        engine:str="python",
+        seed:Optional[int]=None,
+        journal:Optional[DeltaJournal]=None,
+        checkpoint_path:Optional[Union[str,Path]]=None,
+        checkpoint_every:int=0,
+        profiler:Optional[EventProfiler]=None,
+        workers:Optional[int]=1,
+    )->Union[EmployeeNetwork,OfficeTable]:
+    """Run iter_office to the end and return the updated office, printing every 10th day when verbose."""
+    for record in iter_office(office_network,cycles,employee_events,relationship_events,relation_ship_update_event,engine=engine,seed=seed,
+                              journal=journal,checkpoint_path=checkpoint_path,checkpoint_every=checkpoint_every,
+                              describe=lambda i: verbose and i%10 == 0,profiler=profiler,workers=workers):
+        if verbose and record.cycle%10 == 0:
+            print_record(record)
+    return office_network
+
+def _resume(
+        checkpoint_path:Union[str,Path],
+        cycles:int,
+        buses:tuple[list[EmployeeEvent],list[EmployeeRelationshipEvent],list[EmployeeEffectingEvent]],
+        engine:str,
+        journal:Optional[DeltaJournal],
+        checkpoint_every:int,
+        describe:Union[bool,Callable[[int],bool]],
+        profiler:Optional[EventProfiler],
+        workers:Optional[int],
+    )->tuple[Union[EmployeeNetwork,OfficeTable],Iterator[CycleRecord]]:
+    # the restored office and the records that advance it, shared by iter_resume and resume_simulation
+    snapshot = load_snapshot(checkpoint_path)
+    remaining = max(cycles-snapshot.cycle,0)
+    options = dict(checkpoint_path=checkpoint_path,checkpoint_every=checkpoint_every,profiler=profiler)
+    if engine in ("numpy","scheduled"):
+        office = snapshot.office
+        iter_engine = iter_scheduled if engine == "scheduled" else iter_table
+        records = iter_engine(office,remaining,*buses,rng=snapshot.rng(),journal=journal,start_cycle=snapshot.cycle,describe=describe,workers=workers,**options)
+    elif engine == "python":
+        if workers != 1:
+            raise ValueError("workers only applies to engine='numpy' or 'scheduled', the python engine runs in one process")
+        office = snapshot.network()
+        snapshot.restore_random()
+        records = _iter_network(office,remaining,*buses,journal,start_cycle=snapshot.cycle,describe=describe,**options)
+    else:
+        raise ValueError(f"Unknown engine {engine}, expected one of {ENGINES}")
+
+    def closing()->Iterator[CycleRecord]:
+        try:
+            yield from records
+        finally:
+            if journal is not None:
+                journal.close_runs()
+    return office,closing()
+
+def iter_resume(
+        checkpoint_path:Union[str,Path],
+        cycles:int,
+        employee_events:list[EmployeeEvent],
+        relationship_events:list[EmployeeRelationshipEvent],
+        relation_ship_update_event:list[EmployeeEffectingEvent],
+        engine:str="numpy",
+        journal:Optional[DeltaJournal]=None,
+        checkpoint_every:int=0,
+        describe:Union[bool,Callable[[int],bool]]=False,
+        profiler:Optional[EventProfiler]=None,
+        workers:Optional[int]=1,
+    )->Iterator[CycleRecord]:
+    """resume_simulation as a stream of CycleRecords, like iter_office for a fresh run."""
+    _,records = _resume(checkpoint_path,cycles,(employee_events,relationship_events,relation_ship_update_event),
+                        engine,journal,checkpoint_every,describe,profiler,workers)
+    yield from records
+
+def resume_simulation(
+        checkpoint_path:Union[str,Path],
+        cycles:int,
+        verbose:bool,
+        employee_events:list[EmployeeEvent],
+        relationship_events:list[EmployeeRelationshipEvent],
+        relation_ship_update_event:list[EmployeeEffectingEvent],
+        engine:str="numpy",
+        journal:Optional[DeltaJournal]=None,
+        checkpoint_every:int=0,
+        profiler:Optional[EventProfiler]=None,
+        workers:Optional[int]=1,
+    )->Union[EmployeeNetwork,OfficeTable]:
+    """Continue a run started with checkpoint_path until it reaches `cycles` cycles in total, checkpointing to the
+    same path. Use the engine the run was started with: the numpy engine resumes its Generator, the python engine the
+    random module state, so a resumed run draws the same numbers as one that never stopped. The scheduled engine
+    resumes its Generator but draws a new event queue, so it continues the same distribution, not the same numbers."""
+    office,records = _resume(checkpoint_path,cycles,(employee_events,relationship_events,relation_ship_update_event),
+                             engine,journal,checkpoint_every,lambda i: verbose and i%10 == 0,profiler,workers)
+    for record in records:
+        if verbose and record.cycle%10 == 0:
+            print_record(record)
+    return office
+
+def _iter_network(
+        office_network:EmployeeNetwork,
+        cycles:int,
+        employee_events:list[EmployeeEvent],
+        relationship_events:list[EmployeeRelationshipEvent],
+        relation_ship_update_event:list[EmployeeEffectingEvent],
+        journal:Optional[DeltaJournal],
+        start_cycle:int=0,
+        checkpoint_path:Optional[Union[str,Path]]=None,
+        checkpoint_every:int=0,
+        describe:Union[bool,Callable[[int],bool]]=False,
+        profiler:Optional[EventProfiler]=None,
+    )->Iterator[CycleRecord]:
+    labeler = office_labeler(office_network)
+    for i in range(start_cycle,start_cycle+cycles):
+        recorder = CycleRecorder(describe(i) if callable(describe) else describe)
         # update relationships first. 
         for ridx in range(len(office_network.relationships)):
             eid1,eid2,rel = office_network.relationships[ridx]
             emp1 = office_network.employees[eid1]
             emp2 = office_network.employees[eid2]
-            new_rel = relationship_update(emp1,emp2,rel,should_print,relationship_events)
-            office_network.relationships[ridx] = eid1,eid2,new_rel
+            new_rel = relationship_update(emp1,emp2,rel,False,relationship_events,journal=journal,cycle=i,entity=ridx,recorder=recorder,profiler=profiler)
+            office_network.set_relationship(ridx,new_rel)
         # then update employees. 
         for e in list(office_network.employees.keys()):
             old_employee = office_network.employees[e]
-            if should_print:
-                print(f"\nUpdating Events for :{old_employee.name}\n")
-            ne = employee_update(old_employee,should_print,events=employee_events)
+            ne = employee_update(old_employee,False,events=employee_events,journal=journal,cycle=i,entity=e,recorder=recorder,profiler=profiler)
             office_network.employees[e] = ne 
         # finally trigger relationship affecting changes. 
         for e in list(office_network.employees.keys()):
             old_employee = office_network.employees[e]
-            for relation_ship in office_network.relationships:
-                e1,e2,r = relation_ship
-                if e==e1 or e==e2:
-                    old_employee = employee_updates_from_rel(old_employee,r,should_print,relation_ship_update_event)
+            for ridx in office_network.incident_relationships(e):
+                _,_,r = office_network.relationships[ridx]
+                old_employee = employee_updates_from_rel(old_employee,r,False,relation_ship_update_event,journal=journal,cycle=i,entity=e,recorder=recorder,profiler=profiler)
             office_network.employees[e]=old_employee
+        last = i+1 == start_cycle+cycles
+        if checkpoint_path is not None and (last or (checkpoint_every and (i+1)%checkpoint_every == 0)):
+            save_snapshot(checkpoint_path,office_network,cycle=i+1,random_state=random.getstate())
+        yield recorder.finish(i,office_means(office_network),labeler)
 
-simulate_employee(randomize_employee(),100,events=EMPLOYEE_EVENT_BUS,verbose=True)
-simulate_office(
-    office_network=create_fully_connected_network([randomize_employee() for i in range(10)]),
-    cycles=100,
-    verbose=True, 
-    employee_events=EMPLOYEE_EVENT_BUS,
-    relation_ship_update_event=EMPLOYEE_EFFECTING_EVENT_BUS,
-    relationship_events=EMPLOYEE_RELATIONSHIP_EVENT_BUS
-    )
\ No newline at end of file
+if __name__ == "__main__":
+    simulate_employee(randomize_employee(),100,events=EMPLOYEE_EVENT_BUS,verbose=True)
+    simulate_office(
+        office_network=create_fully_connected_network([randomize_employee() for i in range(10)]),
+        cycles=100,
+        verbose=True, 
+        employee_events=EMPLOYEE_EVENT_BUS,
+        relation_ship_update_event=EMPLOYEE_EFFECTING_EVENT_BUS,
+        relationship_events=EMPLOYEE_RELATIONSHIP_EVENT_BUS
+        )
@@ -0,0 +1,343 @@
+# next event scheduling for rare employee events, an alternative to rolling every event for every employee every cycle.
+# a declarative employee event whose condition is `random_var > c`, optionally and-ed with conditions on the employee
+# alone (HasABaby: horniness, age), fires on a cycle with a fixed probability
+#   p = inclusion * (1 - c)      while its state condition holds, 0 otherwise
+# where inclusion = int(0.8*len(bus))/len(bus) is the chance the event is among the rolled 4/5 of the bus.
+# the gaps between firings are then geometric(p), so each (employee, event) gets its next firing cycle drawn once and
+# kept in a calendar queue (a heap of cycles, each with arrays of rows). geometric draws are memoryless, so a pending
+# firing only has to be redrawn when the state condition flips, stale entries are skipped by a generation counter.
+# an event that is rolled but doesn't fire still applies its otherwise (null) delta, those are drawn in one batch per
+# cycle, but only over rows the null delta can still change: a row already at the bound every null delta pushes it to
+# (health 0, greed 100, ...) stays there, so its nulls are only counted, with one binomial draw per event.
+# state conditions are only rechecked for rows whose watched columns changed.
+# the other events are rolled as in the numpy engine, over the full bus so each keeps its inclusion.
+# scheduled events apply after the rolled ones within a cycle, so per event and per cycle the distribution matches the
+# numpy engine but the order inside a cycle does not.
+from dataclasses import dataclass
+from functools import reduce
+import heapq
+import operator
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+from hr_game.data.snapshot import save_snapshot
+from hr_game.data.table import STAT_LOWER, STAT_UPPER, OfficeTable
+from hr_game.events.base import EmployeeEffectingEvent, EmployeeEvent, EmployeeRelationshipEvent, delta_to_array, employee_delta_array
+from hr_game.events.declarative import Attr, BinOp, Call, Const, DeclarativeEmployeeEvent, Expr, RandomVar
+from hr_game.simulation.journal import EMPLOYEE, DeltaJournal
+from hr_game.simulation.profile import EventProfiler
+from hr_game.simulation.stream import CycleRecord, CycleRecorder, office_labeler, office_means
+from hr_game.simulation.vectorized import employee_phase, relationship_effect_phase, relationship_phase, relationship_shards
+
+
+@dataclass
+class Stationary:
+    """How a schedulable event fires: probability per roll while state (a compiled batch condition on the
+    employee, None for always) holds, and the constant delta it applies when rolled but not fired."""
+    probability: float
+    state: Optional[Callable[[dict], np.ndarray]]
+    otherwise: np.ndarray
+    fields: frozenset = frozenset()  # employee columns state reads
+
+
+def _uses_random_var(expr: Expr) -> bool:
+    if isinstance(expr, RandomVar):
+        return True
+    if isinstance(expr, BinOp):
+        return _uses_random_var(expr.left) or _uses_random_var(expr.right)
+    if isinstance(expr, Call):
+        return any(_uses_random_var(a) for a in expr.args)
+    return False
+
+
+def _fields(expr: Expr) -> frozenset:
+    if isinstance(expr, Attr):
+        return frozenset([expr.field])
+    if isinstance(expr, BinOp):
+        return _fields(expr.left) | _fields(expr.right)
+    if isinstance(expr, Call):
+        return frozenset().union(*(_fields(a) for a in expr.args))
+    return frozenset()
+
+
+def _conjuncts(expr: Expr) -> list[Expr]:
+    if isinstance(expr, BinOp) and expr.op is operator.and_:
+        return _conjuncts(expr.left) + _conjuncts(expr.right)
+    return [expr]
+
+
+def _threshold(expr: Expr) -> Optional[float]:
+    """c for `random_var > c` (or c < random_var), None for any other use of random_var."""
+    if not isinstance(expr, BinOp):
+        return None
+    if expr.op in (operator.gt, operator.ge) and isinstance(expr.left, RandomVar) and isinstance(expr.right, Const):
+        return float(expr.right.value)
+    if expr.op in (operator.lt, operator.le) and isinstance(expr.left, Const) and isinstance(expr.right, RandomVar):
+        return float(expr.left.value)
+    return None
+
+
+def _constant_delta(spec) -> Optional[np.ndarray]:
+    if isinstance(spec, BaseModel):
+        return delta_to_array(spec)
+    if isinstance(spec, dict) and not any(isinstance(v, Expr) for v in spec.values()):
+        return employee_delta_array(1, **spec)[0]
+    return None
+
+
+def stationary(event: EmployeeEvent) -> Optional[Stationary]:
+    """The Stationary form of event, or None when it can't be scheduled (hand written pdf, random_var used
+    any other way than one `random_var > c`, or an otherwise delta that depends on the employee)."""
+    if not isinstance(event, DeclarativeEmployeeEvent) or event.when is None:
+        return None
+    otherwise = _constant_delta(event.otherwise)
+    if otherwise is None:
+        return None
+    threshold, state = None, []
+    for conjunct in _conjuncts(event.when):
+        if not _uses_random_var(conjunct):
+            state.append(conjunct)
+            continue
+        if threshold is not None or _threshold(conjunct) is None:
+            return None
+        threshold = _threshold(conjunct)
+    if threshold is None:
+        return None
+    probability = min(max(1.0 - threshold, 0.0), 1.0)
+    if not state:
+        return Stationary(probability, None, otherwise)
+    condition = reduce(operator.and_, state)
+    return Stationary(probability, condition.compile(True), otherwise, _fields(condition))
+
+
+class EventScheduler:
+    """Calendar queue of the next firing cycle of every (employee row, scheduled event)."""
+    def __init__(self, office: OfficeTable, schedules: list[Stationary], inclusion: float,
+                 rng: np.random.Generator, start_cycle: int = 0):
+        n = len(office.employees)
+        self.office = office
+        self.schedules = schedules
+        self.inclusion = inclusion
+        self.rng = rng
+        self.rates = np.array([inclusion * s.probability for s in schedules])  # firing chance per cycle
+        self.eligible = np.zeros((n, len(schedules)), dtype=bool)
+        self.generation = np.zeros((n, len(schedules)), dtype=np.int64)
+        self._cycles: list[int] = []  # heap of cycles that have a bucket
+        self._buckets: dict[int, list[tuple[int, np.ndarray, np.ndarray]]] = {}  # cycle -> [(event, rows, generations)]
+        self._null: Optional[np.ndarray] = None
+        for e, schedule in enumerate(schedules):
+            self.eligible[:, e] = self._condition(schedule, np.arange(n))
+        for e in range(len(schedules)):
+            self.schedule(e, np.flatnonzero(self.eligible[:, e]), start_cycle)
+        self.eligible_count = self.eligible.sum(axis=0)
+        self._fields = sorted(set().union(*(s.fields for s in schedules if s.state is not None)))
+        self._seen = self._watched()
+        # the stats each null delta pushes, None when another scheduled null delta pulls one of them the other way
+        signs = np.sign(np.array([s.otherwise for s in schedules], dtype=np.float64).reshape(len(schedules), len(STAT_LOWER)))
+        conflicting = (signs > 0).any(axis=0) & (signs < 0).any(axis=0)
+        self._pushes = [None if sign[conflicting].any() else np.flatnonzero(sign) for sign in signs]
+
+    def _watched(self) -> Optional[np.ndarray]:
+        if not self._fields:
+            return None
+        return np.column_stack([self.office.employees.column(f) for f in self._fields])
+
+    def _condition(self, schedule: Stationary, rows: np.ndarray) -> np.ndarray:
+        if schedule.state is None:
+            return np.ones(len(rows), dtype=bool)
+        return np.broadcast_to(schedule.state({"employee": self.office.employees.view(rows)}), (len(rows),))
+
+    def schedule(self, e: int, rows: np.ndarray, first_cycle: int):
+        """Draw the next firing cycle (first_cycle or later) of event e for rows."""
+        if not len(rows) or self.rates[e] <= 0:
+            return
+        due = first_cycle + self.rng.geometric(min(self.rates[e], 1.0), len(rows)) - 1
+        order = np.argsort(due, kind="stable")
+        rows, due = rows[order], due[order]
+        cycles, starts = np.unique(due, return_index=True)
+        for cycle, chunk in zip(cycles.tolist(), np.split(rows, starts[1:])):
+            if cycle not in self._buckets:
+                self._buckets[cycle] = []
+                heapq.heappush(self._cycles, cycle)
+            self._buckets[cycle].append((e, chunk, self.generation[chunk, e].copy()))
+
+    def pop(self, cycle: int) -> dict[int, np.ndarray]:
+        """event -> rows due by cycle whose entry is still current. Firing consumes the entry, call schedule()
+        for the rows again to queue their next firing."""
+        due: dict[int, list[np.ndarray]] = {}
+        while self._cycles and self._cycles[0] <= cycle:
+            for e, rows, generations in self._buckets.pop(heapq.heappop(self._cycles)):
+                live = rows[self.generation[rows, e] == generations]
+                if len(live):
+                    due.setdefault(e, []).append(live)
+        # a row has at most one current entry per event, so the chunks never overlap
+        return {e: np.concatenate(chunks) for e, chunks in due.items()}
+
+    def refresh(self, next_cycle: int):
+        """Recheck the state conditions after the office changed. Rows whose condition flipped drop their pending
+        firing (generation bump) and, if now eligible, get a new one from next_cycle. Unconditional events never
+        need this."""
+        watched = self._watched()
+        if watched is None:
+            return
+        rows = np.flatnonzero((watched != self._seen).any(axis=1))
+        self._seen = watched
+        if not len(rows):
+            return
+        for e, schedule in enumerate(self.schedules):
+            if schedule.state is None:
+                continue
+            now = self._condition(schedule, rows)
+            changed = now != self.eligible[rows, e]
+            if not changed.any():
+                continue
+            flipped, now = rows[changed], now[changed]
+            self.generation[flipped, e] += 1
+            self.eligible[flipped, e] = now
+            self.eligible_count[e] += 2 * int(now.sum()) - len(now)
+            self._null = None
+            self.schedule(e, flipped[now], next_cycle)
+
+    def null_probabilities(self) -> np.ndarray:
+        """(rows, events) chance that an event was rolled but didn't fire, given that it didn't fire this cycle."""
+        if self._null is None:
+            self._null = self._null_chance(np.array([s.probability for s in self.schedules]) * self.eligible)
+        return self._null
+
+    def _null_chance(self, q):
+        return self.inclusion * (1 - q) / (1 - self.inclusion * q)
+
+    def unsaturated(self, e: int) -> Optional[np.ndarray]:
+        """Mask of the rows a null delta of event e can still change, the others are at the bound of every stat it
+        pushes. None when that can't be told from the bounds (see _pushes, or a trait flips the sign of a delta)."""
+        pushes = self._pushes[e]
+        if pushes is None:
+            return None
+        employees = self.office.employees
+        modifiers = employees.modifiers()
+        if modifiers is not None and (modifiers[:, pushes] < 0).any():
+            return None
+        bound = np.where(self.schedules[e].otherwise[pushes] > 0, STAT_UPPER[pushes], STAT_LOWER[pushes])
+        return (employees.to_numpy()[:, pushes] != bound).any(axis=1)
+
+    def count_nulls(self, e: int, drawn: np.ndarray) -> int:
+        """How many rows outside drawn (distinct rows) rolled event e without firing this cycle, from one
+        binomial draw per eligibility instead of a draw per row."""
+        eligible = int(self.eligible_count[e] - self.eligible[drawn, e].sum())
+        rest = len(self.eligible) - len(drawn) - eligible
+        q = self.schedules[e].probability
+        return int(self.rng.binomial(eligible, self._null_chance(q)) + self.rng.binomial(rest, self.inclusion))
+
+
+def split_bus(events: list[EmployeeEvent], max_probability: float) -> tuple[list[int], list[Stationary], list[int]]:
+    """(positions to schedule, their Stationary forms, positions to keep rolling). An event is scheduled when it is
+    stationary and fires on at most max_probability of its rolls."""
+    scheduled, schedules, rolled = [], [], []
+    for position, event in enumerate(events):
+        schedule = stationary(event)
+        if schedule is not None and schedule.probability <= max_probability:
+            scheduled.append(position)
+            schedules.append(schedule)
+        else:
+            rolled.append(position)
+    return scheduled, schedules, rolled
+
+
+def scheduled_phase(office: OfficeTable, scheduler: EventScheduler, events: list[EmployeeEvent], cycle: int,
+                    recorder: Optional[CycleRecorder], journal: Optional[DeltaJournal] = None,
+                    profiler: Optional[EventProfiler] = None):
+    """Fire what is due this cycle, queue those rows' next firing, then apply the batch of null deltas."""
+    employees = office.employees
+    due = scheduler.pop(cycle)
+    null_probabilities = scheduler.null_probabilities()
+    # per null delta, the rows it can change as of the phase start plus the rows fired since (they may have left a bound)
+    unsaturated: dict[bytes, Optional[np.ndarray]] = {}
+    for e, (event, schedule) in enumerate(zip(events, scheduler.schedules)):
+        rows = due.get(e, np.empty(0, dtype=np.int64))
+        key = schedule.otherwise.tobytes()
+        if key not in unsaturated:
+            unsaturated[key] = scheduler.unsaturated(e)
+        free, skipped = unsaturated[key], 0
+        if journal is not None or free is None:
+            # the journal keeps a null run per employee, so it gets every null
+            nulls = scheduler.rng.random(len(employees)) < null_probabilities[:, e]
+            nulls[rows] = False
+            null_rows = np.flatnonzero(nulls)
+        else:
+            free[rows] = False
+            candidates = np.flatnonzero(free)
+            null_rows = candidates[scheduler.rng.random(len(candidates)) < null_probabilities[candidates, e]]
+            if recorder is not None or profiler is not None:
+                skipped = scheduler.count_nulls(e, np.concatenate([candidates, rows]))
+        if profiler is not None:
+            start = perf_counter_ns()
+        # random_var 1.0 clears any threshold, batch_pdf still checks the state condition
+        deltas = event.batch_pdf(employees.view(rows), np.ones(len(rows)))
+        applied = np.concatenate([rows, null_rows])
+        applied_deltas = np.concatenate([deltas, np.broadcast_to(schedule.otherwise, (len(null_rows), deltas.shape[1]))])
+        if profiler is not None:
+            pdf_done = perf_counter_ns()
+        employees.apply_deltas(applied, applied_deltas)
+        if profiler is not None:
+            profiler.add_batch(event, applied_deltas, schedule.otherwise, pdf_done - start, perf_counter_ns() - pdf_done,
+                               skipped)
+        scheduler.schedule(e, rows, cycle + 1)
+        for mask in unsaturated.values():
+            if mask is not None:
+                mask[rows] = True
+        if journal is not None:
+            journal.record_batch(cycle, EMPLOYEE, applied, type(event).__name__, applied_deltas, schedule.otherwise)
+        if recorder is not None:
+            recorder.record_batch(event, EMPLOYEE, applied, applied_deltas, schedule.otherwise, skipped)
+
+
+def iter_scheduled(
+        office: OfficeTable,
+        cycles: int,
+        employee_events: list[EmployeeEvent],
+        relationship_events: list[EmployeeRelationshipEvent],
+        relation_ship_update_event: list[EmployeeEffectingEvent],
+        rng: Optional[np.random.Generator] = None,
+        max_probability: float = 0.25,
+        journal: Optional[DeltaJournal] = None,
+        start_cycle: int = 0,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        checkpoint_every: int = 0,
+        describe: Union[bool, Callable[[int], bool]] = False,
+        profiler: Optional[EventProfiler] = None,
+        workers: Optional[int] = 1,
+    ) -> Iterator[CycleRecord]:
+    """iter_table with the rare employee events (stationary, firing on at most max_probability of rolls) taken off
+    the per cycle roll and run from an EventScheduler. The other employee events and the relationship buses run
+    as in iter_table (workers included). A checkpoint keeps the office and rng but not the queue,
+    a resumed run draws fresh waiting times (the same distribution, not the same numbers)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    scheduled, schedules, rolled = split_bus(employee_events, max_probability)
+    inclusion = int(len(employee_events) * 0.8) / max(len(employee_events), 1)
+    scheduler = EventScheduler(office, schedules, inclusion, rng, start_cycle)
+    scheduled_events = [employee_events[p] for p in scheduled]
+    labeler = office_labeler(office)
+    shards = relationship_shards(office, relationship_events, workers, rng, journal, profiler)
+    try:
+        for i in range(start_cycle, start_cycle + cycles):
+            recorder = CycleRecorder(describe(i) if callable(describe) else describe)
+            if shards is None:
+                relationship_phase(office, rng, recorder, relationship_events, journal, i, profiler)
+            else:
+                shards.run(i, recorder, profiler)
+            if rolled:
+                employee_phase(office, rng, recorder, employee_events, journal, i, profiler, positions=rolled)
+            scheduled_phase(office, scheduler, scheduled_events, i, recorder, journal, profiler)
+            relationship_effect_phase(office, rng, recorder, relation_ship_update_event, journal, i, profiler)
+            scheduler.refresh(i + 1)
+            last = i + 1 == start_cycle + cycles
+            if checkpoint_path is not None and (last or (checkpoint_every and (i + 1) % checkpoint_every == 0)):
+                save_snapshot(checkpoint_path, office, cycle=i + 1, rng=rng)
+            yield recorder.finish(i, office_means(office), labeler)
+    finally:
+        if shards is not None:
+            shards.close()
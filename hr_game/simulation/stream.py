@@ -0,0 +1,115 @@
+# per cycle records for streaming a simulation.
+# the engines yield one CycleRecord per cycle instead of printing: office wide means, how often each event class
+# fired and, when asked for, the fired deltas so descriptions can be formatted later (only if someone reads them).
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+from hr_game.data.employee import Employee, EmployeeNetwork
+from hr_game.data.table import RELATIONSHIP_FIELDS, STAT_FIELDS, OfficeTable
+from hr_game.events.base import array_to_employee_delta, array_to_relationship_delta
+from hr_game.simulation.journal import EMPLOYEE, RELATIONSHIP
+
+Labeler = Callable[[int, int], str]  # (kind, entity) -> who a description is about
+
+
+@dataclass
+class CycleRecord:
+    cycle: int
+    means: dict[str, float]  # STAT_FIELDS (+ RELATIONSHIP_FIELDS for offices) averaged after the cycle
+    fired: Counter  # event class name -> deltas that were not the null delta
+    applied: Counter  # event class name -> times the event was sampled
+    _firings: Optional[list] = field(default=None, repr=False)
+    _labeler: Optional[Labeler] = field(default=None, repr=False)
+
+    def descriptions(self) -> Iterator[str]:
+        """The fired events of this cycle as text, formatted on demand. Empty unless the run was started with describe=True."""
+        for event, kind, entities, deltas in self._firings or ():
+            to_delta = array_to_relationship_delta if kind == RELATIONSHIP else array_to_employee_delta
+            for entity, delta in zip(entities, deltas):
+                delta = to_delta(delta) if isinstance(delta, np.ndarray) else delta
+                yield f"{self._labeler(kind, int(entity))}-- {event.description(delta)}"
+
+
+class CycleRecorder:
+    """Collects the counts (and optionally the firings) of one cycle, the engines call record/record_batch."""
+    def __init__(self, describe: bool = False):
+        self.fired = Counter()
+        self.applied = Counter()
+        self._firings = [] if describe else None
+
+    def record_batch(self, event, kind: int, entities: np.ndarray, deltas: np.ndarray, null_row: np.ndarray,
+                     nulls: int = 0):
+        # nulls: null deltas counted but not applied (they would not have changed anything)
+        name = type(event).__name__
+        fired = ~(deltas == null_row).all(axis=1)
+        n_fired = int(fired.sum())
+        self.applied[name] += len(entities) + nulls
+        if n_fired:
+            self.fired[name] += n_fired
+            if self._firings is not None:
+                self._firings.append((event, kind, entities[fired], deltas[fired]))
+
+    def record(self, event, kind: int, entity: int, delta, is_null: bool):
+        name = type(event).__name__
+        self.applied[name] += 1
+        if not is_null:
+            self.fired[name] += 1
+            if self._firings is not None:
+                self._firings.append((event, kind, (entity,), (delta,)))
+
+    def merge(self, other: "CycleRecorder"):
+        """Add the counts (and firings) another recorder collected for the same cycle."""
+        self.fired.update(other.fired)
+        self.applied.update(other.applied)
+        if self._firings is not None and other._firings:
+            self._firings.extend(other._firings)
+
+    def finish(self, cycle: int, means: dict[str, float], labeler: Labeler) -> CycleRecord:
+        return CycleRecord(cycle=cycle, means=means, fired=self.fired, applied=self.applied,
+                           _firings=self._firings, _labeler=labeler)
+
+
+def office_means(office: Union[OfficeTable, EmployeeNetwork]) -> dict[str, float]:
+    if isinstance(office, OfficeTable):
+        stats = office.employees.to_numpy().mean(axis=0) if len(office.employees) else np.zeros(len(STAT_FIELDS))
+        values = (office.relationships.to_numpy().mean(axis=0) if len(office.relationships)
+                  else np.zeros(len(RELATIONSHIP_FIELDS)))
+    else:
+        stats = np.array([[getattr(e, f) for f in STAT_FIELDS] for e in office.employees.values()]).reshape(-1, len(STAT_FIELDS))
+        values = np.array([[getattr(r, f) for f in RELATIONSHIP_FIELDS] for _, _, r in office.relationships]).reshape(-1, len(RELATIONSHIP_FIELDS))
+        stats = stats.mean(axis=0) if len(stats) else np.zeros(len(STAT_FIELDS))
+        values = values.mean(axis=0) if len(values) else np.zeros(len(RELATIONSHIP_FIELDS))
+    return {**dict(zip(STAT_FIELDS, stats.tolist())), **dict(zip(RELATIONSHIP_FIELDS, values.tolist()))}
+
+
+def employee_means(employee: Employee) -> dict[str, float]:
+    return {f: float(getattr(employee, f)) for f in STAT_FIELDS}
+
+
+def office_labeler(office: Union[OfficeTable, EmployeeNetwork]) -> Labeler:
+    """Labels matching the old verbose output: the employee's name, or who a relationship is between."""
+    if isinstance(office, OfficeTable):
+        names = office.employees.column("name")
+        src, dst = office.relationships.column("src"), office.relationships.column("dst")
+        employee_name = lambda row: str(names[row])
+        ends = lambda edge: (src[edge], dst[edge])
+    else:
+        employee_name = lambda node: office.employees[node].name
+        ends = lambda edge: office.relationships[edge][:2]
+
+    def label(kind: int, entity: int) -> str:
+        if kind == EMPLOYEE:
+            return employee_name(entity)
+        a, b = ends(entity)
+        return f"the relationship between {employee_name(a)} and {employee_name(b)} changed"
+    return label
+
+
+def print_record(record: CycleRecord):
+    """The old verbose mode: a day header and what happened."""
+    print("It is now day:", record.cycle)
+    for line in record.descriptions():
+        print(line)
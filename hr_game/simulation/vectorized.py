@@ -0,0 +1,201 @@
+# numpy engine for simulate_office.
+# the office lives in an OfficeTable: employee stats and relationship multipliers are typed arrays.
+# every event bus is run over the whole office at once:
+# each row draws its own ordered 4/5 subset of the bus (same as random.sample) and its own random vars,
+# then for every step we mask the rows that picked each event and apply that event's batch_pdf.
+# this keeps the per row event order, so the distributions match the object by object path in run.py.
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+from hr_game.data.snapshot import save_snapshot
+from hr_game.data.table import OfficeTable
+from hr_game.events.base import EmployeeEffectingEvent, EmployeeEvent, EmployeeRelationshipEvent
+from hr_game.events.example import NULL_DELTA, NULL_RELATIONSHIP_DELTA
+from hr_game.simulation.journal import EMPLOYEE, RELATIONSHIP, DeltaJournal
+from hr_game.simulation.profile import EventProfiler
+from hr_game.simulation.stream import CycleRecord, CycleRecorder, office_labeler, office_means, print_record
+
+
+def sample_event_order(rng: np.random.Generator, n: int, n_events: int) -> np.ndarray:
+    """Per row equivalent of random.sample(events, int(len(events)*0.8)), as an (n, k) array of event indices."""
+    k = int(n_events * 0.8)
+    return np.argsort(rng.random((n, n_events)), axis=1)[:, :k]
+
+
+def relationship_phase(office: OfficeTable, rng: np.random.Generator, recorder: Optional[CycleRecorder],
+                       events: list[EmployeeRelationshipEvent], journal: Optional[DeltaJournal] = None, cycle: int = 0,
+                       profiler: Optional[EventProfiler] = None, edges: Optional[np.ndarray] = None):
+    # edges: only these edges (a shard, see hr_game.simulation.parallel), all of them by default
+    employees, relationships = office.employees, office.relationships
+    src, dst = relationships.column("src"), relationships.column("dst")
+    edges = np.arange(len(relationships)) if edges is None else edges
+    order = sample_event_order(rng, len(edges), len(events))
+    random_vars = rng.random(order.shape)
+    for step in range(order.shape[1]):
+        for j, event in enumerate(events):
+            mask = order[:, step] == j
+            if not mask.any():
+                continue
+            sel = edges[mask]
+            if profiler is not None:
+                start = perf_counter_ns()
+            deltas = event.batch_pdf((relationships.view(sel), employees.view(src[sel]), employees.view(dst[sel])),
+                                     random_vars[mask, step])
+            if profiler is not None:
+                pdf_done = perf_counter_ns()
+            relationships.apply_deltas(sel, deltas)
+            if profiler is not None:
+                profiler.add_batch(event, deltas, NULL_RELATIONSHIP_DELTA, pdf_done - start, perf_counter_ns() - pdf_done)
+            if journal is not None:
+                journal.record_batch(cycle, RELATIONSHIP, sel, type(event).__name__, deltas, NULL_RELATIONSHIP_DELTA)
+            if recorder is not None:
+                recorder.record_batch(event, RELATIONSHIP, sel, deltas, NULL_RELATIONSHIP_DELTA)
+
+
+def employee_phase(office: OfficeTable, rng: np.random.Generator, recorder: Optional[CycleRecorder],
+                   events: list[EmployeeEvent],
+                   journal: Optional[DeltaJournal] = None, cycle: int = 0, profiler: Optional[EventProfiler] = None,
+                   positions: Optional[list[int]] = None):
+    # positions: only run these bus positions. the others still take part in the draw, so every event keeps the
+    # chance of being picked it has on the full bus (hr_game.simulation.schedule runs the rest).
+    employees = office.employees
+    rows = np.arange(len(employees))
+    order = sample_event_order(rng, len(rows), len(events))
+    random_vars = rng.random(order.shape)
+    run = list(enumerate(events)) if positions is None else [(j, events[j]) for j in positions]
+    for step in range(order.shape[1]):
+        for j, event in run:
+            mask = order[:, step] == j
+            if not mask.any():
+                continue
+            sel = rows[mask]
+            if profiler is not None:
+                start = perf_counter_ns()
+            deltas = event.batch_pdf(employees.view(sel), random_vars[mask, step])
+            if profiler is not None:
+                pdf_done = perf_counter_ns()
+            employees.apply_deltas(sel, deltas)
+            if profiler is not None:
+                profiler.add_batch(event, deltas, NULL_DELTA, pdf_done - start, perf_counter_ns() - pdf_done)
+            if journal is not None:
+                journal.record_batch(cycle, EMPLOYEE, sel, type(event).__name__, deltas, NULL_DELTA)
+            if recorder is not None:
+                recorder.record_batch(event, EMPLOYEE, sel, deltas, NULL_DELTA)
+
+
+def relationship_effect_phase(office: OfficeTable, rng: np.random.Generator, recorder: Optional[CycleRecorder],
+                              events: list[EmployeeEffectingEvent], journal: Optional[DeltaJournal] = None,
+                              cycle: int = 0, profiler: Optional[EventProfiler] = None):
+    # an employee walks its edges one after another (in list order, like run.py),
+    # so we advance every employee by one incident edge at a time.
+    employees, relationships, adjacency = office.employees, office.relationships, office.adjacency
+    degree = adjacency.degree
+    rows = np.arange(len(employees))
+    for slot in range(int(degree.max(initial=0))):
+        active = rows[degree > slot]
+        active_edges = adjacency.edges[adjacency.offsets[active] + slot]
+        order = sample_event_order(rng, len(active), len(events))
+        random_vars = rng.random(order.shape)
+        for step in range(order.shape[1]):
+            for j, event in enumerate(events):
+                mask = order[:, step] == j
+                if not mask.any():
+                    continue
+                sel = active[mask]
+                if profiler is not None:
+                    start = perf_counter_ns()
+                deltas = event.batch_pdf((relationships.view(active_edges[mask]), employees.view(sel)),
+                                         random_vars[mask, step])
+                if profiler is not None:
+                    pdf_done = perf_counter_ns()
+                employees.apply_deltas(sel, deltas)
+                if profiler is not None:
+                    profiler.add_batch(event, deltas, NULL_DELTA, pdf_done - start, perf_counter_ns() - pdf_done)
+                if journal is not None:
+                    journal.record_batch(cycle, EMPLOYEE, sel, type(event).__name__, deltas, NULL_DELTA)
+                if recorder is not None:
+                    recorder.record_batch(event, EMPLOYEE, sel, deltas, NULL_DELTA)
+
+
+def relationship_shards(office: OfficeTable, events: list[EmployeeRelationshipEvent], workers: Optional[int],
+                        rng: np.random.Generator, journal: Optional[DeltaJournal] = None,
+                        profiler: Optional[EventProfiler] = None):
+    """The RelationshipShards an engine should run the relationship phase on, None to run it in process."""
+    from hr_game.simulation.parallel import RelationshipShards, resolve_workers
+    workers = min(resolve_workers(workers), len(office.relationships))
+    if workers <= 1:
+        return None
+    if journal is not None:
+        raise ValueError("A journal needs every relationship delta in this process, run with workers=1")
+    return RelationshipShards(office, events, workers, rng, profile=profiler is not None)
+
+
+def iter_table(
+        office: OfficeTable,
+        cycles: int,
+        employee_events: list[EmployeeEvent],
+        relationship_events: list[EmployeeRelationshipEvent],
+        relation_ship_update_event: list[EmployeeEffectingEvent],
+        rng: Optional[np.random.Generator] = None,
+        journal: Optional[DeltaJournal] = None,
+        start_cycle: int = 0,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        checkpoint_every: int = 0,
+        describe: Union[bool, Callable[[int], bool]] = False,
+        profiler: Optional[EventProfiler] = None,
+        workers: Optional[int] = 1,
+    ) -> Iterator[CycleRecord]:
+    """Advance the office in place, yielding a CycleRecord after every cycle.
+    start_cycle numbers the cycles when a run is continued. describe (or describe(cycle)) keeps the fired deltas
+    so record.descriptions() can format them. With checkpoint_path, the office and rng state are snapshotted every
+    checkpoint_every cycles and at the end, see hr_game.simulation.run.resume_simulation.
+    profiler (an EventProfiler) accumulates per event class counts and timings.
+    workers > 1 (None for every core) shards the relationship phase over that many processes, see
+    hr_game.simulation.parallel. It draws different numbers than workers=1 and can't be combined with a journal."""
+    rng = rng if rng is not None else np.random.default_rng()
+    labeler = office_labeler(office)
+    shards = relationship_shards(office, relationship_events, workers, rng, journal, profiler)
+    try:
+        for i in range(start_cycle, start_cycle + cycles):
+            recorder = CycleRecorder(describe(i) if callable(describe) else describe)
+            if shards is None:
+                relationship_phase(office, rng, recorder, relationship_events, journal, i, profiler)
+            else:
+                shards.run(i, recorder, profiler)
+            employee_phase(office, rng, recorder, employee_events, journal, i, profiler)
+            relationship_effect_phase(office, rng, recorder, relation_ship_update_event, journal, i, profiler)
+            last = i + 1 == start_cycle + cycles
+            if checkpoint_path is not None and (last or (checkpoint_every and (i + 1) % checkpoint_every == 0)):
+                save_snapshot(checkpoint_path, office, cycle=i + 1, rng=rng)
+            yield recorder.finish(i, office_means(office), labeler)
+    finally:
+        if shards is not None:
+            shards.close()
+
+
+def simulate_table(
+        office: OfficeTable,
+        cycles: int,
+        verbose: bool,
+        employee_events: list[EmployeeEvent],
+        relationship_events: list[EmployeeRelationshipEvent],
+        relation_ship_update_event: list[EmployeeEffectingEvent],
+        rng: Optional[np.random.Generator] = None,
+        journal: Optional[DeltaJournal] = None,
+        start_cycle: int = 0,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        checkpoint_every: int = 0,
+        profiler: Optional[EventProfiler] = None,
+        workers: Optional[int] = 1,
+    ) -> OfficeTable:
+    """Run iter_table to the end, printing every 10th day when verbose."""
+    for record in iter_table(office, cycles, employee_events, relationship_events, relation_ship_update_event, rng=rng,
+                             journal=journal, start_cycle=start_cycle, checkpoint_path=checkpoint_path,
+                             checkpoint_every=checkpoint_every, describe=lambda i: verbose and i % 10 == 0,
+                             profiler=profiler, workers=workers):
+        if verbose and record.cycle % 10 == 0:
+            print_record(record)
+    return office
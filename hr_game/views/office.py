@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from hr_game.creation.employee import randomize_employee
 from hr_game.creation.network import create_fully_connected_network
 from hr_game.data.employee import Employee, EmployeeNetwork
@@ -46,24 +48,45 @@ def show_traits(employees:list[Employee])->tuple[plt.Figure,plt.Axes]:
     return fig, ax
     
 
+def _network_graph(network:EmployeeNetwork, field:str, edge_key:str=None)->nx.Graph:
+    """Graph keyed by the network's integer node ids, so employees sharing a name stay separate nodes."""
+    G = nx.Graph()
+    for node, e in network.employees.items():
+        G.add_node(node, name=e.name)
+    for n1, n2, rel in network.relationships:
+        G.add_edge(n1, n2, **{edge_key or field: getattr(rel, field)})
+    return G
+
+def show_employee_relationships(network:EmployeeNetwork, node:int)->tuple[plt.Figure,plt.Axes]:
+    """Bar chart of one employee's relationship multipliers with each co-worker."""
+    fields = ["attraction", "resentment", "synergy", "friendship"]
+    others = []
+    values = {field: [] for field in fields}
+    for ridx in network.incident_relationships(node):
+        n1, n2, rel = network.relationships[ridx]
+        others.append(network.employees[n2 if n1 == node else n1].name)
+        for field in fields:
+            values[field].append(getattr(rel, field))
+
+    x = np.arange(len(others))
+    width = 0.2
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for i, field in enumerate(fields):
+        ax.bar(x + (i - 1.5) * width, values[field], width, label=field)
+    ax.set_xticks(x)
+    ax.set_xticklabels(others)
+    ax.set_ylabel("Multiplier")
+    ax.set_title(f"Relationships of {network.employees[node].name}")
+    ax.legend(bbox_to_anchor=(1.05, 1), loc="upper left")
+    fig.tight_layout()
+    return fig, ax
+
 def show_romance(network:EmployeeNetwork):
     """
     Plot a graph where edges have fixed width, but color ranges from grey to red
     based on attraction (0=grey, 1=red).
     """
-    employees = network.employees
-    relationships = network.relationships
-    G = nx.Graph()
-
-    # Add nodes
-    for e in employees.values():
-        G.add_node(e.name)
-
-    # Add edges with friendship as weight
-    for e1_id, e2_id, rel in relationships:
-        e1 = employees[e1_id]
-        e2 = employees[e2_id]
-        G.add_edge(e1.name, e2.name, attraction=rel.attraction)
+    G = _network_graph(network, "attraction")
 
     # Force-directed layout
     pos = nx.spring_layout(G, seed=42)
@@ -72,7 +95,7 @@ def show_romance(network:EmployeeNetwork):
 
     # Draw nodes
     nx.draw_networkx_nodes(G, pos, node_color="lightblue", node_size=500, ax=ax)
-    nx.draw_networkx_labels(G, pos, ax=ax)
+    nx.draw_networkx_labels(G, pos, labels=nx.get_node_attributes(G, "name"), ax=ax)
 
     # Draw edges with fixed width, color based on attraction
     edges = G.edges(data=True)
@@ -96,19 +119,8 @@ def graph_closeness(network:EmployeeNetwork):
     """
     Plot friendship graph with community detection coloring.
     """
-    employees = network.employees
-    relationships = network.relationships
-    G = nx.Graph()
-
-    # Add nodes
-    for e in employees.values():
-        G.add_node(e.name)
-
-    # Add edges with friendship as weight
-    for e1_id, e2_id, rel in relationships:
-        e1 = employees[e1_id]
-        e2 = employees[e2_id]
-        G.add_edge(e1.name, e2.name, weight=rel.friendship)
+    # friendship as weight
+    G = _network_graph(network, "friendship", edge_key="weight")
 
     pos = nx.spring_layout(G, weight="weight", seed=42)
 
@@ -124,20 +136,27 @@ def graph_closeness(network:EmployeeNetwork):
                            cmap=plt.cm.Set3, node_size=600, ax=ax)
     weights = [d["weight"] * 5 for _, _, d in G.edges(data=True)]
     nx.draw_networkx_edges(G, pos, width=weights, alpha=0.6, ax=ax)
-    nx.draw_networkx_labels(G, pos, ax=ax)
+    nx.draw_networkx_labels(G, pos, labels=nx.get_node_attributes(G, "name"), ax=ax)
 
     ax.set_title("Employee Friendship Communities")
     ax.axis("off")
     fig.tight_layout()
     return fig, ax
-employees =[randomize_employee() for i in range(10)]
-network = create_fully_connected_network(employees=employees)
-# # traits 
-fig,ax = show_traits(employees)
-fig.savefig(".plots/employee_traits.png", dpi=300)
-# closeness 
-fig1,ax1 = graph_closeness(network)
-fig1.savefig(".plots/employee_graph1.png", dpi=300)
-# romances 
-fig2,ax2 = show_romance(network)
-fig2.savefig(".plots/employee_graph2.png", dpi=300)
\ No newline at end of file
+def render_office(network:EmployeeNetwork, out_dir:str=".plots", dpi:int=300)->list[Path]:
+    """Write the traits bar chart, the friendship communities and the attraction graph of network as PNGs."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    figures = {
+        "employee_traits.png": show_traits(list(network.employees.values())),
+        "employee_graph1.png": graph_closeness(network),
+        "employee_graph2.png": show_romance(network),
+    }
+    paths = []
+    for name, (fig, _) in figures.items():
+        fig.savefig(Path(out_dir)/name, dpi=dpi)
+        plt.close(fig)
+        paths.append(Path(out_dir)/name)
+    return paths
+
+if __name__ == "__main__":
+    employees =[randomize_employee() for i in range(10)]
+    render_office(create_fully_connected_network(employees=employees))